@@ -0,0 +1,6 @@
+"""Parsing and aggregation of io-synthetic run logs.
+
+``python3 -m analysis.summary`` rebuilds ``summary.csv`` from ``log/``.
+"""
+from .parse import RunResult, SCENARIOS, parse_run_dir
+from .table import ResultsTable
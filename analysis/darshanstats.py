@@ -0,0 +1,275 @@
+"""Per-file and per-job I/O counters from the Darshan logs of a workflow.
+
+``bin/wrappers/wrapper_darshan*.sh`` run keg with the non-MPI Darshan
+library, which leaves one ``.darshan`` log per process under ``DLOGPATH``.
+Logs are decoded by ``darshan-parser`` (darshan-util), whose records read::
+
+    # exe: /path/pegasus-keg -i f1.txt -o f2.txt=1048576B
+    # start_time: 1700000000
+    # run time: 3.0123
+    #<module>  <rank>  <record id>  <counter>  <value>  <file name>  <mount pt>  <fs type>
+    POSIX  0  9457796068806373448  POSIX_BYTES_READ  1073741824  /scratch/f1.txt  /scratch  lustre
+
+POSIX and STDIO counters are kept (keg writes through stdio unless given
+a block size). A log belongs to the workflow job producing the first keg
+output named on its command line or, failing that, the first file it
+wrote. ``non_io_time`` is what the job spent outside of read, write and
+metadata calls: keg's sleep and spin phases.
+
+Usage (from the repository root)::
+
+    python3 -m analysis.darshanstats -w <submit dir>/workflow.yml -d $DLOGPATH -o darshan-jobs.csv
+"""
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+from argparse import ArgumentParser
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .table import ResultsTable
+
+MODULES = ["POSIX", "STDIO"]
+SIZE_BINS = ["0_100", "100_1K", "1K_10K", "10K_100K", "100K_1M",
+             "1M_4M", "4M_10M", "10M_100M", "100M_1G", "1G_PLUS"]
+
+# Darshan counter (module prefix removed) -> column
+COUNTERS = OrderedDict(
+    [("BYTES_READ", "bytes_read"), ("BYTES_WRITTEN", "bytes_written"),
+     ("OPENS", "opens"), ("READS", "reads"), ("WRITES", "writes"), ("SEEKS", "seeks"),
+     ("STATS", "stats"), ("FSYNCS", "fsyncs"), ("FLUSHES", "flushes"),
+     ("F_READ_TIME", "read_time"), ("F_WRITE_TIME", "write_time"), ("F_META_TIME", "meta_time")]
+    + [("SIZE_{}_{}".format(op, b), "size_{}_{}".format(op.lower(), b.lower()))
+       for op in ["READ", "WRITE"] for b in SIZE_BINS])
+METRICS = list(COUNTERS.values())
+
+FILE_COLUMNS = ["job", "log", "module", "file"] + METRICS
+JOB_COLUMNS = ["job", "logs", "start", "run_time", "files"] + METRICS + ["io_time", "non_io_time"]
+
+
+class DarshanLog(object):
+    """Header and per-file counters of one log."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.exe = ""
+        self.start = 0.0
+        self.run_time = 0.0
+        self.files = OrderedDict()  # (module, file name) -> {column: value}
+        self.error = None
+
+
+def keg_outputs(exe: str) -> List[str]:
+    """File names following ``-o`` on a keg command line, sizes removed."""
+    outputs = []
+    listing = False
+    for token in exe.split():
+        if token.startswith("-"):
+            listing = token == "-o"
+        elif listing:
+            outputs.append(os.path.basename(token.split("=", 1)[0]))
+    return outputs
+
+
+def parse_log(path: str, darshan_parser: str = "darshan-parser") -> DarshanLog:
+    """Run ``darshan-parser`` on ``path`` and keep the counters of MODULES,
+    never raising (failures are left in ``error``)."""
+    log = DarshanLog(path)
+    # stdout is streamed, stderr goes to a file so that a chatty
+    # darshan-parser cannot block on a full pipe
+    with tempfile.TemporaryFile(mode="w+") as stderr:
+        try:
+            proc = subprocess.Popen([darshan_parser, path], stdout=subprocess.PIPE,
+                                    stderr=stderr, universal_newlines=True)
+        except OSError as e:
+            log.error = "{}: {}".format(path, e)
+            return log
+        with proc.stdout:
+            parse_records(proc.stdout, log)
+        if proc.wait() != 0:
+            stderr.seek(0)
+            log.error = "{}: darshan-parser failed: {}".format(path, stderr.read().strip())
+    return log
+
+
+def parse_records(lines: Iterable[str], log: DarshanLog) -> None:
+    """Fill ``log`` with the header and counters of darshan-parser's output."""
+    for line in lines:
+        if line.startswith("#"):
+            key, _, value = line[1:].partition(":")
+            key, value = key.strip(), value.strip()
+            if key == "exe":
+                log.exe = value
+            elif key == "start_time":
+                log.start = float(value)
+            elif key == "run time":
+                log.run_time = float(value)
+            continue
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) < 6 or fields[0] not in MODULES:
+            continue
+        column = COUNTERS.get(fields[3][len(fields[0]) + 1:])
+        if column is None:
+            continue
+        counters = log.files.setdefault((fields[0], fields[5]), {})
+        counters[column] = counters.get(column, 0.0) + float(fields[4])
+
+
+def find_logs(dirs: Iterable[str]) -> List[str]:
+    logs = []
+    for top in dirs:
+        for root, _, files in os.walk(top):
+            logs.extend(os.path.join(root, name) for name in files if name.endswith(".darshan"))
+    return sorted(logs)
+
+
+def output_jobs(workflow_yml: str) -> Dict[str, str]:
+    """Job id of the job producing each file of the workflow."""
+    from workflow import iter_yaml_items
+
+    jobs = {}
+    for job in iter_yaml_items(workflow_yml, "jobs"):
+        for use in job.get("uses", []):
+            if use.get("type") == "output":
+                jobs[use["lfn"]] = str(job["id"])
+    return jobs
+
+
+def job_of(log: DarshanLog, producers: Dict[str, str]) -> Optional[str]:
+    for name in keg_outputs(log.exe):
+        if name in producers:
+            return producers[name]
+    for (_, name), counters in log.files.items():
+        if counters.get("bytes_written") and os.path.basename(name) in producers:
+            return producers[os.path.basename(name)]
+    return None
+
+
+def collect(workflow_yml: str, dirs: List[str], since: Optional[float] = None,
+            darshan_parser: str = "darshan-parser",
+            workers: Optional[int] = None) -> Tuple[ResultsTable, ResultsTable, List[str]]:
+    """Per-file and per-job tables of the logs of ``dirs`` belonging to the
+    jobs of ``workflow_yml``, and the errors met. Logs of processes started
+    before ``since`` (epoch seconds) are left out."""
+    producers = output_jobs(workflow_yml)
+    files = ResultsTable(FILE_COLUMNS, numeric=METRICS)
+    jobs = OrderedDict()
+    errors = []
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for log in pool.map(lambda path: parse_log(path, darshan_parser), find_logs(dirs)):
+            if log.error:
+                errors.append(log.error)
+                continue
+            if since is not None and log.start < since:
+                continue
+            job = job_of(log, producers)
+            if job is None:
+                continue
+
+            totals = jobs.setdefault(job, {"logs": 0, "start": log.start, "run_time": 0.0, "files": set()})
+            totals["logs"] += 1
+            totals["start"] = min(totals["start"], log.start)
+            # Processes of a job (kickstart and keg) overlap
+            totals["run_time"] = max(totals["run_time"], log.run_time)
+            for (module, name), counters in log.files.items():
+                files.append([job, os.path.basename(log.path), module, name]
+                             + [counters.get(metric, 0.0) for metric in METRICS])
+                totals["files"].add(name)
+                for metric in METRICS:
+                    totals[metric] = totals.get(metric, 0.0) + counters.get(metric, 0.0)
+
+    table = ResultsTable(JOB_COLUMNS, numeric=JOB_COLUMNS[1:])
+    for job, totals in sorted(jobs.items()):
+        io_time = totals.get("read_time", 0.0) + totals.get("write_time", 0.0) + totals.get("meta_time", 0.0)
+        table.append([job, totals["logs"], totals["start"], totals["run_time"], len(totals["files"])]
+                     + [totals.get(metric, 0.0) for metric in METRICS]
+                     + [round(io_time, 6), round(max(totals["run_time"] - io_time, 0.0), 6)])
+    return table, files, errors
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Collect per-file and per-job Darshan counters of a workflow")
+
+    parser.add_argument(
+        "-w",
+        "--workflow-yml",
+        metavar="STR",
+        type=str,
+        required=True,
+        help="Workflow YAML whose jobs the logs are joined to",
+    )
+    parser.add_argument(
+        "-d",
+        "--dir",
+        metavar="STR",
+        nargs="+",
+        required=True,
+        help="Directories holding the .darshan logs, e.g. $DLOGPATH",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="STR",
+        type=str,
+        default="darshan-jobs.csv",
+        help="Per-job table (default: darshan-jobs.csv)",
+    )
+    parser.add_argument(
+        "-f",
+        "--files",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Also write the per-file table",
+    )
+    parser.add_argument(
+        "--since",
+        metavar="FLOAT",
+        type=float,
+        default=None,
+        help="Ignore logs of processes started before this epoch time, when DLOGPATH is shared by several runs",
+    )
+    parser.add_argument(
+        "--darshan-parser",
+        metavar="STR",
+        type=str,
+        default="darshan-parser",
+        help="darshan-parser executable (default: darshan-parser)",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        metavar="INT",
+        type=int,
+        default=None,
+        help="Number of darshan-parser processes run at once",
+    )
+
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.workflow_yml):
+        parser.error("-w/--workflow-yml {} is not a file".format(args.workflow_yml))
+
+    for path in args.dir:
+        if not os.path.isdir(path):
+            parser.error("-d/--dir {} is not a directory".format(path))
+
+    if shutil.which(args.darshan_parser) is None:
+        parser.error("--darshan-parser {} not found, darshan-util is required".format(args.darshan_parser))
+
+    table, files, errors = collect(args.workflow_yml, args.dir, args.since, args.darshan_parser, args.workers)
+    for error in errors:
+        print("Warning: {}".format(error), file=sys.stderr)
+    if not len(table):
+        print("Warning: no Darshan log of this workflow found", file=sys.stderr)
+
+    table.to_csv(args.output)
+    if args.files:
+        files.to_csv(args.files)
+    print("{} jobs, {:.3f} s of read, {:.3f} s of write, {:.3f} s of metadata, {:.3f} s outside of I/O".format(
+        len(table), sum(table["read_time"]), sum(table["write_time"]), sum(table["meta_time"]),
+        sum(table["non_io_time"])))
@@ -0,0 +1,139 @@
+"""Persistent index of parsed run directories.
+
+Each run directory is recorded in a SQLite database with the size and mtime
+of the files its makespan comes from, a fingerprint of their content and the
+parsed result. Updating the index only stats unchanged runs; new or modified
+ones are parsed again, and runs that disappeared from ``log/`` are dropped.
+"""
+import os
+import json
+import hashlib
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Optional, Tuple
+
+from .parse import source_files, try_parse_run_dir
+from .table import ResultsTable
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run TEXT PRIMARY KEY,
+    signature TEXT NOT NULL,
+    mtime_ns INTEGER,
+    fingerprint TEXT,
+    scenario TEXT,
+    size REAL,
+    type TEXT,
+    makespan REAL,
+    error TEXT
+)
+"""
+
+
+class UpdateReport(NamedTuple):
+    parsed: int
+    unchanged: int
+    removed: int
+
+
+def signature(run_dir: str) -> Tuple[str, int]:
+    """Size and mtime of the source files of a run, without reading them."""
+    try:
+        files = source_files(run_dir)
+    except ValueError:
+        files = []
+
+    entries = []
+    for path in files:
+        st = os.stat(path)
+        entries.append([os.path.relpath(path, run_dir), st.st_size, st.st_mtime_ns])
+    if not entries:
+        # nothing to parse (yet): the directory itself tells when that changes
+        entries.append([".", 0, os.stat(run_dir).st_mtime_ns])
+    return json.dumps(entries), max(entry[2] for entry in entries)
+
+
+def fingerprint(run_dir: str) -> Optional[str]:
+    digest = hashlib.sha256()
+    try:
+        for path in source_files(run_dir):
+            digest.update(os.path.relpath(path, run_dir).encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    except (OSError, ValueError):
+        return None
+    return digest.hexdigest()
+
+
+def scan(run_dir: str) -> Tuple[str, Optional[Tuple[str, int]]]:
+    try:
+        return run_dir, signature(run_dir)
+    except OSError:
+        return run_dir, None
+
+
+def parse(run_dir: str):
+    result, error = try_parse_run_dir(run_dir)
+    return run_dir, result, error, fingerprint(run_dir)
+
+
+class ResultsIndex(object):
+    """SQLite index of run results, see the module documentation."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute(SCHEMA)
+
+    def __enter__(self) -> "ResultsIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.db.close()
+
+    def update(self, run_dirs: List[str], workers: Optional[int] = None) -> UpdateReport:
+        known = {run: sig for run, sig in self.db.execute("SELECT run, signature FROM runs")}
+
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            signatures = {}
+            for run_dir, sig in pool.map(scan, run_dirs):
+                if sig is not None:
+                    signatures[run_dir] = sig
+
+            changed = [
+                run_dir for run_dir, (sig, _) in signatures.items()
+                if known.get(os.path.basename(os.path.normpath(run_dir))) != sig
+            ]
+            rows = []
+            for run_dir, result, error, digest in pool.map(parse, changed):
+                run = os.path.basename(os.path.normpath(run_dir))
+                sig, mtime_ns = signatures[run_dir]
+                if result is None:
+                    rows.append((run, sig, mtime_ns, digest, None, None, None, None, error))
+                else:
+                    rows.append((run, sig, mtime_ns, digest, result.scenario, result.size,
+                                 result.type, result.makespan, None))
+
+        present = {os.path.basename(os.path.normpath(run_dir)) for run_dir in signatures}
+        removed = [(run,) for run in known if run not in present]
+
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.executemany("DELETE FROM runs WHERE run = ?", removed)
+
+        return UpdateReport(len(rows), len(signatures) - len(rows), len(removed))
+
+    def table(self) -> ResultsTable:
+        rows = self.db.execute(
+            "SELECT run, scenario, size, type, makespan FROM runs "
+            "WHERE error IS NULL ORDER BY run"
+        )
+        return ResultsTable.from_rows(["run", "scenario", "size", "type", "makespan"],
+                                      rows, numeric=["size", "makespan"])
+
+    def errors(self) -> List[str]:
+        return [error for error, in self.db.execute(
+            "SELECT error FROM runs WHERE error IS NOT NULL ORDER BY run")]
@@ -0,0 +1,174 @@
+"""Per-job I/O statistics from the records written by ``pegasus-keg``.
+
+Every keg output ends with a record like::
+
+    keg-job: app=keg start=1700000000.123456 outputs=f2.txt inputs=f1.txt
+    keg-phase: read wall=0.012000 bytes=1048576 files=1 open=0.000010 close=0.000002 mbps=83.333
+    keg-phase: write wall=...
+    keg-phase: spin wall=...
+    keg-phase: sleep wall=...
+
+and the same record is appended to the ``-l`` logfile once the job is done.
+Outputs only carry what was measured when they were written (the write
+phase is not over yet), so the logfile record wins when both are found.
+
+Usage (from the repository root)::
+
+    python3 -m analysis.kegstats -l keg.log -d <scratch dir> -o kegstats.csv
+"""
+import os
+import re
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from .table import ResultsTable
+
+JOB = re.compile(r"keg-job: app=(\S*) start=(\S+) outputs=(\S*) inputs=(\S*)")
+PHASE = re.compile(r"keg-phase: (\w+) (.*)")
+FIELDS = ["wall", "bytes", "files", "open", "close", "mbps"]
+
+# The record sits at the very end of an output, no need to read GBs of data
+TAIL = 64 * 1024
+
+JOB_COLUMNS = ["outputs", "inputs", "app", "start"] \
+    + ["{}_{}".format(phase, field) for phase in ["read", "write"] for field in FIELDS] \
+    + ["spin_wall", "sleep_wall", "io_wall", "wait_wall", "source"]
+NUMERIC_COLUMNS = [c for c in JOB_COLUMNS if c not in ["outputs", "inputs", "app", "source"]]
+
+
+def parse_records(text: str, source: str) -> List[Dict]:
+    """Every keg record found in ``text``."""
+    records = []
+    record = None
+    for line in text.splitlines():
+        match = JOB.match(line)
+        if match:
+            app, start, outputs, inputs = match.groups()
+            record = {"app": app, "start": float(start), "outputs": outputs,
+                      "inputs": inputs, "source": source}
+            records.append(record)
+            continue
+        match = PHASE.match(line)
+        if match and record is not None:
+            phase, fields = match.groups()
+            for field in fields.split():
+                key, _, value = field.partition("=")
+                record["{}_{}".format(phase, key)] = float(value)
+    return records
+
+
+def read_tail(path: str, size: int = TAIL) -> str:
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(f.tell() - size, 0))
+        return f.read().decode("utf-8", "replace")
+
+
+def output_records(path: str) -> List[Dict]:
+    try:
+        return parse_records(read_tail(path), path)
+    except OSError:
+        return []
+
+
+def logfile_records(path: str) -> List[Dict]:
+    with open(path, "r", errors="replace") as f:
+        return parse_records(f.read(), path)
+
+
+def walk_files(dirs: Iterable[str]) -> Iterable[str]:
+    for top in dirs:
+        for root, _, files in os.walk(top):
+            for name in files:
+                yield os.path.join(root, name)
+
+
+def completeness(record: Dict) -> tuple:
+    # logfile records are written last, then the output written last by a job
+    return (record.get("from_log", False), record.get("write_files", 0))
+
+
+def merge(records: Iterable[Dict]) -> List[Dict]:
+    """One record per job run, the most complete one."""
+    jobs = {}
+    for record in records:
+        key = (record["app"], record["start"], record["outputs"], record["inputs"])
+        if key not in jobs or completeness(record) > completeness(jobs[key]):
+            jobs[key] = record
+    return sorted(jobs.values(), key=lambda r: (r["start"], r["outputs"]))
+
+
+def collect(logfiles: List[str], dirs: List[str],
+            workers: Optional[int] = None) -> ResultsTable:
+    records = []
+    for path in logfiles:
+        for record in logfile_records(path):
+            record["from_log"] = True
+            records.append(record)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for found in pool.map(output_records, walk_files(dirs)):
+            records.extend(found)
+
+    table = ResultsTable(JOB_COLUMNS, numeric=NUMERIC_COLUMNS)
+    for record in merge(records):
+        record["io_wall"] = round(record.get("read_wall", 0.0) + record.get("write_wall", 0.0), 6)
+        record["wait_wall"] = round(record.get("spin_wall", 0.0) + record.get("sleep_wall", 0.0), 6)
+        table.append([record.get(column, 0.0) for column in JOB_COLUMNS])
+    return table
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Collect per-job I/O statistics of pegasus-keg")
+
+    parser.add_argument(
+        "-l",
+        "--logfile",
+        metavar="STR",
+        nargs="+",
+        default=[],
+        help="keg logfiles (-l) to read",
+    )
+    parser.add_argument(
+        "-d",
+        "--dir",
+        metavar="STR",
+        nargs="+",
+        default=[],
+        help="Directories holding job outputs, e.g. the scratch or output directory",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="STR",
+        type=str,
+        default="kegstats.csv",
+        help="Per-job table (default: kegstats.csv)",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        metavar="INT",
+        type=int,
+        default=None,
+        help="Number of reader threads",
+    )
+
+    args = parser.parse_args()
+
+    if not args.logfile and not args.dir:
+        parser.error("at least one of -l/--logfile or -d/--dir is required")
+
+    for path in args.dir:
+        if not os.path.isdir(path):
+            parser.error("-d/--dir {} is not a directory".format(path))
+
+    table = collect(args.logfile, args.dir, args.workers)
+    if not len(table):
+        print("Warning: no keg record found", file=sys.stderr)
+
+    table.to_csv(args.output)
+    print("{} jobs, {:.3f} s of I/O, {:.3f} s of spin/sleep".format(
+        len(table), sum(table.columns["io_wall"]), sum(table.columns["wait_wall"])))
@@ -0,0 +1,251 @@
+"""Per-job wall time and file I/O from the records of a past Pegasus run.
+
+Two sources are understood:
+
+- kickstart records, the ``<job>.out.NNN`` files of a submit directory. Every
+  invocation starts with ``- invocation:`` at column 0 and, when kickstart
+  traced the job, lists the bytes read and written per file::
+
+      - invocation: True
+        duration: 2.137
+        transformation: "keg"
+        derivation: "ID0000001"
+        mainjob:
+          duration: 2.120
+          usage:
+            utime: 0.150
+            stime: 0.420
+          procs:
+            - pid: 12346
+              files:
+                /scratch/f1:
+                  size: 1073741824
+                  bread: 1073741824
+                  bwrite: 0
+
+- monitord events (BP lines ``ts=... event=stampede.inv.end ...``), which
+  only carry the wall (``dur``) and CPU (``remote_cpu_time``) times.
+
+Files are read one invocation (or line) at a time and the few values needed
+are found by their key and indentation, the records are never loaded as
+YAML. Retries of a job replace the earlier attempts.
+
+Usage (from the repository root)::
+
+    python3 -m analysis.kickstart -d <submit dir> -o kickstart.csv
+"""
+import os
+import re
+import sys
+from argparse import ArgumentParser
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from .table import ResultsTable
+
+# Bytes of a traced file, under the file name
+TRACED_BYTES = re.compile(r" b(read|write): (\d+)")
+BP_FIELD = re.compile(r'(\S+?)=("(?:[^"\\]|\\.)*"|\S*)')
+KICKSTART_OUT = re.compile(r"\.out(\.\d+)?\Z")
+
+# Kickstart outputs are read this many characters at a time
+BLOCK = 1 << 20
+
+JOB_COLUMNS = ["job", "transformation", "wall", "cpu", "bytes_read", "bytes_written", "files"]
+NUMERIC_COLUMNS = ["wall", "cpu", "bytes_read", "bytes_written", "files"]
+
+
+class Invocation(NamedTuple):
+    """One job run: wall and CPU time (``None`` when unknown) in seconds,
+    and bytes read and written per file name."""
+    job: str
+    transformation: str
+    wall: Optional[float]
+    cpu: Optional[float]
+    reads: Dict[str, int]
+    writes: Dict[str, int]
+
+
+def scalar(text: str, key: str, start: int = 0) -> Optional[str]:
+    """Value of the first ``key`` (indentation included) after ``start``."""
+    i = text.find("\n" + key + ": ", start)
+    if i < 0:
+        return None
+    i += len(key) + 3
+    j = text.find("\n", i)
+    return text[i:j if j >= 0 else len(text)].strip('"')
+
+
+def parse_invocation(text: str) -> Optional[Invocation]:
+    """The invocation record ``text``, ``None`` if it names no job."""
+    job = scalar(text, "  derivation")
+    if job is None:
+        return None
+
+    wall = scalar(text, "  duration")
+    cpu = None
+    mainjob = text.find("\n  mainjob:\n")
+    if mainjob >= 0:
+        wall = scalar(text, "    duration", mainjob) or wall
+        usage = text.find("\n    usage:\n", mainjob)
+        if usage >= 0:
+            cpu = float(scalar(text, "      utime", usage) or 0) + float(scalar(text, "      stime", usage) or 0)
+
+    io = ({}, {})
+    for match in TRACED_BYTES.finditer(text):
+        if match.group(2) == "0":
+            continue
+        # The file is the mapping holding the counter, known by name to the workflow
+        end = text.rfind(":\n", 0, match.start())
+        name = os.path.basename(text[text.rfind("\n", 0, end) + 1:end].strip().strip('"'))
+        counts = io[match.group(1) == "write"]
+        counts[name] = counts.get(name, 0) + int(match.group(2))
+
+    return Invocation(job, scalar(text, "  transformation") or "",
+                      float(wall) if wall is not None else None, cpu, io[0], io[1])
+
+
+def kickstart_records(path: str, block_size: int = BLOCK) -> Iterator[Invocation]:
+    """Invocations of a kickstart output, read ``block_size`` characters at
+    a time and cut on the records starting at column 0."""
+    with open(path, "r", errors="replace") as f:
+        pending = ""
+        while True:
+            block = f.read(block_size)
+            text = pending + block
+            if block:
+                cut = text.rfind("\n- ")
+                if cut < 0:
+                    pending = text
+                    continue
+                text, pending = text[:cut + 1], text[cut + 1:]
+            for record in text.split("\n- "):
+                invocation = parse_invocation(record)
+                if invocation is not None:
+                    yield invocation
+            if not block:
+                break
+
+
+def monitord_records(path: str) -> Iterator[Invocation]:
+    """Invocations ending in a monitord BP log, pre and post scripts excluded."""
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            if "event=stampede.inv.end" not in line:
+                continue
+            values = {k: v.strip('"') for k, v in BP_FIELD.findall(line)}
+            if "task.id" not in values:
+                continue
+            cpu = values.get("remote_cpu_time")
+            yield Invocation(values["task.id"], values.get("transformation", ""),
+                             float(values.get("dur", 0)), float(cpu) if cpu else None, {}, {})
+
+
+def is_monitord(path: str) -> bool:
+    with open(path, "r", errors="replace") as f:
+        return f.readline().startswith("ts=")
+
+
+def walk_records(paths: Iterable[str]) -> Iterator[str]:
+    """Files of ``paths``, directories being searched for kickstart outputs
+    and ``.bp`` logs (sorted, so that later attempts come last)."""
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        found = []
+        for root, _, files in os.walk(path):
+            for name in files:
+                if KICKSTART_OUT.search(name) or name.endswith(".bp"):
+                    found.append(os.path.join(root, name))
+        yield from sorted(found)
+
+
+def iter_records(paths: Iterable[str]) -> Iterator[Invocation]:
+    for path in walk_records(paths):
+        if path.endswith(".bp") or not KICKSTART_OUT.search(path) and is_monitord(path):
+            yield from monitord_records(path)
+        else:
+            yield from kickstart_records(path)
+
+
+def collect(paths: Iterable[str]) -> Dict[str, Invocation]:
+    """The last invocation of every job. Timings come from the last record,
+    file I/O from the last record that traced any."""
+    jobs = {}
+    for invocation in iter_records(paths):
+        previous = jobs.get(invocation.job)
+        if previous is not None and not invocation.reads and not invocation.writes:
+            invocation = invocation._replace(reads=previous.reads, writes=previous.writes)
+        if previous is not None and invocation.cpu is None:
+            invocation = invocation._replace(cpu=previous.cpu)
+        jobs[invocation.job] = invocation
+    return jobs
+
+
+def to_table(jobs: Dict[str, Invocation]) -> ResultsTable:
+    """Per-job table, unknown times as NaN."""
+    table = ResultsTable(JOB_COLUMNS, numeric=NUMERIC_COLUMNS)
+    nan = float("nan")
+    for job in jobs.values():
+        table.append([job.job, job.transformation,
+                      nan if job.wall is None else job.wall,
+                      nan if job.cpu is None else job.cpu,
+                      sum(job.reads.values()), sum(job.writes.values()),
+                      len(set(job.reads) | set(job.writes))])
+    return table
+
+
+def transformation_means(table: ResultsTable) -> Dict[str, Dict[str, float]]:
+    """Mean wall and CPU time per transformation, NaN values left out."""
+    sums = {}
+    for name, wall, cpu in zip(table["transformation"], table["wall"], table["cpu"]):
+        acc = sums.setdefault(name, [0.0, 0, 0.0, 0])
+        if wall == wall:
+            acc[0] += wall
+            acc[1] += 1
+        if cpu == cpu:
+            acc[2] += cpu
+            acc[3] += 1
+    return {name: {"wall": acc[0] / acc[1] if acc[1] else None,
+                   "cpu": acc[2] / acc[3] if acc[3] else None}
+            for name, acc in sums.items()}
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Collect per-job times and file I/O from kickstart and monitord records")
+
+    parser.add_argument(
+        "-d",
+        "--dir",
+        metavar="STR",
+        nargs="+",
+        default=[],
+        help="Submit directories, kickstart outputs or monitord BP logs",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="STR",
+        type=str,
+        default="kickstart.csv",
+        help="Per-job table (default: kickstart.csv)",
+    )
+
+    args = parser.parse_args()
+
+    if not args.dir:
+        parser.error("-d/--dir is required")
+
+    for path in args.dir:
+        if not os.path.exists(path):
+            parser.error("-d/--dir {} does not exist".format(path))
+
+    table = to_table(collect(args.dir))
+    if not len(table):
+        print("Warning: no invocation record found", file=sys.stderr)
+
+    table.to_csv(args.output)
+    for row in table.group_stats(["transformation"], "wall").rows():
+        print("{:<24} {:>8} jobs  wall {:.3f} s (+/- {:.3f})".format(row[0], row[1], row[2], row[3]))
+    print("{} jobs, {} bytes read, {} bytes written".format(
+        len(table), int(sum(table["bytes_read"])), int(sum(table["bytes_written"]))))
@@ -0,0 +1,134 @@
+"""Parsers for the makespan of a single run directory under ``log/``.
+
+Run directories are named ``<scenario>-<size>-<type>[-...]``, for instance
+``pegasus-16g-sleep-3``, where the scenario is one of ``pegasus``, ``decaf``
+or ``pmc``. Each scenario stores its makespan in a different file:
+
+- pegasus: total of the first ``keg`` line of ``statistics/breakdown.txt``
+- decaf: value after ``is`` on the third line of ``00/00/merge_cluster1.out``
+- pmc: ``Wall time`` reported in ``00/00/merge_cluster1.err.*``
+"""
+import os
+import re
+import glob
+from typing import List, NamedTuple, Optional, Tuple
+
+# Scenario labels used in summary.csv (and by plot.ipynb)
+SCENARIOS = {
+    "pegasus": "\\textsc{Vanilla}",
+    "decaf": "\\textsc{PegDecaf}",
+    "pmc": "\\textsc{PMC}",
+}
+
+UNITS = {"b": 1.0 / 1024**3, "k": 1.0 / 1024**2, "m": 1.0 / 1024, "g": 1.0, "t": 1024.0}
+
+NUMBER = re.compile(r"[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?")
+SIZE = re.compile(r"(\d+(\.\d*)?)([bkmgt]?)", re.IGNORECASE)
+DECAF_TIME = re.compile(r".*is (\S*)")
+PMC_TIME = re.compile(r".*Wall time: (\S*)")
+
+
+class RunResult(NamedTuple):
+    run: str
+    scenario: str
+    size: float
+    type: str
+    makespan: float
+
+
+def to_float(token: str) -> float:
+    match = NUMBER.match(token)
+    if match is None:
+        raise ValueError("not a number: {!r}".format(token))
+    return float(match.group(0))
+
+
+def parse_run_name(name: str) -> Tuple[str, float, str]:
+    """Split a run directory name into (scenario, size in GB, type)."""
+    parts = name.split("-")
+    if len(parts) < 3:
+        raise ValueError("run directory {} is not <scenario>-<size>-<type>".format(name))
+
+    scenario, size, run_type = parts[0], parts[1], parts[2]
+    if scenario not in SCENARIOS:
+        raise ValueError("scenario should be either pegasus, decaf or pmc, got {}".format(scenario))
+
+    match = SIZE.fullmatch(size)
+    if match is None:
+        raise ValueError("invalid data size {} in {}".format(size, name))
+    size_gb = float(match.group(1)) * UNITS[(match.group(3) or "g").lower()]
+    return scenario, size_gb, run_type
+
+
+def parse_pegasus_makespan(run_dir: str) -> float:
+    with open(os.path.join(run_dir, "statistics", "breakdown.txt")) as f:
+        for line in f:
+            if "keg" in line:
+                return to_float(line.split()[6])
+    raise ValueError("no keg entry in {}/statistics/breakdown.txt".format(run_dir))
+
+
+def parse_decaf_makespan(run_dir: str) -> float:
+    with open(os.path.join(run_dir, "00", "00", "merge_cluster1.out")) as f:
+        for number, line in enumerate(f, 1):
+            if number == 3:
+                match = DECAF_TIME.match(line)
+                if match:
+                    return to_float(match.group(1))
+                break
+    raise ValueError("no makespan on line 3 of {}/00/00/merge_cluster1.out".format(run_dir))
+
+
+def parse_pmc_makespan(run_dir: str) -> float:
+    makespan = None
+    # the last attempt is the one that counts
+    for path in sorted(glob.glob(os.path.join(run_dir, "00", "00", "merge_cluster1.err.*"))):
+        with open(path) as f:
+            for line in f:
+                match = PMC_TIME.match(line)
+                if match:
+                    makespan = to_float(match.group(1))
+    if makespan is None:
+        raise ValueError("no Wall time in {}/00/00/merge_cluster1.err.*".format(run_dir))
+    return makespan
+
+
+PARSERS = {
+    "pegasus": parse_pegasus_makespan,
+    "decaf": parse_decaf_makespan,
+    "pmc": parse_pmc_makespan,
+}
+
+
+# Files each parser reads, relative to the run directory
+SOURCES = {
+    "pegasus": [os.path.join("statistics", "breakdown.txt")],
+    "decaf": [os.path.join("00", "00", "merge_cluster1.out")],
+    "pmc": [os.path.join("00", "00", "merge_cluster1.err.*")],
+}
+
+
+def source_files(run_dir: str) -> List[str]:
+    """Files the makespan of ``run_dir`` is parsed from."""
+    name = os.path.basename(os.path.normpath(run_dir))
+    scenario = parse_run_name(name)[0]
+    files = []
+    for pattern in SOURCES[scenario]:
+        files.extend(sorted(glob.glob(os.path.join(run_dir, pattern))))
+    return files
+
+
+def parse_run_dir(run_dir: str) -> RunResult:
+    """Parse one run directory, raising ValueError or OSError on failure."""
+    name = os.path.basename(os.path.normpath(run_dir))
+    scenario, size, run_type = parse_run_name(name)
+    makespan = PARSERS[scenario](run_dir)
+    return RunResult(name, SCENARIOS[scenario], size, run_type, makespan)
+
+
+def try_parse_run_dir(run_dir: str) -> Tuple[Optional[RunResult], Optional[str]]:
+    # Worker entry point: errors are returned, not raised
+    try:
+        return parse_run_dir(run_dir), None
+    except (OSError, ValueError, IndexError) as e:
+        return None, "{}: {}".format(run_dir, e)
@@ -83,4 +83,6 @@ function generate_stats {
 # done
 # generate_decaf_runtime
 # generate_pmc_runtime
-generate_stats > ${stat_file}
\ No newline at end of file
+# generate_stats > ${stat_file}
+# Same parsing in a single pass, see analysis/summary.py
+cd "$(dirname "$0")/.." && python3 -m analysis.summary -l "analysis/${LOG_DIR}" -o "analysis/${stat_file}" -i analysis/summary-index.sqlite
\ No newline at end of file
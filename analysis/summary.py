@@ -0,0 +1,131 @@
+"""Build summary.csv from the run directories under ``log/``.
+
+Usage (from the repository root)::
+
+    python3 -m analysis.summary -l analysis/log -o analysis/summary.csv
+
+Parsed results are kept in an index (``summary-index.sqlite`` by default) so
+that regenerating the summary only parses new or modified run directories.
+"""
+import os
+import sys
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+from .index import ResultsIndex
+from .parse import try_parse_run_dir
+from .table import ResultsTable, SUMMARY_COLUMNS
+
+RESULT_COLUMNS = ["run", "scenario", "size", "type", "makespan"]
+GROUP_KEYS = ["scenario", "size", "type"]
+
+
+def run_dirs(log_dir: str) -> List[str]:
+    return sorted(
+        os.path.join(log_dir, name) for name in os.listdir(log_dir)
+        if os.path.isdir(os.path.join(log_dir, name))
+    )
+
+
+def collect(log_dir: str, workers: Optional[int] = None) -> Tuple[ResultsTable, List[str]]:
+    """Parse every run directory of ``log_dir`` with a pool of workers.
+
+    Parsing is dominated by small reads on a shared file system, so threads
+    are enough to overlap them. Returns the results and the parse errors.
+    """
+    table = ResultsTable(RESULT_COLUMNS, numeric=["size", "makespan"])
+    errors = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for result, error in pool.map(try_parse_run_dir, run_dirs(log_dir)):
+            if error:
+                errors.append(error)
+            else:
+                table.append(result)
+    return table, errors
+
+
+def collect_indexed(log_dir: str, index_path: str,
+                    workers: Optional[int] = None) -> Tuple[ResultsTable, List[str]]:
+    """Same as collect() but only parse the runs that changed since last time."""
+    with ResultsIndex(index_path) as index:
+        report = index.update(run_dirs(log_dir), workers)
+        print("{} runs parsed, {} unchanged, {} removed".format(*report))
+        return index.table(), index.errors()
+
+
+def write_summary(table: ResultsTable, path: str) -> None:
+    table.to_csv(path, SUMMARY_COLUMNS)
+
+
+def write_stats(table: ResultsTable, path: str) -> None:
+    stats = table.group_stats(GROUP_KEYS, "makespan")
+    headers = dict(SUMMARY_COLUMNS)
+    headers.update(count="Count", mean="Mean", std="Std", ci95_low="CI95 low", ci95_high="CI95 high")
+    stats.to_csv(path, headers)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Summarize io-synthetic run makespans")
+
+    parser.add_argument(
+        "-l",
+        "--log-dir",
+        metavar="STR",
+        type=str,
+        default="./log",
+        help="Directory holding one sub-directory per run (default: ./log)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="STR",
+        type=str,
+        default="summary.csv",
+        help="Summary file read by plot.ipynb (default: summary.csv)",
+    )
+    parser.add_argument(
+        "-s",
+        "--stats",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Also write mean, std and 95%% confidence interval per scenario/size/type",
+    )
+    parser.add_argument(
+        "-i",
+        "--index",
+        metavar="STR",
+        type=str,
+        default="summary-index.sqlite",
+        help="Index of already parsed runs (default: summary-index.sqlite)",
+    )
+    parser.add_argument(
+        "--no-index",
+        action="store_true",
+        help="Parse every run directory again and leave the index untouched",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        metavar="INT",
+        type=int,
+        default=None,
+        help="Number of parser threads",
+    )
+
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.log_dir):
+        parser.error("-l/--log-dir {} is not a directory".format(args.log_dir))
+
+    if args.no_index:
+        table, errors = collect(args.log_dir, args.workers)
+    else:
+        table, errors = collect_indexed(args.log_dir, args.index, args.workers)
+    for error in errors:
+        print("Warning: {}".format(error), file=sys.stderr)
+
+    write_summary(table, args.output)
+    if args.stats:
+        write_stats(table, args.stats)
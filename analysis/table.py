@@ -0,0 +1,112 @@
+"""Columnar table of run results and grouped statistics."""
+import csv
+import math
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Two-sided 95% Student t critical values by degrees of freedom
+T95 = [
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042,
+]
+
+# summary.csv columns, as read by plot.ipynb
+SUMMARY_COLUMNS = OrderedDict([
+    ("scenario", "Scenario"),
+    ("size", "File size (GB)"),
+    ("type", "Type"),
+    ("makespan", "Makespan"),
+])
+
+
+def t95(dof: int) -> float:
+    if dof < 1:
+        return float("nan")
+    if dof <= len(T95):
+        return T95[dof - 1]
+    return 1.960
+
+
+def format_number(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class ResultsTable(object):
+    """Results stored column by column.
+
+    Numeric columns are ``array('d')``, the others plain lists. Use
+    ``to_pandas()`` or ``to_numpy()`` to hand the table to the notebook.
+    """
+
+    def __init__(self, columns: Sequence[str], numeric: Sequence[str] = ()) -> None:
+        self.columns = OrderedDict()
+        for name in columns:
+            self.columns[name] = array("d") if name in numeric else []
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), []))
+
+    def __getitem__(self, name: str):
+        return self.columns[name]
+
+    def append(self, row: Sequence) -> None:
+        for column, value in zip(self.columns.values(), row):
+            column.append(value)
+
+    def extend(self, rows: Iterable[Sequence]) -> None:
+        for row in rows:
+            self.append(row)
+
+    @classmethod
+    def from_rows(cls, columns: Sequence[str], rows: Iterable[Sequence],
+                  numeric: Sequence[str] = ()) -> "ResultsTable":
+        table = cls(columns, numeric)
+        table.extend(rows)
+        return table
+
+    def rows(self) -> Iterable[Tuple]:
+        return zip(*self.columns.values())
+
+    def sort(self, *keys: str) -> None:
+        order = sorted(range(len(self)), key=lambda i: tuple(self.columns[k][i] for k in keys))
+        for name, column in self.columns.items():
+            values = [column[i] for i in order]
+            self.columns[name] = array("d", values) if isinstance(column, array) else values
+
+    def group_stats(self, keys: Sequence[str], value: str) -> "ResultsTable":
+        """Count, mean, sample std and 95% confidence interval per group."""
+        groups = OrderedDict()
+        for i, x in enumerate(self.columns[value]):
+            groups.setdefault(tuple(self.columns[k][i] for k in keys), []).append(x)
+
+        stats = ResultsTable(list(keys) + ["count", "mean", "std", "ci95_low", "ci95_high"],
+                             numeric=["mean", "std", "ci95_low", "ci95_high"])
+        for group in sorted(groups):
+            values = groups[group]
+            n = len(values)
+            mean = math.fsum(values) / n
+            std = math.sqrt(math.fsum((x - mean) ** 2 for x in values) / (n - 1)) if n > 1 else 0.0
+            half = t95(n - 1) * std / math.sqrt(n) if n > 1 else 0.0
+            stats.append(list(group) + [n, mean, std, mean - half, mean + half])
+        return stats
+
+    def to_csv(self, path: str, headers: Optional[Dict[str, str]] = None) -> None:
+        headers = headers or {}
+        names = [name for name in self.columns if not headers or name in headers]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f, lineterminator="\n")
+            writer.writerow([headers.get(name, name) for name in names])
+            for row in zip(*(self.columns[name] for name in names)):
+                writer.writerow([format_number(v) for v in row])
+
+    def to_numpy(self) -> Dict[str, "numpy.ndarray"]:
+        import numpy
+        return {name: numpy.asarray(column) for name, column in self.columns.items()}
+
+    def to_pandas(self) -> "pandas.DataFrame":
+        import pandas
+        return pandas.DataFrame({name: list(column) for name, column in self.columns.items()})
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import resource
+import tempfile
+import itertools
+import subprocess
+from datetime import datetime
+from argparse import ArgumentParser, SUPPRESS
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUBS = os.path.join(ROOT, "benchmarks", "stubs", "bin")
+BASELINE = os.path.join(ROOT, "benchmarks", "generation-baseline.json")
+
+SHAPES = ["chain", "new_chain", "fork", "tree", "decaf", "pmc", "custom"]
+NUMBER_JOBS = [10, 100, 1000, 10000, 100000]
+METRICS = ["wall", "peak_rss_kb"]
+
+
+def stub_env() -> Dict[str, str]:
+    """Environment where pegasus-config and pegasus-plan are the local stubs."""
+    env = dict(os.environ)
+    env["PATH"] = STUBS + os.pathsep + env.get("PATH", "")
+    return env
+
+
+def case_name(shape: str, number_jobs: int, stream: bool,
+              partition_size: Optional[int] = None) -> str:
+    return "{}-n{}{}{}".format(shape, number_jobs, "-stream" if stream else "",
+                               "-p{}".format(partition_size) if partition_size else "")
+
+
+# --- Worker (one fresh interpreter per case) ---------------------------------
+def measure_case(shape: str, number_jobs: int, stream: bool, plan: bool,
+                 work_dir: str, custom_input: Optional[str] = None,
+                 partition_size: Optional[int] = None) -> Dict:
+    sys.path.insert(0, ROOT)
+    from workflow import IOSyntheticWorkflow
+
+    # Pegasus logs every job added at INFO level
+    logging.getLogger().setLevel(logging.WARNING)
+
+    phases = {}
+
+    def run_phase(name, step):
+        start = time.perf_counter()
+        step()
+        phases[name] = {
+            "wall": time.perf_counter() - start,
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+    state = {}
+
+    def construct():
+        wf = IOSyntheticWorkflow(
+            shape=(shape, custom_input if shape == "custom" else number_jobs),
+            files_size=[1.0],
+            waiting_time=[0.0],
+            stream=stream,
+            wf_dir=work_dir,
+            use_cache=False,
+            partition_size=partition_size
+        )
+        wf.create_sites_catalog()
+        wf.create_pegasus_properties()
+        wf.create_transformation_catalog()
+        wf.create_replica_catalog(None)
+        state["wf"] = wf
+
+    run_phase("catalogs", construct)
+    wf = state["wf"]
+    run_phase("parse" if shape == "custom" else "dag", wf.create_workflow)
+    run_phase("write", lambda: wf.write(work_dir))
+    phases["write"]["output_bytes"] = os.path.getsize(wf.wf_path)
+    if plan:
+        run_phase("plan", lambda: wf.run("run"))
+
+    return phases
+
+
+# --- Driver ------------------------------------------------------------------
+def prepare_custom_input(number_jobs: int, tmp_dir: str) -> str:
+    """Write a new_chain workflow of ``number_jobs`` jobs to feed custom."""
+    path = os.path.join(tmp_dir, "custom-input-n{}".format(number_jobs))
+    if not os.path.exists(os.path.join(path, "workflow.yml")):
+        subprocess.run(
+            [sys.executable, __file__, "--case", "new_chain", str(number_jobs),
+             "--stream", "--no-plan", "--work-dir", path],
+            cwd=ROOT, env=stub_env(), check=True, stdout=subprocess.DEVNULL)
+    return os.path.join(path, "workflow.yml")
+
+
+def run_case(shape: str, number_jobs: int, stream: bool, plan: bool,
+             tmp_dir: str, partition_size: Optional[int] = None) -> Dict:
+    cmd = [sys.executable, __file__, "--case", shape, str(number_jobs)]
+    if stream:
+        cmd.append("--stream")
+    if partition_size:
+        cmd.extend(["--partition-size", str(partition_size)])
+    if not plan:
+        cmd.append("--no-plan")
+    if shape == "custom":
+        cmd.extend(["--custom-input", prepare_custom_input(number_jobs, tmp_dir)])
+
+    work_dir = tempfile.mkdtemp(prefix=case_name(shape, number_jobs, stream, partition_size) + "-", dir=tmp_dir)
+    cmd.extend(["--work-dir", work_dir])
+    try:
+        out = subprocess.run(cmd, cwd=ROOT, env=stub_env(),
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if out.returncode != 0:
+            return {"error": out.stderr.decode().strip().splitlines()[-1]}
+        return json.loads(out.stdout.decode().splitlines()[-1])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def best_of(samples: List[Dict]) -> Dict:
+    """Keep the fastest and smallest value of each metric across repeats."""
+    if any("error" in sample for sample in samples):
+        return samples[0]
+    best = {}
+    for phase in samples[0]:
+        best[phase] = {}
+        for metric in samples[0][phase]:
+            best[phase][metric] = min(sample[phase][metric] for sample in samples)
+    return best
+
+
+def compare(results: Dict, baseline: Dict, threshold: float, min_time: float) -> List[str]:
+    """Regressions of ``results`` beyond ``threshold`` (relative) of ``baseline``."""
+    regressions = []
+    for case, phases in results.items():
+        if case not in baseline or "error" in phases or "error" in baseline[case]:
+            continue
+        for phase, metrics in phases.items():
+            reference = baseline[case].get(phase, {})
+            for metric in METRICS + ["output_bytes"]:
+                if metric not in metrics or metric not in reference:
+                    continue
+                if metric == "wall" and reference[metric] < min_time:
+                    continue
+                if metrics[metric] > reference[metric] * (1 + threshold):
+                    regressions.append("{} {} {}: {:.6g} -> {:.6g} (+{:.0%})".format(
+                        case, phase, metric, reference[metric], metrics[metric],
+                        metrics[metric] / reference[metric] - 1 if reference[metric] else 0))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Measure IOSyntheticWorkflow generation time and memory")
+
+    parser.add_argument(
+        "-c",
+        "--workflow-class",
+        metavar="STR",
+        nargs="+",
+        default=SHAPES,
+        help="Workflow structures to measure (default: all)",
+    )
+    parser.add_argument(
+        "-n",
+        "--number-jobs",
+        metavar="INT",
+        type=int,
+        nargs="+",
+        default=NUMBER_JOBS,
+        help="Numbers of jobs (default: 10 to 100000)",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        metavar="INT",
+        type=int,
+        default=1,
+        help="Number of runs per case, the best one is kept (default: 1)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Measure streaming generation instead of the Workflow objects",
+    )
+    parser.add_argument(
+        "-p",
+        "--partition-size",
+        metavar="INT",
+        type=int,
+        nargs="+",
+        default=[None],
+        help="Jobs per sub-workflow, 0 for a flat workflow, e.g. 0 5000 to compare both (default: flat)",
+    )
+    parser.add_argument(
+        "--no-plan",
+        action="store_true",
+        help="Do not measure run() against the stub pegasus-plan",
+    )
+    parser.add_argument(
+        "-b",
+        "--baseline",
+        metavar="STR",
+        type=str,
+        default=BASELINE,
+        help="Baseline to compare with (default: benchmarks/generation-baseline.json)",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="Store these results as the new baseline",
+    )
+    parser.add_argument(
+        "--threshold",
+        metavar="FLOAT",
+        type=float,
+        default=0.25,
+        help="Relative increase reported as a regression (default: 0.25)",
+    )
+    parser.add_argument(
+        "--min-time",
+        metavar="FLOAT",
+        type=float,
+        default=0.05,
+        help="Ignore timings below this many seconds in the baseline (default: 0.05)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Also write the results to this JSON file",
+    )
+    # Internal: measure a single case in this interpreter
+    parser.add_argument("--case", nargs=2, metavar=("SHAPE", "N"), help=SUPPRESS)
+    parser.add_argument("--custom-input", help=SUPPRESS)
+    parser.add_argument("--work-dir", help=SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.case:
+        os.makedirs(args.work_dir, exist_ok=True)
+        phases = measure_case(args.case[0], int(args.case[1]), args.stream, not args.no_plan,
+                              args.work_dir, args.custom_input, args.partition_size[0] or None)
+        print(json.dumps(phases))
+        sys.exit(0)
+
+    for shape in args.workflow_class:
+        if shape not in SHAPES:
+            parser.error('-c/--workflow-class can only contain {}.'.format(", ".join(SHAPES)))
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="io-synthetic-bench-") as tmp_dir:
+        for shape in args.workflow_class:
+            for number_jobs, partition_size in itertools.product(args.number_jobs, args.partition_size):
+                partition_size = partition_size or None
+                name = case_name(shape, number_jobs, args.stream, partition_size)
+                samples = [run_case(shape, number_jobs, args.stream, not args.no_plan, tmp_dir, partition_size)
+                           for _ in range(args.repeat)]
+                results[name] = best_of(samples)
+                if "error" in results[name]:
+                    print("{:<24} error: {}".format(name, results[name]["error"]))
+                    continue
+                print("{:<24} {}".format(name, "  ".join(
+                    "{} {:.3f}s {:.0f}MB".format(phase, m["wall"], m["peak_rss_kb"] / 1024)
+                    for phase, m in results[name].items())))
+
+    record = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "cases": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(record, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {"cases": {}}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update({k: v for k, v in record.items() if k != "cases"})
+        baseline["cases"].update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print("Baseline written to {}".format(args.baseline))
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print("No baseline in {}, run with --save-baseline to create it".format(args.baseline))
+        sys.exit(0)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline["cases"], args.threshold, args.min_time)
+    for regression in regressions:
+        print("Regression: {}".format(regression))
+    if regressions:
+        sys.exit(1)
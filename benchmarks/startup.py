@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import statistics
+import subprocess
+from datetime import datetime
+from argparse import ArgumentParser
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORKFLOW = os.path.join(ROOT, "workflow.py")
+
+# Each scenario runs in a fresh interpreter, exactly like a scripted call
+SCENARIOS = {
+    "help": [WORKFLOW, "-h"],
+    "invalid-class": [WORKFLOW, "-c", "unknown"],
+    "invalid-jobs": [WORKFLOW, "-c", "chain", "-n", "0"],
+    "import": ["-c", "import workflow"],
+    "import-pegasus": ["-c", "import workflow; workflow.load_pegasus()"],
+}
+
+
+def measure(args: List[str], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=ROOT,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - start)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "max": max(samples),
+    }
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        return out.stdout.decode().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Measure workflow.py startup time")
+
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        metavar="INT",
+        type=int,
+        default=10,
+        help="Number of runs per scenario (default: 10)",
+    )
+    parser.add_argument(
+        "-o",
+        "--history",
+        metavar="STR",
+        type=str,
+        default=os.path.join(ROOT, "benchmarks", "startup-history.jsonl"),
+        help="JSON lines file the measurement is appended to (default: benchmarks/startup-history.jsonl)",
+    )
+
+    args = parser.parse_args()
+
+    record = {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "scenarios": {},
+    }
+    for name, cmd in SCENARIOS.items():
+        record["scenarios"][name] = measure(cmd, args.repeat)
+        print("{:<16} median {:8.1f} ms   min {:8.1f} ms".format(
+            name, 1000 * record["scenarios"][name]["median"],
+            1000 * record["scenarios"][name]["min"]))
+
+    with open(args.history, "a") as f:
+        f.write(json.dumps(record) + "\n")
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from argparse import ArgumentParser
+from typing import Callable, Dict, List, Optional, Tuple
+
+from workflow import IOSyntheticError
+from analysis.parse import try_parse_run_dir
+from analysis.summary import collect_indexed, write_summary
+
+# Final states of a run, the others being "pending", "planning" and "running"
+DONE = ["success", "failure", "plan_failed", "timeout", "planned"]
+
+
+# --- Pegasus commands --------------------------------------------------------
+def plan_argv(plan: Dict, workflow: str, relative_dir: str, submit: bool) -> List[str]:
+    """pegasus-plan arguments from IOSyntheticWorkflow.plan_args()."""
+    argv = ["--conf", plan["conf"], "--dir", plan["dir"], "--relative-dir", relative_dir,
+            "--sites", ",".join(plan["sites"]), "--output-sites", ",".join(plan["output_sites"]),
+            "--output-dir", plan["output_dir"], "--cleanup", plan["cleanup"]]
+    if plan.get("force"):
+        argv.append("--force")
+    if submit:
+        argv.append("--submit")
+    if plan.get("cluster"):
+        argv.extend(("--cluster", ",".join(plan["cluster"])))
+    return argv + [workflow, "--json"]
+
+
+class PegasusCLI(object):
+    """Pegasus commands of a campaign, run as asyncio subprocesses.
+
+    ``bin_dir`` tells where they are, ``benchmarks/stubs/bin`` standing in
+    for a local planner and scheduler. Any object with the same plan(),
+    status() and statistics() coroutines can replace it.
+    """
+
+    def __init__(self, bin_dir: Optional[str] = None) -> None:
+        self.bin_dir = bin_dir
+
+    async def run(self, name: str, *args: str) -> Tuple[int, str, str]:
+        command = os.path.join(self.bin_dir, name) if self.bin_dir else name
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                command, *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        except OSError as e:
+            return 127, "", "{}: {}".format(command, e)
+        out, err = await proc.communicate()
+        return proc.returncode, out.decode(errors="replace"), err.decode(errors="replace")
+
+    async def plan(self, plan: Dict, workflow: str, relative_dir: str, submit: bool) -> str:
+        """Plan (and submit) a workflow, returning its submit directory."""
+        code, out, err = await self.run("pegasus-plan", *plan_argv(plan, workflow, relative_dir, submit))
+        if code != 0:
+            lines = (err or out).strip().splitlines()
+            raise IOSyntheticError("pegasus-plan exited with {}: {}".format(code, lines[-1] if lines else ""))
+        try:
+            return json.loads(out[out.index("{"):])["submit_dir"]
+        except (ValueError, KeyError) as e:
+            raise IOSyntheticError("pegasus-plan gave no submit directory: {}".format(e)) from e
+
+    async def status(self, submit_dir: str) -> Optional[str]:
+        """State of the root workflow (Running, Success or Failure), None if unknown."""
+        code, out, _ = await self.run("pegasus-status", "--jsonrv", submit_dir)
+        if code != 0:
+            return None
+        try:
+            return json.loads(out)["dags"]["root"]["state"]
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    async def statistics(self, submit_dir: str) -> Optional[str]:
+        """Write the statistics of a finished workflow, returning an error if any."""
+        code, out, err = await self.run("pegasus-statistics", "-s", "all", submit_dir)
+        if code != 0:
+            lines = (err or out).strip().splitlines()
+            return "pegasus-statistics exited with {}: {}".format(code, lines[-1] if lines else "")
+        return None
+
+
+# --- Runs --------------------------------------------------------------------
+def run_name(variant: Dict, repeat: int) -> str:
+    """Name analysis.parse understands, <scenario>-<size>-<type>, then the
+    variant and the repeat."""
+    scenario = variant["shape"] if variant["shape"] in ["decaf", "pmc"] else "pegasus"
+    run_type = "sleep" if variant["waiting_time"] > 0 else "nosleep"
+    return "{}-{:g}{}-{}-{}-{}".format(scenario, variant["files_size"], variant["size_unit"].lower(),
+                                       run_type, variant["name"], repeat)
+
+
+def build_runs(manifests: List[str], repeat: int) -> List[Dict]:
+    """``repeat`` runs of every variant generated by the sweeps."""
+    runs = []
+    for path in manifests:
+        with open(path) as f:
+            manifest = json.load(f)
+        for variant in manifest["variants"]:
+            if variant["status"] != "ok":
+                continue
+            if "plan" not in variant:
+                raise IOSyntheticError("{} has no planner arguments, generate it again with sweep.py".format(path))
+            for k in range(1, repeat + 1):
+                runs.append(OrderedDict([
+                    ("name", run_name(variant, k)),
+                    ("variant", variant["name"]),
+                    ("workflow", variant["workflow"]),
+                    ("plan", variant["plan"]),
+                    ("relative_dir", "run{:04d}".format(k)),
+                    ("state", "pending"),
+                    ("attempts", 0),
+                    ("submit_dir", None),
+                    ("makespan", None),
+                    ("error", None),
+                ]))
+    return runs
+
+
+def link_run(submit_dir: str, log_dir: str, name: str) -> str:
+    """Make a finished run visible to analysis.summary under ``log_dir``."""
+    os.makedirs(log_dir, exist_ok=True)
+    path = os.path.join(log_dir, name)
+    if os.path.islink(path):
+        os.remove(path)
+    os.symlink(os.path.abspath(submit_dir), path)
+    return path
+
+
+async def execute(run: Dict, cli, log_dir: str, submit: bool, retries: int,
+                  retry_delay: float, poll_interval: float, timeout: Optional[float],
+                  unknown_limit: int) -> None:
+    """Plan a run, retrying failed plans with exponential backoff, then poll
+    it until it finishes and collect its statistics and makespan. A run whose
+    state is unknown ``unknown_limit`` times in a row has failed."""
+    run["state"] = "planning"
+    for attempt in range(retries + 1):
+        run["attempts"] = attempt + 1
+        try:
+            run["submit_dir"] = await cli.plan(run["plan"], run["workflow"], run["relative_dir"], submit)
+            run["error"] = None
+            break
+        except IOSyntheticError as e:
+            run["error"] = str(e)
+            if attempt < retries:
+                await asyncio.sleep(retry_delay * 2 ** attempt)
+    if run["submit_dir"] is None:
+        run["state"] = "plan_failed"
+        return
+    if not submit:
+        run["state"] = "planned"
+        return
+
+    run["state"] = "running"
+    run["started"] = time.time()
+    unknown = 0
+    while True:
+        state = await cli.status(run["submit_dir"])
+        if state in ["Success", "Failure"]:
+            break
+        unknown = unknown + 1 if state is None else 0
+        if unknown >= unknown_limit:
+            run["state"] = "failure"
+            run["error"] = "pegasus-status gave no state {} times in a row".format(unknown)
+            return
+        if timeout is not None and time.time() - run["started"] > timeout:
+            run["state"] = "timeout"
+            run["error"] = "still running after {:g} s".format(timeout)
+            return
+        await asyncio.sleep(poll_interval)
+    run["finished"] = time.time()
+
+    run["state"] = state.lower()
+    run["error"] = await cli.statistics(run["submit_dir"])
+    if run["state"] == "success":
+        result, error = try_parse_run_dir(link_run(run["submit_dir"], log_dir, run["name"]))
+        if result is not None:
+            run["makespan"] = result.makespan
+        else:
+            run["error"] = error
+
+
+async def run_campaign(runs: List[Dict], cli, log_dir: str,
+                       concurrency: int = 4,
+                       submit: bool = True,
+                       retries: int = 2,
+                       retry_delay: float = 30.0,
+                       poll_interval: float = 60.0,
+                       timeout: Optional[float] = None,
+                       unknown_limit: int = 10,
+                       on_done: Optional[Callable[[Dict], None]] = None) -> None:
+    """Run at most ``concurrency`` workflows at once. Repeats of a variant
+    share its output directory, so they run one after the other."""
+    slots = asyncio.Semaphore(concurrency)
+    chains = OrderedDict()
+    for run in runs:
+        chains.setdefault(run["variant"], []).append(run)
+
+    async def run_chain(chain: List[Dict]) -> None:
+        for run in chain:
+            if run["state"] in DONE:
+                continue
+            async with slots:
+                await execute(run, cli, log_dir, submit, retries, retry_delay, poll_interval, timeout,
+                              unknown_limit)
+            if on_done is not None:
+                on_done(run)
+
+    await asyncio.gather(*(run_chain(chain) for chain in chains.values()))
+
+
+def resume(runs: List[Dict], path: str) -> int:
+    """Keep the successful runs of a previous campaign state file."""
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        previous = {run["name"]: run for run in json.load(f)["runs"]}
+    kept = 0
+    for i, run in enumerate(runs):
+        if previous.get(run["name"], {}).get("state") == "success":
+            runs[i] = previous[run["name"]]
+            kept += 1
+    return kept
+
+
+def write_state(runs: List[Dict], path: str) -> Dict:
+    states = OrderedDict()
+    for run in runs:
+        states[run["state"]] = states.get(run["state"], 0) + 1
+    state = {
+        "updated": datetime.now().isoformat(),
+        "total": len(runs),
+        "states": states,
+        "runs": runs,
+    }
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+    return state
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Plan, submit and monitor the variants of sweeps as one campaign")
+
+    parser.add_argument(
+        "-m",
+        "--manifest",
+        metavar="STR",
+        nargs="+",
+        required=True,
+        help="manifest.json of the sweeps to run",
+    )
+    parser.add_argument(
+        "-r",
+        "--repeat",
+        metavar="INT",
+        type=int,
+        default=1,
+        help="Number of runs of every variant (default: 1)",
+    )
+    parser.add_argument(
+        "-j",
+        "--concurrency",
+        metavar="INT",
+        type=int,
+        default=4,
+        help="Number of workflows planned or running at once (default: 4)",
+    )
+    parser.add_argument(
+        "--retries",
+        metavar="INT",
+        type=int,
+        default=2,
+        help="Number of times a failed plan is tried again (default: 2)",
+    )
+    parser.add_argument(
+        "--retry-delay",
+        metavar="FLOAT",
+        type=float,
+        default=30.0,
+        help="Seconds before the first retry, doubled at each retry (default: 30)",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        metavar="FLOAT",
+        type=float,
+        default=60.0,
+        help="Seconds between two pegasus-status of a workflow (default: 60)",
+    )
+    parser.add_argument(
+        "--timeout",
+        metavar="FLOAT",
+        type=float,
+        default=None,
+        help="Seconds after which a running workflow is given up on (default: none)",
+    )
+    parser.add_argument(
+        "--max-unknown",
+        metavar="INT",
+        type=int,
+        default=10,
+        help="Number of pegasus-status in a row without a state after which a workflow has failed (default: 10)",
+    )
+    parser.add_argument(
+        "--no-submit",
+        action="store_true",
+        help="Only plan the workflows",
+    )
+    parser.add_argument(
+        "--pegasus-bin",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Directory of pegasus-plan, pegasus-status and pegasus-statistics, "
+             "e.g. benchmarks/stubs/bin to try a campaign locally (default: PATH)",
+    )
+    parser.add_argument(
+        "-l",
+        "--log-dir",
+        metavar="STR",
+        type=str,
+        default="./log",
+        help="Directory successful runs are linked into, as read by analysis.summary (default: ./log)",
+    )
+    parser.add_argument(
+        "-i",
+        "--index",
+        metavar="STR",
+        type=str,
+        default="summary-index.sqlite",
+        help="Index of parsed runs updated at the end (default: summary-index.sqlite)",
+    )
+    parser.add_argument(
+        "-s",
+        "--summary",
+        metavar="STR",
+        type=str,
+        default="summary.csv",
+        help="Summary rebuilt from the log directory at the end (default: summary.csv)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Campaign state, successful runs in it are not run again (default: campaign.json next to the first manifest)",
+    )
+
+    args = parser.parse_args()
+
+    for path in args.manifest:
+        if not os.path.isfile(path):
+            parser.error("-m/--manifest {} is not a file".format(path))
+
+    if args.repeat < 1:
+        parser.error("-r/--repeat must be >=1.")
+
+    if args.concurrency < 1:
+        parser.error("-j/--concurrency must be >=1.")
+
+    if args.retries < 0:
+        parser.error("--retries must be >=0.")
+
+    if args.max_unknown < 1:
+        parser.error("--max-unknown must be >=1.")
+
+    try:
+        runs = build_runs(args.manifest, args.repeat)
+    except IOSyntheticError as e:
+        parser.error(str(e))
+
+    output = args.output or os.path.join(os.path.dirname(args.manifest[0]), "campaign.json")
+    kept = resume(runs, output)
+    if kept:
+        print("{} successful runs kept from {}".format(kept, output))
+
+    def on_done(run: Dict) -> None:
+        print("[{}] {}{}".format(run["state"], run["name"],
+                                 " {:.3f} s".format(run["makespan"]) if run["makespan"] is not None else
+                                 " ({})".format(run["error"]) if run["error"] else ""))
+        write_state(runs, output)
+
+    asyncio.run(run_campaign(
+        runs, PegasusCLI(args.pegasus_bin), args.log_dir,
+        concurrency=args.concurrency,
+        submit=not args.no_submit,
+        retries=args.retries,
+        retry_delay=args.retry_delay,
+        poll_interval=args.poll_interval,
+        timeout=args.timeout,
+        unknown_limit=args.max_unknown,
+        on_done=on_done
+    ))
+    state = write_state(runs, output)
+
+    if os.path.isdir(args.log_dir):
+        table, errors = collect_indexed(args.log_dir, args.index)
+        for error in errors:
+            print("Warning: {}".format(error), file=sys.stderr)
+        write_summary(table, args.summary)
+
+    print("{} runs: {}, state in {}".format(
+        state["total"], ", ".join("{} {}".format(n, s) for s, n in state["states"].items()), output))
+
+    if any(run["state"] not in ["success", "planned"] for run in runs):
+        sys.exit(1)
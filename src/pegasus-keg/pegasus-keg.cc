@@ -19,6 +19,10 @@
 #include <net/if.h>
 #include <netdb.h>
 #include <sys/mman.h>
+#include <pthread.h>
+#ifdef LINUX
+#include <sys/sendfile.h>
+#endif
 
 #ifdef HAS_SYS_SOCKIO
 #include <sys/sockio.h>
@@ -119,6 +123,269 @@ now( void )
     return ( now.tv_sec + now.tv_usec / 1E6 );
 }
 
+double
+monotonic( void )
+// purpose: read a clock suitable for measuring durations
+// returns: seconds since an arbitrary point in nanosecond resolution
+{
+    struct timespec ts;
+    clock_gettime( CLOCK_MONOTONIC, &ts );
+    return ( ts.tv_sec + ts.tv_nsec / 1E9 );
+}
+
+enum { PHASE_READ, PHASE_WRITE, PHASE_SPIN, PHASE_SLEEP, PHASES };
+
+struct PhaseStats
+// purpose: what a phase cost, reported by identify()
+{
+    double wall;                  // seconds spent in the phase
+    unsigned long long bytes;     // bytes read (PHASE 1) or written (PHASE 2)
+    unsigned long files;          // files opened
+    double open;                  // seconds spent opening files
+    double close;                 // seconds spent closing (and syncing) files
+};
+
+static PhaseStats phase_stats[PHASES];
+static const char *phase_names[PHASES] = { "read", "write", "spin", "sleep" };
+
+enum DigestKind
+// purpose: checksum of the inputs and outputs, see -K
+{
+    DIGEST_NONE,
+    DIGEST_SHA256,    // what Pegasus integrity checking uses
+    DIGEST_XXH64,     // non-cryptographic, several times faster
+    DIGESTS
+};
+
+static const char *digest_names[DIGESTS] = { "none", "sha256", "xxh64" };
+
+// hex digits of the longest digest, and its terminating NUL
+static const size_t DIGEST_HEX = 65;
+
+struct Digest
+// purpose: running checksum of the bytes of a file, in file order
+{
+    int kind;
+    unsigned long long length;     // bytes hashed so far
+    unsigned int h[8];             // sha256 state
+    unsigned long long v[4];       // xxh64 accumulators
+    unsigned char pending[64];     // bytes waiting for a full block (64) or stripe (32)
+    size_t npending;
+};
+
+// -K checksum, and the digests of the inputs and outputs once known
+static int digest_kind = DIGEST_NONE;
+static char *input_digests = NULL;
+static char *output_digests = NULL;
+// -k inputs, not written by a keg, which have no sidecar to be verified against
+static DirtyVector external_inputs;
+
+static const unsigned int sha256_k[64] =
+{
+    0x428a2f98, 0x71374491, 0xb5c0fbcf, 0xe9b5dba5, 0x3956c25b, 0x59f111f1, 0x923f82a4, 0xab1c5ed5,
+    0xd807aa98, 0x12835b01, 0x243185be, 0x550c7dc3, 0x72be5d74, 0x80deb1fe, 0x9bdc06a7, 0xc19bf174,
+    0xe49b69c1, 0xefbe4786, 0x0fc19dc6, 0x240ca1cc, 0x2de92c6f, 0x4a7484aa, 0x5cb0a9dc, 0x76f988da,
+    0x983e5152, 0xa831c66d, 0xb00327c8, 0xbf597fc7, 0xc6e00bf3, 0xd5a79147, 0x06ca6351, 0x14292967,
+    0x27b70a85, 0x2e1b2138, 0x4d2c6dfc, 0x53380d13, 0x650a7354, 0x766a0abb, 0x81c2c92e, 0x92722c85,
+    0xa2bfe8a1, 0xa81a664b, 0xc24b8b70, 0xc76c51a3, 0xd192e819, 0xd6990624, 0xf40e3585, 0x106aa070,
+    0x19a4c116, 0x1e376c08, 0x2748774c, 0x34b0bcb5, 0x391c0cb3, 0x4ed8aa4a, 0x5b9cca4f, 0x682e6ff3,
+    0x748f82ee, 0x78a5636f, 0x84c87814, 0x8cc70208, 0x90befffa, 0xa4506ceb, 0xbef9a3f7, 0xc67178f2
+};
+
+static const unsigned long long XXH_P1 = 11400714785074694791ull;
+static const unsigned long long XXH_P2 = 14029467366897019727ull;
+static const unsigned long long XXH_P3 = 1609587929392839161ull;
+static const unsigned long long XXH_P4 = 9650029242287828579ull;
+static const unsigned long long XXH_P5 = 2870177450012600261ull;
+
+static inline unsigned int
+ror32( unsigned int x, int n )
+{
+    return ( x >> n ) | ( x << (32 - n) );
+}
+
+static inline unsigned long long
+rol64( unsigned long long x, int n )
+{
+    return ( x << n ) | ( x >> (64 - n) );
+}
+
+static inline unsigned long long
+read64le( const unsigned char *p )
+{
+    unsigned long long x;
+    memcpy( &x, p, sizeof(x) );
+#if defined(__BYTE_ORDER__) && __BYTE_ORDER__ == __ORDER_BIG_ENDIAN__
+    x = __builtin_bswap64( x );
+#endif
+    return x;
+}
+
+static inline unsigned int
+read32be( const unsigned char *p )
+{
+    unsigned int x;
+    memcpy( &x, p, sizeof(x) );
+#if defined(__BYTE_ORDER__) && __BYTE_ORDER__ == __ORDER_LITTLE_ENDIAN__
+    x = __builtin_bswap32( x );
+#endif
+    return x;
+}
+
+static void
+sha256_block( unsigned int h[8], const unsigned char *p )
+// purpose: compress one 64 bytes block into the state
+{
+    unsigned int w[64];
+    for ( int i = 0; i < 16; i++ ) w[i] = read32be( p + 4*i );
+    for ( int i = 16; i < 64; i++ )
+    {
+        unsigned int s0 = ror32( w[i-15], 7 ) ^ ror32( w[i-15], 18 ) ^ ( w[i-15] >> 3 );
+        unsigned int s1 = ror32( w[i-2], 17 ) ^ ror32( w[i-2], 19 ) ^ ( w[i-2] >> 10 );
+        w[i] = w[i-16] + s0 + w[i-7] + s1;
+    }
+
+    unsigned int a = h[0], b = h[1], c = h[2], d = h[3];
+    unsigned int e = h[4], f = h[5], g = h[6], k = h[7];
+    for ( int i = 0; i < 64; i++ )
+    {
+        unsigned int t1 = k + ( ror32( e, 6 ) ^ ror32( e, 11 ) ^ ror32( e, 25 ) ) +
+                          ( ( e & f ) ^ ( ~e & g ) ) + sha256_k[i] + w[i];
+        unsigned int t2 = ( ror32( a, 2 ) ^ ror32( a, 13 ) ^ ror32( a, 22 ) ) +
+                          ( ( a & b ) ^ ( a & c ) ^ ( b & c ) );
+        k = g; g = f; f = e; e = d + t1;
+        d = c; c = b; b = a; a = t1 + t2;
+    }
+    h[0] += a; h[1] += b; h[2] += c; h[3] += d;
+    h[4] += e; h[5] += f; h[6] += g; h[7] += k;
+}
+
+static inline unsigned long long
+xxh64_round( unsigned long long acc, unsigned long long input )
+{
+    return rol64( acc + input * XXH_P2, 31 ) * XXH_P1;
+}
+
+static void
+xxh64_stripe( unsigned long long v[4], const unsigned char *p )
+// purpose: mix one 32 bytes stripe into the accumulators
+{
+    for ( int i = 0; i < 4; i++ ) v[i] = xxh64_round( v[i], read64le( p + 8*i ) );
+}
+
+void
+digest_init( Digest &digest, int kind )
+{
+    static const unsigned int sha256_h[8] =
+    {
+        0x6a09e667, 0xbb67ae85, 0x3c6ef372, 0xa54ff53a, 0x510e527f, 0x9b05688c, 0x1f83d9ab, 0x5be0cd19
+    };
+
+    memset( &digest, 0, sizeof(digest) );
+    digest.kind = kind;
+    memcpy( digest.h, sha256_h, sizeof(sha256_h) );
+    // seed 0
+    digest.v[0] = XXH_P1 + XXH_P2;
+    digest.v[1] = XXH_P2;
+    digest.v[2] = 0;
+    digest.v[3] = 0 - XXH_P1;
+}
+
+void
+digest_update( Digest &digest, const void *data, size_t size )
+/* purpose: hash the next 'size' bytes of the file
+ * paramtr: digest (IO): state initialized by digest_init, DIGEST_NONE does nothing
+ *          data (IN): bytes following those already hashed */
+{
+    if ( digest.kind == DIGEST_NONE || size == 0 ) return;
+
+    const unsigned char *p = static_cast<const unsigned char *>( data );
+    size_t unit = ( digest.kind == DIGEST_SHA256 ) ? 64 : 32;
+    digest.length += size;
+
+    if ( digest.npending > 0 )
+    {
+        size_t take = ( unit - digest.npending < size ) ? unit - digest.npending : size;
+        memcpy( digest.pending + digest.npending, p, take );
+        digest.npending += take;
+        p += take;
+        size -= take;
+        if ( digest.npending < unit ) return;
+        if ( digest.kind == DIGEST_SHA256 ) sha256_block( digest.h, digest.pending );
+        else xxh64_stripe( digest.v, digest.pending );
+        digest.npending = 0;
+    }
+
+    for ( ; size >= unit; p += unit, size -= unit )
+    {
+        if ( digest.kind == DIGEST_SHA256 ) sha256_block( digest.h, p );
+        else xxh64_stripe( digest.v, p );
+    }
+
+    memcpy( digest.pending, p, size );
+    digest.npending = size;
+}
+
+char *
+digest_final( Digest &digest, char *hex )
+/* purpose: finish the checksum
+ * paramtr: hex (OUT): at least DIGEST_HEX characters receiving the digest
+ *                     in lower case hex, as printed by sha256sum and xxhsum
+ * returns: hex */
+{
+    hex[0] = '\0';
+    if ( digest.kind == DIGEST_SHA256 )
+    {
+        unsigned long long bits = digest.length * 8;
+        unsigned char pad[72] = { 0x80 };
+        size_t padding = ( digest.npending < 56 ? 56 : 120 ) - digest.npending;
+        for ( int i = 0; i < 8; i++ ) pad[padding + i] = (unsigned char) ( bits >> (56 - 8*i) );
+        unsigned long long length = digest.length;
+        digest_update( digest, pad, padding + 8 );
+        digest.length = length;
+
+        for ( int i = 0; i < 8; i++ ) sprintf( hex + 8*i, "%08x", digest.h[i] );
+    }
+    else if ( digest.kind == DIGEST_XXH64 )
+    {
+        const unsigned long long *v = digest.v;
+        unsigned long long h;
+        if ( digest.length >= 32 )
+        {
+            h = rol64( v[0], 1 ) + rol64( v[1], 7 ) + rol64( v[2], 12 ) + rol64( v[3], 18 );
+            for ( int i = 0; i < 4; i++ ) h = ( h ^ xxh64_round( 0, v[i] ) ) * XXH_P1 + XXH_P4;
+        }
+        else
+        {
+            h = XXH_P5;
+        }
+        h += digest.length;
+
+        const unsigned char *p = digest.pending;
+        size_t left = digest.npending;
+        for ( ; left >= 8; p += 8, left -= 8 )
+            h = rol64( h ^ xxh64_round( 0, read64le(p) ), 27 ) * XXH_P1 + XXH_P4;
+        if ( left >= 4 )
+        {
+            unsigned long long k = (unsigned long long) p[0] | ( (unsigned long long) p[1] << 8 ) |
+                                   ( (unsigned long long) p[2] << 16 ) | ( (unsigned long long) p[3] << 24 );
+            h = rol64( h ^ ( k * XXH_P1 ), 23 ) * XXH_P2 + XXH_P3;
+            p += 4;
+            left -= 4;
+        }
+        for ( ; left > 0; p++, left-- )
+            h = rol64( h ^ ( *p * XXH_P5 ), 11 ) * XXH_P1;
+
+        h ^= h >> 33;
+        h *= XXH_P2;
+        h ^= h >> 29;
+        h *= XXH_P3;
+        h ^= h >> 32;
+        sprintf( hex, "%016llx", h );
+    }
+    return hex;
+}
+
 template <class T>
 inline
 T
@@ -180,6 +447,17 @@ spin( unsigned long interval )
     return count;
 }
 
+void
+sleep_seconds( double interval )
+/* purpose: sleep for 'interval' seconds, fractions included, resuming
+ *          after signals */
+{
+    struct timespec left;
+    left.tv_sec = (time_t) interval;
+    left.tv_nsec = (long) ( ( interval - left.tv_sec ) * 1e9 );
+    while ( nanosleep( &left, &left ) == -1 && errno == EINTR );
+}
+
 char *
 append( char *buffer, size_t capacity, const char *fmt, ... )
 {
@@ -431,7 +709,8 @@ whoami( char *buffer, size_t size )
 void
 identify( char *result, size_t size, const char *arg0,
           double start, bool condor,
-          const DirtyVector iox[5], const char *outfn )
+          const DirtyVector iox[5], const char *outfn,
+          const PhaseStats *stats = phase_stats, bool written = false )
 {
     size_t linsize = getpagesize();
     char *line = static_cast<char *>( malloc(linsize) );
@@ -485,22 +764,127 @@ identify( char *result, size_t size, const char *arg0,
     
     append( result, size, "IP addr and hostname: %s\n", hostname );
 
+    // machine readable record, see analysis/kegstats.py
+    append( result, size, "keg-job: app=%s start=%.6f outputs=", arg0, start );
+    for ( unsigned i = 0; i < iox[2].size(); ++i )
+    {
+        const char *eq = strrchr( iox[2][i], '=' );
+        int len = ( eq != NULL ) ? (int) ( eq - iox[2][i] ) : (int) strlen( iox[2][i] );
+        append( result, size, "%s%.*s", ( i > 0 ? "," : "" ), len, iox[2][i] );
+    }
+    append( result, size, " inputs=" );
+    for ( unsigned j = 0; j < iox[1].size(); ++j )
+        append( result, size, "%s%s", ( j > 0 ? "," : "" ), iox[1][j] );
+    append( result, size, '\n' );
+
+    for ( int p = 0; p < PHASES; p++ )
+    {
+        const PhaseStats &phase = stats[p];
+        append( result, size, "keg-phase: %s wall=%.6f bytes=%llu files=%lu open=%.6f close=%.6f mbps=%.3f\n",
+                phase_names[p], phase.wall, phase.bytes, phase.files, phase.open, phase.close,
+                ( phase.wall > 0 ? phase.bytes / 1048576.0 / phase.wall : 0.0 ) );
+    }
+
+    // the digest of an output is only known once it is written, so outputs
+    // list their inputs and the logfile record lists everything
+    if ( digest_kind != DIGEST_NONE )
+    {
+        for ( unsigned j = 0; j < iox[1].size(); ++j )
+            if ( input_digests[j * DIGEST_HEX] != '\0' )
+                append( result, size, "keg-digest: read file=%s %s=%s\n",
+                        iox[1][j], digest_names[digest_kind], input_digests + j * DIGEST_HEX );
+        for ( unsigned i = 0; written && i < iox[2].size(); ++i )
+        {
+            const char *eq = strrchr( iox[2][i], '=' );
+            int len = ( eq != NULL ) ? (int) ( eq - iox[2][i] ) : (int) strlen( iox[2][i] );
+            if ( output_digests[i * DIGEST_HEX] != '\0' )
+                append( result, size, "keg-digest: write file=%.*s %s=%s\n",
+                        len, iox[2][i], digest_names[digest_kind], output_digests + i * DIGEST_HEX );
+        }
+    }
+
     free( static_cast<void *>(line) );
 }
 
-void helpMe(const char *ptr, unsigned long timeout, unsigned long spinout,
-            unsigned long sleeptime, const char *prefix)
+struct WriteOptions
+// purpose: how -G data is written to the output files, see -b -D -F -S
+{
+    size_t block_size;               // 0: stdio writes of sizeof(output)
+    bool direct;                     // bypass the page cache with O_DIRECT
+    bool preallocate;                // fallocate the data size before writing
+    bool sync_end;                   // fsync each output once it is complete
+    unsigned long long sync_every;   // fsync every that many bytes, 0: never
+};
+
+enum IngestMode
+// purpose: how input files are read, see -I
+{
+    INGEST_LINES,   // fgets() line by line into the memory buffer
+    INGEST_READ,    // large read() calls straight into the memory buffer
+    INGEST_MMAP,    // inputs mapped (and populated) in memory
+    INGEST_COPY     // inputs forwarded to pass-through outputs by the kernel
+};
+
+struct InputFile
+// purpose: an input opened once for the -I read, mmap and copy modes
+{
+    const char *name;
+    int fd;
+    bool regular;                  // size is known and the file can be mapped
+    unsigned long long size;       // bytes of content (of data, once buffered)
+    char *data;                    // mapped or buffered content, if any
+    bool mapped;                   // data comes from mmap() rather than malloc()
+};
+
+// largest single read() and initial growth step for inputs of unknown size
+static const size_t INGEST_CHUNK = 64ul << 20;
+
+enum AccessKind
+// purpose: order and size of the I/O requests, see -A
+{
+    ACCESS_SEQ,       // one request after the other
+    ACCESS_RANDOM,    // every request once, in a shuffled order
+    ACCESS_STRIDED,   // passes of requests 'stride' bytes apart
+    ACCESS_SMALL      // generated data spread over many small files
+};
+
+struct AccessPattern
+// purpose: how generated data is written and regular inputs are read
+{
+    int kind;
+    size_t request;          // bytes per request, 0: the default I/O path
+    size_t stride;           // strided: distance between two requests of a pass
+    unsigned long files;     // small: number of files holding the data
+};
+
+static const AccessPattern SEQUENTIAL = { ACCESS_SEQ, 0, 0, 0 };
+
+struct RequestOrder
+// purpose: walk the offsets of the requests covering a file
+{
+    int kind;
+    unsigned long long size;       // bytes to cover
+    unsigned long long request;    // bytes per request
+    unsigned long long stride;     // strided: distance between two requests of a pass
+    unsigned long long blocks;     // number of requests
+    unsigned long long mask;       // random: modulus of the generator minus one
+    unsigned long long state;      // random: generator state, strided: current pass
+    unsigned long long issued;     // requests returned, strided: within the pass
+};
+
+void helpMe(const char *ptr, double timeout, unsigned long spinout,
+            double sleeptime, const char *prefix)
 {
     printf( "Usage:\t%s [-a appname] [(-s|-t|-T) thinktime] [-l fn] [-o fn [..]]\n"
-            "\t[-i fn [..] | -G size] [-e env [..]] [-p p [..]] [-P ps] [-h]\n",
+            "\t[-i fn [..] [-I im] | -G size] [-b bs [-D] [-F]] [-A ap] [-S sp] [-j nt] [-K ck [-k fn [..]]] [-e env [..]] [-p p [..]] [-P ps] [-h]\n",
             ptr );
     printf( " -a app\tset name of application to something else, default %s\n", ptr );
     printf( " -m me\tallocate 'me' MB of memory\n" );
 #ifdef WITH_MPI
     printf( " -r \tallocate memory specified with the '-m' switch only in the root process\n" );
 #endif
-    printf( " -t to\tsleep for 'to' seconds during execution, default %lu\n", timeout );
-    printf( " -s to\tsleep for 'to' seconds after the I/O phase, default %lu\n", sleeptime);
+    printf( " -t to\tsleep for 'to' seconds (fractions allowed) during execution, default %g\n", timeout );
+    printf( " -s to\tsleep for 'to' seconds (fractions allowed) after the I/O phase, default %g\n", sleeptime);
     printf( " -T to\tspin for 'to' seconds during execution, default %lu\n", spinout );
     printf( " -l fn\tappend own information atomically to a logfile\n" );
     printf( " -o ..\tenumerate space-separated list output files to create\n\
@@ -510,6 +894,24 @@ void helpMe(const char *ptr, unsigned long timeout, unsigned long spinout,
     printf( " -i ..\tenumerate space-separated list input to read and copy\n" );
     printf( " -G ..\tenumerate space-separated list of output file sizes\n" );
     printf( " -u un\tdata unit for output files generator - accepted values includes [ B K M G ], default is B\n" );
+    printf( " -b bs\twrite generated data with raw writes of 'bs' bytes (suffix B K M G), default stdio\n" );
+    printf( " -D\tuse O_DIRECT for the generated data, only with -b\n" );
+    printf( " -F\tpreallocate the generated data with fallocate, only with -b\n" );
+    printf( " -S sp\tfsync policy of the output files: none, end or every 'sp' MB, default none\n" );
+    printf( " -I im\tinput ingestion: lines (fgets), read (large reads), mmap, or copy\n\
+        (copy_file_range/sendfile of inputs into pass-through outputs), default lines\n" );
+    printf( " -A ap\taccess pattern of the generated data and of the inputs (with -I read,\n\
+        selected when -I is lines): seq:req, random:req, strided:req:stride\n\
+        or small:n:req to spread the data over n files <output>.<k>; 'req' is\n\
+        the request size (suffix B K M G, default 4K), -b and -D are ignored\n" );
+    printf( " -j nt\tread inputs and write outputs with 'nt' I/O threads, one file each at a\n\
+        time; inputs are then read with -I read unless -I is mmap or copy, and\n\
+        the record of each output only counts its own writes, default 1\n" );
+    printf( " -K ck\tchecksum inputs as they are read and outputs as they are written, sha256\n\
+        or xxh64; every output gets a sidecar <output>.<ck> and every input is\n\
+        verified against its own, missing or not, -I copy becomes mmap, default none\n" );
+    printf( " -k ..\tenumerate space-separated list of inputs not written by a keg,\n\
+        only checksummed with -K as they have no sidecar\n" );
     printf( " -p ..\tenumerate space-separated parameters to mention\n" );
     printf( " -e ..\tenumerate space-separated environment values to print\n" );
     printf( " -C\tprint all environment variables starting with _CONDOR\n" );
@@ -548,6 +950,48 @@ data_unit_multiplier( char data_unit )
 #define MIN(a,b) ((a) < (b) ? (a) : (b))
 #endif // MIN
 
+unsigned long long
+parse_size( const char *s, char default_unit )
+/* purpose: convert a size with an optional data unit suffix to bytes
+ * paramtr: s (IN): size, e.g. "4096", "512K" or "4M"
+ *          default_unit (IN): data unit used when there is no suffix
+ * returns: the size in bytes */
+{
+    char *end = 0;
+    unsigned long long size = strtoull( s, &end, 10 );
+    char unit = ( end != 0 && *end != '\0' ) ? toupper(*end) : default_unit;
+    return size * data_unit_multiplier( unit );
+}
+
+int
+parse_sync_policy( const char *s, WriteOptions &options )
+/* purpose: parse the -S fsync policy
+ * paramtr: s (IN): "none", "end" or a number of MB between two fsync
+ *          options (OUT): write options to update
+ * returns: 0 on success, -1 for an unknown policy */
+{
+    if ( strcmp( s, "none" ) == 0 )
+    {
+        options.sync_end = false;
+        options.sync_every = 0;
+    }
+    else if ( strcmp( s, "end" ) == 0 )
+    {
+        options.sync_end = true;
+        options.sync_every = 0;
+    }
+    else if ( isdigit( s[0] ) )
+    {
+        options.sync_end = true;
+        options.sync_every = parse_size( s, 'M' );
+    }
+    else
+    {
+        return -1;
+    }
+    return 0;
+}
+
 char*
 allocate_mem_buffer( size_t mem_buf_size )
 /* purpose: allocate a memory buffor on heap and prevent it from being paged out
@@ -570,6 +1014,84 @@ allocate_mem_buffer( size_t mem_buf_size )
     return memory_buffer;
 }
 
+int
+finish_input_digest( unsigned j, const char *name, Digest &digest )
+/* purpose: keep the digest of input j, and compare it with the sidecar
+ *          <name>.<checksum> left by the keg which wrote it, unless the
+ *          input was given with -k
+ * returns: 0 on success, -1 if the sidecar is missing or does not match */
+{
+    if ( digest.kind == DIGEST_NONE ) return 0;
+
+    char *hex = digest_final( digest, input_digests + j * DIGEST_HEX );
+    if ( name[0] == '-' && name[1] == '\0' ) return 0;
+    for ( unsigned k = 0; k < external_inputs.size(); k++ )
+        if ( strcmp( external_inputs[k], name ) == 0 ) return 0;
+
+    char sidecar[4096];
+    char expected[DIGEST_HEX];
+    snprintf( sidecar, sizeof(sidecar), "%s.%s", name, digest_names[digest.kind] );
+    FILE *in = fopen( sidecar, "r" );
+    if ( in == NULL )
+    {
+        printf( "[error] checksum \"%s\": cannot open %s: %d: %s\n", name, sidecar, errno, strerror(errno) );
+        return -1;
+    }
+    int found = fscanf( in, "%64s", expected );
+    fclose( in );
+
+    if ( found != 1 )
+    {
+        printf( "[error] checksum \"%s\": no %s digest in %s\n", name, digest_names[digest.kind], sidecar );
+        return -1;
+    }
+    if ( strcmp( expected, hex ) != 0 )
+    {
+        printf( "[error] checksum \"%s\": %s %s, expected %s from %s\n",
+                name, digest_names[digest.kind], hex, expected, sidecar );
+        return -1;
+    }
+    return 0;
+}
+
+int
+digest_input( unsigned j, const char *name, const char *data, unsigned long long size )
+/* purpose: checksum input j from its content in memory, see finish_input_digest */
+{
+    Digest digest;
+    digest_init( digest, digest_kind );
+    digest_update( digest, data, size );
+    return finish_input_digest( j, name, digest );
+}
+
+void
+digest_pattern( Digest &digest, unsigned long long xsize )
+/* purpose: hash 'xsize' bytes of generated data and the newline closing it,
+ *          the bytes every -G generator writes whatever its write order */
+{
+    while ( xsize > 0 )
+    {
+        size_t size = MIN( xsize, sizeof(output) );
+        digest_update( digest, output, size );
+        xsize -= size;
+    }
+    digest_update( digest, "\n", 1 );
+}
+
+int
+write_sidecar( const char *name, const char *hex )
+/* purpose: write the digest of an output to <name>.<checksum>, in the format
+ *          of sha256sum and xxhsum
+ * returns: 0 on success, -1 on error (errno is set) */
+{
+    char sidecar[4096];
+    snprintf( sidecar, sizeof(sidecar), "%s.%s", name, digest_names[digest_kind] );
+    FILE *out = fopen( sidecar, "w" );
+    if ( out == NULL ) return -1;
+    fprintf( out, "%s  %s\n", hex, name );
+    return fclose( out );
+}
+
 unsigned long
 calculate_input_file_size( DirtyVector iox[5], char *buffer )
 /* purpose: sum up input file sizes
@@ -584,9 +1106,11 @@ calculate_input_file_size( DirtyVector iox[5], char *buffer )
 
     for ( unsigned int j = 0; j < iox[1].size(); j++ )
     {
+        double opening = monotonic();
         in = ( iox[1][j][0] == '-' && iox[1][j][1] == '\0' ) ?
              fdopen( STDIN_FILENO, "r" ) :
              fopen( iox[1][j], "r" );
+        phase_stats[PHASE_READ].open += monotonic() - opening;
 
         if ( in )
         {
@@ -605,7 +1129,9 @@ calculate_input_file_size( DirtyVector iox[5], char *buffer )
                 input_files_size += file_stat.st_size;
             }
 
+            double closing = monotonic();
             fclose(in);
+            phase_stats[PHASE_READ].close += monotonic() - closing;
         }
         else
         {
@@ -630,12 +1156,17 @@ read_input_files( DirtyVector iox[5], char *buffer, size_t bufsize, char *memory
 
     for ( unsigned int j = 0; j < iox[1].size(); j++ )
     {
+        double opening = monotonic();
         in = ( iox[1][j][0] == '-' && iox[1][j][1] == '\0' ) ?
              fdopen( STDIN_FILENO, "r" ) :
              fopen( iox[1][j], "r" );
+        phase_stats[PHASE_READ].open += monotonic() - opening;
 
         if ( in )
         {
+            Digest digest;
+            digest_init( digest, digest_kind );
+            phase_stats[PHASE_READ].files++;
             sprintf( buffer, "--- start %s ----\n", iox[1][j] );
             memcpy( memory_buffer + mem_buf_offset, buffer, strlen( buffer ) );
             mem_buf_offset += strlen( buffer );
@@ -644,13 +1175,19 @@ read_input_files( DirtyVector iox[5], char *buffer, size_t bufsize, char *memory
             {
                 memcpy( memory_buffer + mem_buf_offset, buffer, strlen( buffer ) );
                 mem_buf_offset += strlen( buffer );
+                phase_stats[PHASE_READ].bytes += strlen( buffer );
+                digest_update( digest, buffer, strlen( buffer ) );
             }
 
             sprintf( buffer, "--- final %s ----\n", iox[1][j] );
             memcpy( memory_buffer + mem_buf_offset, buffer, strlen( buffer ) );
             mem_buf_offset += strlen( buffer );
 
+            double closing = monotonic();
             fclose(in);
+            phase_stats[PHASE_READ].close += monotonic() - closing;
+
+            if ( finish_input_digest( j, iox[1][j], digest ) ) return 1;
         }
         else
         {
@@ -662,86 +1199,1248 @@ read_input_files( DirtyVector iox[5], char *buffer, size_t bufsize, char *memory
     return 0;
 }
 
-void
-generate_output_file( FILE *out, unsigned long xsize )
-/* purpose: write the specified amount of 'random' data to a file
- * paramtr: out (FILE*): where the generated data should be written
- *         xsize (ulong): how much data (in bytes) should be generated
- */
+int
+parse_ingest_mode( const char *s )
+/* purpose: parse the -I ingestion mode
+ * returns: an IngestMode, or -1 for an unknown mode */
 {
-    while ( xsize > 0 )
-    {
-        ssize_t wsize = fwrite( output, sizeof(char),
-                                MIN(xsize, sizeof(output)), out );
-        // printf( "[%d] writing %ld bytes\n", i, wsize );
-        if ( wsize > 0 ) xsize -= wsize;
-        else break;
-    }
-    fputc( '\n', out );
+    if ( strcmp( s, "lines" ) == 0 ) return INGEST_LINES;
+    if ( strcmp( s, "read" ) == 0 ) return INGEST_READ;
+    if ( strcmp( s, "mmap" ) == 0 ) return INGEST_MMAP;
+    if ( strcmp( s, "copy" ) == 0 ) return INGEST_COPY;
+    return -1;
 }
 
 int
-main( int argc, char *argv[] )
+parse_access_pattern( const char *s, AccessPattern &access )
+/* purpose: parse the -A access pattern
+ * paramtr: s (IN): seq[:req], random[:req], strided[:req[:stride]] or small:n[:req]
+ *          access (OUT): pattern to fill in
+ * returns: 0 on success, -1 for an unknown pattern */
 {
-    // process rank - altered only in the MPI version
-    int rank = 0;
+    const char *arg = strchr( s, ':' );
+    size_t len = ( arg != NULL ) ? (size_t) ( arg - s ) : strlen( s );
 
-#ifdef WITH_MPI
-    MPI_Init( &argc, &argv );
+    access = SEQUENTIAL;
+    if ( len == 3 && strncmp( s, "seq", len ) == 0 ) access.kind = ACCESS_SEQ;
+    else if ( len == 6 && strncmp( s, "random", len ) == 0 ) access.kind = ACCESS_RANDOM;
+    else if ( len == 7 && strncmp( s, "strided", len ) == 0 ) access.kind = ACCESS_STRIDED;
+    else if ( len == 5 && strncmp( s, "small", len ) == 0 ) access.kind = ACCESS_SMALL;
+    else return -1;
 
-    MPI_Comm_rank( MPI_COMM_WORLD, &rank );
-#endif
+    if ( access.kind == ACCESS_SMALL )
+    {
+        if ( arg == NULL || ! isdigit( arg[1] ) ) return -1;
+        access.files = strtoul( arg + 1, 0, 10 );
+        if ( access.files == 0 ) return -1;
+        arg = strchr( arg + 1, ':' );
+    }
+    if ( arg != NULL )
+    {
+        access.request = parse_size( arg + 1, 'B' );
+        arg = strchr( arg + 1, ':' );
+    }
+    if ( arg != NULL && access.kind == ACCESS_STRIDED )
+    {
+        access.stride = parse_size( arg + 1, 'B' );
+    }
 
-    // required CPU time
-    unsigned long spinout = 0;
-    // required wall time
-    unsigned long timeout = 0;
-    // required sleep time
-    unsigned long sleeptime = 0;
+    if ( access.request == 0 && access.kind != ACCESS_SEQ ) access.request = 4096;
+    // whole patterns: every request starts at the beginning of the 64 bytes pattern
+    access.request = ( access.request + 63 ) / 64 * 64;
+    if ( access.kind == ACCESS_STRIDED )
+    {
+        if ( access.stride == 0 ) access.stride = 16 * access.request;
+        access.stride = ( access.stride + access.request - 1 ) / access.request * access.request;
+    }
+    return 0;
+}
 
-    // buffer for mock memory or input files content
-    char *memory_buffer = NULL;
-    // auxiliary variables for memory management
-    unsigned long memory_size = 0;
-    size_t mem_buf_size = 0;
-    bool root_only_memory_allocation = false;
-    size_t bufsize = getpagesize() << 4;
-    if ( bufsize < 16384 ) bufsize = 16384;
-    char *buffer = static_cast<char *>( malloc(bufsize) );    
+bool
+pattern_active( const AccessPattern &access )
+/* purpose: tell if -A replaces the default read and write paths */
+{
+    return access.kind != ACCESS_SEQ || access.request > 0;
+}
 
-    int state = 0;
-    bool condor = false;
-    // DK: DEPRACTED
-    // unsigned long gensize = 0;
-    char data_unit = 'B';
-    DirtyVector iox[5];
+void
+request_order_init( RequestOrder &order, const AccessPattern &access, unsigned long long size )
+/* purpose: prepare the walk over the requests covering 'size' bytes
+ * paramtr: order (OUT): walk to initialize
+ *          access (IN): active access pattern
+ *          size (IN): bytes to cover */
+{
+    order.kind = access.kind;
+    order.size = size;
+    order.request = access.request;
+    order.stride = access.stride;
+    order.blocks = ( size + access.request - 1 ) / access.request;
+    order.mask = 1;
+    while ( order.mask < order.blocks ) order.mask <<= 1;
+    order.mask -= 1;
+    order.state = 0;
+    order.issued = 0;
+}
 
-    // when did we start
-    double start = now();
-    char *prefix = strdup("  ");
+bool
+request_order_next( RequestOrder &order, unsigned long long *offset )
+/* purpose: offset of the next request, each byte is covered exactly once
+ * paramtr: order (IO): walk initialized by request_order_init
+ *          offset (OUT): offset of the request, its size is
+ *                        MIN(order.request, order.size - offset)
+ * returns: false once the whole size is covered */
+{
+    if ( order.kind == ACCESS_STRIDED )
+    {
+        // pass p requests p*request, p*request + stride, p*request + 2*stride, ...
+        for (;;)
+        {
+            unsigned long long first = order.state * order.request;
+            if ( first >= order.stride || first >= order.size ) return false;
 
-    // determine base name of input file
-    char *logfile = 0;
-    char *ptr = 0;
-    if ( (ptr = strrchr(argv[0], '/')) == 0 ) ptr = argv[0];
-    else ptr++;
+            unsigned long long candidate = first + order.issued * order.stride;
+            if ( candidate < order.size )
+            {
+                order.issued++;
+                *offset = candidate;
+                return true;
+            }
+            order.state++;
+            order.issued = 0;
+        }
+    }
 
-    // complain, if no parameters were given
-    if ( rank == 0 && argc == 1 )
+    if ( order.issued >= order.blocks ) return false;
+
+    if ( order.kind == ACCESS_RANDOM )
     {
-        helpMe( ptr, timeout, spinout, sleeptime, prefix );
-        return 0;
+        // full period LCG modulo a power of two: every block once, same order every run
+        do order.state = ( order.state * 6364136223846793005ull + 1442695040888963407ull ) & order.mask;
+        while ( order.state >= order.blocks );
+        *offset = order.state * order.request;
+    }
+    else
+    {
+        *offset = order.issued * order.request;
     }
+    order.issued++;
+    return true;
+}
 
-    // prepare generator pattern
-    for ( size_t i = 0; i < sizeof(output); i++ ) output[i] = pattern[i & 63];
+bool
+has_passthrough_output( DirtyVector iox[5] )
+/* purpose: tell if an output gets the input content rather than generated data
+ * paramtr: iox (DirtyVector[]): a data structure with information about all input/output files */
+{
+    if ( iox[4].size() > 0 ) return false;
+    for ( unsigned i = 0; i < iox[2].size(); ++i )
+        if ( strchr( iox[2][i], '=' ) == NULL ) return true;
+    return false;
+}
 
-    for ( int i = 1; i < argc; ++i )
-    {
-        char *s = argv[i];
-        if ( s[0] == '-' && s[1] != 0 )
-        {
-            if ( strchr( "iotTGaepPlCmruhs\0", s[1] ) != NULL )
+int
+input_marker( char *buffer, size_t bufsize, const char *what, const char *name )
+/* purpose: format the start or final line surrounding an input in the outputs
+ * returns: the length of the marker */
+{
+    return snprintf( buffer, bufsize, "--- %s %s ----\n", what, name );
+}
+
+InputFile *
+open_input_files( DirtyVector iox[5], char *buffer, size_t bufsize,
+                  unsigned long long *total )
+/* purpose: open every input once, and sum up their sizes and markers
+ * paramtr: iox (DirtyVector[]): a data structure with information about all input/output files
+ *         buffer (char*): an already allocated auxiliary buffer
+ *         bufsize (size_t): size of the auxiliary buffer
+ *         total (OUT): bytes needed to hold every input with its markers
+ * returns: an array of iox[1].size() inputs, or NULL if an input cannot be opened */
+{
+    size_t n = iox[1].size();
+    InputFile *inputs = static_cast<InputFile *>( calloc( n > 0 ? n : 1, sizeof(InputFile) ) );
+    struct stat file_stat;
+
+    *total = 0;
+    for ( unsigned int j = 0; j < n; j++ )
+    {
+        InputFile &input = inputs[j];
+        input.name = iox[1][j];
+        double opening = monotonic();
+        input.fd = ( input.name[0] == '-' && input.name[1] == '\0' ) ?
+                   STDIN_FILENO :
+                   open( input.name, O_RDONLY );
+        phase_stats[PHASE_READ].open += monotonic() - opening;
+
+        if ( input.fd == -1 )
+        {
+            printf( "[error] open \"%s\": %d: %s\n", input.name, errno, strerror(errno) );
+            for ( unsigned int k = 0; k < j; k++ )
+                if ( inputs[k].fd != STDIN_FILENO ) close( inputs[k].fd );
+            free( static_cast<void *>(inputs) );
+            return NULL;
+        }
+
+        phase_stats[PHASE_READ].files++;
+        if ( fstat( input.fd, &file_stat ) == 0 && S_ISREG(file_stat.st_mode) )
+        {
+            input.regular = true;
+            input.size = file_stat.st_size;
+        }
+        *total += 2 * input_marker( buffer, bufsize, "start", input.name ) + input.size;
+    }
+
+    return inputs;
+}
+
+void
+close_input_files( InputFile *inputs, size_t n )
+{
+    for ( unsigned int j = 0; j < n; j++ )
+    {
+        if ( inputs[j].data != NULL )
+        {
+            if ( inputs[j].mapped ) munmap( inputs[j].data, inputs[j].size );
+            else free( static_cast<void *>(inputs[j].data) );
+        }
+        double closing = monotonic();
+        if ( inputs[j].fd != STDIN_FILENO ) close( inputs[j].fd );
+        phase_stats[PHASE_READ].close += monotonic() - closing;
+    }
+    free( static_cast<void *>(inputs) );
+}
+
+int
+reserve( char **memory_buffer, size_t *capacity, size_t needed )
+/* purpose: grow a malloc'ed buffer to hold at least 'needed' bytes
+ * returns: 0 on success, -1 if the memory cannot be allocated */
+{
+    if ( needed <= *capacity ) return 0;
+
+    size_t grown = MIN( *capacity * 2, *capacity + 16 * INGEST_CHUNK );
+    if ( grown < needed ) grown = needed;
+
+    char *larger = static_cast<char *>( realloc( *memory_buffer, grown ) );
+    if ( larger == NULL )
+    {
+        printf( "Memory allocation failure:  %s\n", strerror(errno) );
+        return -1;
+    }
+    *memory_buffer = larger;
+    *capacity = grown;
+    return 0;
+}
+
+int
+read_input_pattern( InputFile &input, const AccessPattern &access, char *destination,
+                    PhaseStats &stats )
+/* purpose: read a regular input with the requests of an access pattern
+ * paramtr: input (IN): opened regular input
+ *         access (IN): active access pattern
+ *         destination (OUT): input.size bytes receiving the content in file order
+ *         stats (IO): read counters to update
+ * returns: 0 on success, -1 on a read error */
+{
+    RequestOrder order;
+    unsigned long long offset;
+
+    request_order_init( order, access, input.size );
+    while ( request_order_next( order, &offset ) )
+    {
+        size_t want = MIN( input.size - offset, access.request );
+        for ( size_t done = 0; done < want; )
+        {
+            ssize_t got = pread( input.fd, destination + offset + done, want - done, offset + done );
+            if ( got < 0 && errno == EINTR ) continue;
+            if ( got < 0 )
+            {
+                printf( "[error] read \"%s\": %d: %s\n", input.name, errno, strerror(errno) );
+                return -1;
+            }
+            if ( got == 0 )
+            {
+                // the input shrank since it was opened
+                memset( destination + offset + done, 0, want - done );
+                break;
+            }
+            done += got;
+        }
+        stats.bytes += want;
+    }
+
+    return 0;
+}
+
+int
+read_input_parts( const char *name, const char *content, size_t length, const AccessPattern &access,
+                  char *buffer, size_t bufsize, PhaseStats &stats )
+/* purpose: read the small files <name>.0, <name>.1, ... written with -A small,
+ *          as listed in the input itself
+ * paramtr: name (IN): input listing its parts
+ *         content (IN): content of the input, one "<output>.<k>" line per part
+ *         length (IN): bytes of content
+ *         access (IN): request size of the reads
+ *         buffer (char*): auxiliary buffer receiving (and dropping) the data
+ *         bufsize (size_t): size of the auxiliary buffer
+ *         stats (IO): read counters to update
+ * returns: 0 on success, -1 if a listed part cannot be opened or read */
+{
+    char part[4096];
+    size_t want = MIN( access.request, bufsize );
+    const char *base = strrchr( name, '/' );
+    base = ( base == NULL ) ? name : base + 1;
+    size_t baselen = strlen( base );
+
+    for ( const char *line = content; line < content + length; )
+    {
+        const char *end = static_cast<const char *>( memchr( line, '\n', content + length - line ) );
+        if ( end == NULL ) end = content + length;
+
+        // the writer listed its parts under its own -o name, maybe with a directory
+        const char *slash = line;
+        for ( const char *c = line; c < end; c++ )
+            if ( *c == '/' ) slash = c + 1;
+        const char *suffix = slash + baselen;
+        bool listed = suffix + 1 < end && strncmp( slash, base, baselen ) == 0 && *suffix == '.';
+        for ( const char *c = suffix + 1; listed && c < end; c++ )
+            if ( ! isdigit( (unsigned char) *c ) ) listed = false;
+        line = end + 1;
+        if ( ! listed ) continue;
+
+        snprintf( part, sizeof(part), "%s%.*s", name, (int) ( end - suffix ), suffix );
+        double opening = monotonic();
+        int fd = open( part, O_RDONLY );
+        stats.open += monotonic() - opening;
+        if ( fd == -1 )
+        {
+            printf( "[error] open part \"%s\" of \"%s\": %d: %s\n", part, name, errno, strerror(errno) );
+            return -1;
+        }
+
+        stats.files++;
+        ssize_t got;
+        while ( ( got = read( fd, buffer, want ) ) != 0 )
+        {
+            if ( got < 0 && errno == EINTR ) continue;
+            if ( got < 0 )
+            {
+                printf( "[error] read \"%s\": %d: %s\n", part, errno, strerror(errno) );
+                close( fd );
+                return -1;
+            }
+            stats.bytes += got;
+        }
+
+        double closing = monotonic();
+        close( fd );
+        stats.close += monotonic() - closing;
+    }
+    return 0;
+}
+
+int
+read_input_content( InputFile &input, const AccessPattern &access,
+                    char **memory_buffer, size_t *capacity, size_t *length )
+/* purpose: append the whole content of an input to a buffer with large read() calls
+ * paramtr: input (IN): opened input, read from its current offset
+ *         access (IN): requests used for regular inputs when the pattern is active
+ *         memory_buffer (IO): malloc'ed destination, grown when needed
+ *         capacity (IO): allocated size of the destination
+ *         length (IO): bytes already used in the destination
+ * returns: 0 on success, -1 on a read or allocation error */
+{
+    unsigned long long remaining = input.size;
+
+    if ( input.regular && pattern_active( access ) )
+    {
+        if ( reserve( memory_buffer, capacity, *length + input.size ) ) return -1;
+        if ( read_input_pattern( input, access, *memory_buffer + *length, phase_stats[PHASE_READ] ) ) return -1;
+        *length += input.size;
+        return 0;
+    }
+
+    while ( ! input.regular || remaining > 0 )
+    {
+        size_t want = input.regular ? MIN( remaining, INGEST_CHUNK ) : INGEST_CHUNK;
+        if ( reserve( memory_buffer, capacity, *length + want ) ) return -1;
+
+        ssize_t got = read( input.fd, *memory_buffer + *length, want );
+        if ( got < 0 )
+        {
+            if ( errno == EINTR ) continue;
+            printf( "[error] read \"%s\": %d: %s\n", input.name, errno, strerror(errno) );
+            return -1;
+        }
+        if ( got == 0 ) break;
+
+        *length += got;
+        phase_stats[PHASE_READ].bytes += got;
+        if ( input.regular ) remaining -= MIN( remaining, (unsigned long long) got );
+    }
+
+    return 0;
+}
+
+int
+read_input_blocks( InputFile *inputs, size_t n, const AccessPattern &access,
+                   char *buffer, size_t bufsize,
+                   char **memory_buffer, size_t *capacity, size_t *length )
+/* purpose: read input files content to a memory buffer, like read_input_files
+ *          but binary safe and without per-line copies
+ * paramtr: inputs (IN): inputs opened by open_input_files
+ *         access (IN): access pattern of the reads, see -A
+ *         buffer (char*): an already allocated auxiliary buffer
+ *         bufsize (size_t): size of the auxiliary buffer
+ *         memory_buffer (IO): malloc'ed destination, grown when needed
+ *         capacity (IO): allocated size of the destination
+ *         length (OUT): bytes of content placed in the destination
+ * returns: 0 on success, 1 on error */
+{
+    *length = 0;
+    for ( unsigned int j = 0; j < n; j++ )
+    {
+        size_t size = input_marker( buffer, bufsize, "start", inputs[j].name );
+        if ( reserve( memory_buffer, capacity, *length + size ) ) return 1;
+        memcpy( *memory_buffer + *length, buffer, size );
+        *length += size;
+
+        size_t begin = *length;
+        if ( read_input_content( inputs[j], access, memory_buffer, capacity, length ) ) return 1;
+        if ( digest_input( j, inputs[j].name, *memory_buffer + begin, *length - begin ) ) return 1;
+        if ( access.kind == ACCESS_SMALL && inputs[j].regular &&
+                read_input_parts( inputs[j].name, *memory_buffer + begin, *length - begin, access,
+                                  buffer, bufsize, phase_stats[PHASE_READ] ) ) return 1;
+
+        size = input_marker( buffer, bufsize, "final", inputs[j].name );
+        if ( reserve( memory_buffer, capacity, *length + size ) ) return 1;
+        memcpy( *memory_buffer + *length, buffer, size );
+        *length += size;
+    }
+
+    return 0;
+}
+
+int
+map_input_file( InputFile &input, PhaseStats &stats )
+/* purpose: map (and populate) a regular input in memory
+ * paramtr: input (IO): regular input opened by open_input_files
+ *         stats (IO): read counters to update
+ * returns: 0 on success, 1 on error */
+{
+    if ( input.size == 0 ) return 0;
+
+    int flags = MAP_PRIVATE;
+#ifdef MAP_POPULATE
+    // fault the pages in now: reading happens during PHASE 1
+    flags |= MAP_POPULATE;
+#endif
+    void *data = mmap( NULL, input.size, PROT_READ, flags, input.fd, 0 );
+    if ( data == MAP_FAILED )
+    {
+        printf( "[error] mmap \"%s\": %d: %s\n", input.name, errno, strerror(errno) );
+        return 1;
+    }
+    madvise( data, input.size, MADV_SEQUENTIAL );
+    input.data = static_cast<char *>( data );
+    input.mapped = true;
+    stats.bytes += input.size;
+    return 0;
+}
+
+int
+load_input_files( InputFile *inputs, size_t n, bool map )
+/* purpose: bring inputs in memory for the mmap and copy modes
+ * paramtr: inputs (IO): inputs opened by open_input_files
+ *         map (IN): mmap regular files; otherwise only inputs that cannot be
+ *                   read again (pipes, terminals) are buffered
+ * returns: 0 on success, 1 on error */
+{
+    for ( unsigned int j = 0; j < n; j++ )
+    {
+        InputFile &input = inputs[j];
+
+        if ( input.regular )
+        {
+            if ( ! map ) continue;
+            if ( map_input_file( input, phase_stats[PHASE_READ] ) ) return 1;
+        }
+        else
+        {
+            size_t capacity = 0, length = 0;
+            if ( read_input_content( input, SEQUENTIAL, &input.data, &capacity, &length ) ) return 1;
+            input.size = length;
+        }
+        if ( digest_input( j, input.name, input.data, input.size ) ) return 1;
+    }
+
+    return 0;
+}
+
+int
+copy_input_content( int out_fd, InputFile &input, char *buffer, size_t bufsize )
+/* purpose: forward a regular input to an output without going through user space
+ * paramtr: out_fd (IN): output, written at its current offset
+ *         input (IN): regular input, always copied from its beginning
+ *         buffer (char*): auxiliary buffer for the read()/write() fallback
+ *         bufsize (size_t): size of the auxiliary buffer
+ * returns: 0 on success, -1 on error (errno is set) */
+{
+    off_t offset = 0;
+    unsigned long long remaining = input.size;
+
+#ifdef LINUX
+    // same file system: the copy may not even touch the page cache
+    while ( remaining > 0 )
+    {
+        ssize_t n = copy_file_range( input.fd, &offset, out_fd, NULL, MIN( remaining, INGEST_CHUNK ), 0 );
+        if ( n < 0 && errno == EINTR ) continue;
+        if ( n <= 0 ) break;
+        remaining -= n;
+    }
+
+    // any file system, or a pipe as output
+    while ( remaining > 0 )
+    {
+        ssize_t n = sendfile( out_fd, input.fd, &offset, MIN( remaining, INGEST_CHUNK ) );
+        if ( n < 0 && errno == EINTR ) continue;
+        if ( n <= 0 ) break;
+        remaining -= n;
+    }
+#endif
+
+    while ( remaining > 0 )
+    {
+        ssize_t n = pread( input.fd, buffer, MIN( remaining, bufsize ), offset );
+        if ( n < 0 && errno == EINTR ) continue;
+        if ( n <= 0 ) return ( n == 0 ? 0 : -1 );
+
+        for ( ssize_t done = 0; done < n; )
+        {
+            ssize_t w = write( out_fd, buffer + done, n - done );
+            if ( w < 0 && errno == EINTR ) continue;
+            if ( w < 0 ) return -1;
+            done += w;
+        }
+        offset += n;
+        remaining -= n;
+    }
+
+    return 0;
+}
+
+int
+write_input_files( FILE *out, InputFile *inputs, size_t n, char *buffer, size_t bufsize )
+/* purpose: write every input between its start and final markers, from
+ *          memory when the input is mapped or buffered, else by kernel copy
+ * returns: 0 on success, -1 on error (errno is set) */
+{
+    for ( unsigned int j = 0; j < n; j++ )
+    {
+        input_marker( buffer, bufsize, "start", inputs[j].name );
+        fputs( buffer, out );
+
+        if ( inputs[j].data != NULL )
+        {
+            fwrite( inputs[j].data, sizeof(char), inputs[j].size, out );
+        }
+        else if ( inputs[j].size > 0 )
+        {
+            fflush( out );
+            if ( copy_input_content( fileno(out), inputs[j], buffer, bufsize ) ) return -1;
+        }
+
+        input_marker( buffer, bufsize, "final", inputs[j].name );
+        fputs( buffer, out );
+    }
+
+    return 0;
+}
+
+void
+generate_output_file( FILE *out, unsigned long xsize )
+/* purpose: write the specified amount of 'random' data to a file
+ * paramtr: out (FILE*): where the generated data should be written
+ *         xsize (ulong): how much data (in bytes) should be generated
+ */
+{
+    while ( xsize > 0 )
+    {
+        ssize_t wsize = fwrite( output, sizeof(char),
+                                MIN(xsize, sizeof(output)), out );
+        // printf( "[%d] writing %ld bytes\n", i, wsize );
+        if ( wsize > 0 ) xsize -= wsize;
+        else break;
+    }
+    fputc( '\n', out );
+}
+
+char *
+allocate_block_buffer( size_t block_size )
+/* purpose: allocate a page aligned block filled with the generator pattern
+ * paramtr: block_size (size_t): size of the block, a multiple of 64
+ * returns: a pointer to the block, or NULL on failure */
+{
+    void *block = NULL;
+
+    if ( posix_memalign( &block, getpagesize(), block_size ) != 0 )
+    {
+        return NULL;
+    }
+
+    // same byte stream as the stdio generator, which repeats the 64 bytes pattern
+    char *data = static_cast<char *>( block );
+    for ( size_t i = 0; i < block_size; i++ ) data[i] = pattern[i & 63];
+
+    return data;
+}
+
+int
+generate_output_blocks( FILE *out, unsigned long long xsize,
+                        const WriteOptions &options, const char *block )
+/* purpose: write the specified amount of 'random' data with large raw writes
+ * paramtr: out (FILE*): freshly opened output, nothing buffered in it yet
+ *         xsize (ulong): how much data (in bytes) should be generated
+ *         options (IN): block size, O_DIRECT, preallocation and fsync policy
+ *         block (IN): aligned buffer holding options.block_size bytes of data
+ * returns: 0 on success, -1 on a write error (errno is set) */
+{
+    int fd = fileno( out );
+    int flags = fcntl( fd, F_GETFL );
+    size_t align = getpagesize();
+    unsigned long long unsynced = 0;
+    bool direct = false;
+
+    fflush( out );
+    off_t offset = lseek( fd, 0, SEEK_CUR );
+    bool seekable = ( offset != -1 );
+
+    if ( options.preallocate && seekable && xsize > 0 )
+    {
+        int error = posix_fallocate( fd, offset, xsize );
+        if ( error != 0 )
+            debug( "WARN: fallocate: %d: %s\n", error, strerror(error) );
+    }
+
+#ifdef O_DIRECT
+    if ( options.direct && seekable && offset % align == 0 )
+    {
+        if ( fcntl( fd, F_SETFL, flags | O_DIRECT ) == 0 ) direct = true;
+        else debug( "WARN: O_DIRECT: %d: %s\n", errno, strerror(errno) );
+    }
+#endif
+
+    while ( xsize > 0 )
+    {
+        size_t wsize = MIN( xsize, options.block_size );
+
+        if ( direct && wsize % align != 0 )
+        {
+            // O_DIRECT needs aligned sizes: aligned part first, then the tail
+            if ( wsize > align ) wsize -= wsize % align;
+            else
+            {
+                fcntl( fd, F_SETFL, flags );
+                direct = false;
+            }
+        }
+
+        ssize_t written = seekable ?
+                          pwrite( fd, block, wsize, offset ) :
+                          write( fd, block, wsize );
+        if ( written < 0 )
+        {
+            if ( errno == EINTR ) continue;
+            if ( errno == EINVAL && direct )
+            {
+                // file system without O_DIRECT support
+                debug( "WARN: O_DIRECT write: %d: %s\n", errno, strerror(errno) );
+                fcntl( fd, F_SETFL, flags );
+                direct = false;
+                continue;
+            }
+            return -1;
+        }
+
+        xsize -= written;
+        offset += written;
+        unsynced += written;
+        if ( options.sync_every > 0 && unsynced >= options.sync_every )
+        {
+            fsync( fd );
+            unsynced = 0;
+        }
+    }
+
+    if ( direct ) fcntl( fd, F_SETFL, flags );
+    // pwrite() does not move the file offset the trailer is written at
+    if ( seekable ) lseek( fd, offset, SEEK_SET );
+
+    fputc( '\n', out );
+    return 0;
+}
+
+int
+generate_output_pattern( FILE *out, unsigned long long xsize, const AccessPattern &access,
+                         const WriteOptions &options, const char *block )
+/* purpose: write the specified amount of 'random' data as the requests of an
+ *          access pattern; the content is the same as generate_output_file's
+ * paramtr: out (FILE*): freshly opened output, nothing buffered in it yet
+ *         xsize (ulong): how much data (in bytes) should be generated
+ *         access (IN): active access pattern, other than small
+ *         options (IN): preallocation and fsync policy
+ *         block (IN): aligned buffer holding access.request bytes of data
+ * returns: 0 on success, -1 on a write error (errno is set) */
+{
+    int fd = fileno( out );
+    unsigned long long offset, unsynced = 0;
+    RequestOrder order;
+
+    fflush( out );
+    off_t base = lseek( fd, 0, SEEK_CUR );
+    if ( base == -1 )
+    {
+        // a pipe can only be written in order
+        generate_output_file( out, xsize );
+        return 0;
+    }
+
+    if ( options.preallocate && xsize > 0 )
+    {
+        int error = posix_fallocate( fd, base, xsize );
+        if ( error != 0 )
+            debug( "WARN: fallocate: %d: %s\n", error, strerror(error) );
+    }
+
+    request_order_init( order, access, xsize );
+    while ( request_order_next( order, &offset ) )
+    {
+        size_t wsize = MIN( xsize - offset, access.request );
+        for ( size_t done = 0; done < wsize; )
+        {
+            ssize_t written = pwrite( fd, block + done, wsize - done, base + offset + done );
+            if ( written < 0 && errno == EINTR ) continue;
+            if ( written < 0 ) return -1;
+            done += written;
+        }
+
+        unsynced += wsize;
+        if ( options.sync_every > 0 && unsynced >= options.sync_every )
+        {
+            fsync( fd );
+            unsynced = 0;
+        }
+    }
+
+    // pwrite() does not move the file offset the trailer is written at
+    lseek( fd, base + xsize, SEEK_SET );
+    fputc( '\n', out );
+    return 0;
+}
+
+int
+generate_small_files( FILE *out, const char *name, unsigned long long xsize,
+                      const AccessPattern &access, const WriteOptions &options,
+                      const char *block, PhaseStats &stats )
+/* purpose: spread the specified amount of 'random' data over access.files
+ *          files <name>.0, <name>.1, ... listed one per line in the output
+ * paramtr: out (FILE*): the output itself
+ *         name (IN): file name of the output
+ *         xsize (ulong): how much data (in bytes) should be generated in total
+ *         access (IN): number of files and request size
+ *         options (IN): fsync policy
+ *         block (IN): aligned buffer holding access.request bytes of data
+ *         stats (IO): write counters to update
+ * returns: 0 on success, -1 on an open or write error (errno is set) */
+{
+    char part[4096];
+
+    for ( unsigned long k = 0; k < access.files; k++ )
+    {
+        unsigned long long size = xsize / access.files + ( k < xsize % access.files ? 1 : 0 );
+        snprintf( part, sizeof(part), "%s.%lu", name, k );
+
+        double opening = monotonic();
+        int fd = open( part, O_WRONLY | O_CREAT | O_TRUNC, 0666 );
+        stats.open += monotonic() - opening;
+        if ( fd == -1 ) return -1;
+        stats.files++;
+
+        for ( unsigned long long offset = 0; offset < size; )
+        {
+            size_t wsize = MIN( size - offset, access.request );
+            for ( size_t done = 0; done < wsize; )
+            {
+                ssize_t written = write( fd, block + done, wsize - done );
+                if ( written < 0 && errno == EINTR ) continue;
+                if ( written < 0 )
+                {
+                    int saverr = errno;
+                    close( fd );
+                    errno = saverr;
+                    return -1;
+                }
+                done += written;
+            }
+            offset += wsize;
+        }
+        stats.bytes += size;
+
+        double closing = monotonic();
+        if ( options.sync_end ) fsync( fd );
+        close( fd );
+        stats.close += monotonic() - closing;
+
+        fprintf( out, "%s\n", part );
+    }
+
+    return 0;
+}
+
+void
+merge_stats( PhaseStats &total, const PhaseStats *parts, size_t n )
+/* purpose: add the counters of files handled by I/O threads to a phase;
+ *          the wall time of the phase is measured as a whole */
+{
+    for ( size_t j = 0; j < n; j++ )
+    {
+        total.bytes += parts[j].bytes;
+        total.files += parts[j].files;
+        total.open += parts[j].open;
+        total.close += parts[j].close;
+    }
+}
+
+typedef int (*IOWork)( void *context, unsigned index, char *buffer, size_t bufsize );
+
+struct IOPool
+// purpose: hand out the files of a phase to the I/O threads, see -j
+{
+    IOWork work;
+    void *context;
+    unsigned count;              // number of files
+    unsigned next;               // next file to hand out
+    size_t bufsize;              // auxiliary buffer of each thread
+    int error;                   // first error returned by 'work'
+    pthread_mutex_t lock;
+};
+
+// identify() resolves the host name with non reentrant calls
+static pthread_mutex_t identify_lock = PTHREAD_MUTEX_INITIALIZER;
+
+void *
+io_pool_worker( void *arg )
+/* purpose: run the work of the pool on files until none is left or one failed */
+{
+    IOPool *pool = static_cast<IOPool *>( arg );
+    char *buffer = static_cast<char *>( malloc(pool->bufsize) );
+
+    for (;;)
+    {
+        pthread_mutex_lock( &pool->lock );
+        if ( buffer == NULL && pool->error == 0 ) pool->error = 2;
+        unsigned index = pool->next++;
+        bool stop = ( index >= pool->count || pool->error != 0 );
+        pthread_mutex_unlock( &pool->lock );
+        if ( stop ) break;
+
+        int error = pool->work( pool->context, index, buffer, pool->bufsize );
+        if ( error )
+        {
+            pthread_mutex_lock( &pool->lock );
+            if ( pool->error == 0 ) pool->error = error;
+            pthread_mutex_unlock( &pool->lock );
+        }
+    }
+
+    free( static_cast<void *>(buffer) );
+    return NULL;
+}
+
+int
+run_io_pool( unsigned threads, unsigned count, size_t bufsize, IOWork work, void *context )
+/* purpose: call work(context, index, buffer, bufsize) for every index below
+ *          'count', from 'threads' threads with an auxiliary buffer each
+ * paramtr: threads (IN): number of I/O threads, 1 keeps the calling thread only
+ *          count (IN): number of files
+ *          bufsize (IN): size of the auxiliary buffer of each thread
+ * returns: 0, or the first error returned by 'work' */
+{
+    IOPool pool = { work, context, count, 0, bufsize, 0, PTHREAD_MUTEX_INITIALIZER };
+    if ( threads > count ) threads = count;
+
+    pthread_t *ids = static_cast<pthread_t *>( calloc( threads + 1, sizeof(pthread_t) ) );
+    unsigned started = 0;
+    while ( threads > 1 && started < threads &&
+            pthread_create( &ids[started], NULL, io_pool_worker, &pool ) == 0 )
+        started++;
+
+    // single stream, or no thread could be created: files are handled in order
+    if ( started == 0 ) io_pool_worker( &pool );
+
+    for ( unsigned t = 0; t < started; t++ ) pthread_join( ids[t], NULL );
+    free( static_cast<void *>(ids) );
+    return pool.error;
+}
+
+bool
+all_regular( InputFile *inputs, size_t n )
+{
+    for ( unsigned int j = 0; j < n; j++ )
+        if ( ! inputs[j].regular ) return false;
+    return true;
+}
+
+struct InputContext
+// purpose: what PHASE 1 needs to read any of the inputs from an I/O thread
+{
+    InputFile *inputs;
+    const AccessPattern *access;
+    char *memory_buffer;         // destination of every input and its markers
+    const size_t *offsets;       // where each input starts in memory_buffer
+    PhaseStats *stats;           // read counters of each input
+};
+
+int
+read_input_job( void *arg, unsigned j, char *buffer, size_t bufsize )
+/* purpose: read input j between its markers at its place in the memory buffer
+ * returns: 0 on success, 1 on error */
+{
+    static const AccessPattern chunks = { ACCESS_SEQ, INGEST_CHUNK, 0, 0 };
+    InputContext *context = static_cast<InputContext *>( arg );
+    InputFile &input = context->inputs[j];
+    PhaseStats &stats = context->stats[j];
+    const AccessPattern &access = pattern_active( *context->access ) ? *context->access : chunks;
+    char *destination = context->memory_buffer + context->offsets[j];
+
+    size_t size = input_marker( buffer, bufsize, "start", input.name );
+    memcpy( destination, buffer, size );
+    destination += size;
+
+    if ( read_input_pattern( input, access, destination, stats ) ) return 1;
+    if ( digest_input( j, input.name, destination, input.size ) ) return 1;
+
+    if ( access.kind == ACCESS_SMALL &&
+            read_input_parts( input.name, destination, input.size, access, buffer, bufsize, stats ) ) return 1;
+    destination += input.size;
+
+    size = input_marker( buffer, bufsize, "final", input.name );
+    memcpy( destination, buffer, size );
+    return 0;
+}
+
+int
+map_input_job( void *arg, unsigned j, char *buffer, size_t bufsize )
+/* purpose: map input j, see map_input_file */
+{
+    InputContext *context = static_cast<InputContext *>( arg );
+    InputFile &input = context->inputs[j];
+    if ( map_input_file( input, context->stats[j] ) ) return 1;
+    return digest_input( j, input.name, input.data, input.size ) ? 1 : 0;
+}
+
+int
+read_inputs_parallel( InputFile *inputs, size_t n, const AccessPattern &access,
+                      unsigned threads, bool map, char *buffer, size_t bufsize,
+                      char **memory_buffer, size_t *capacity, size_t *length )
+/* purpose: read_input_blocks (or the mapping of load_input_files) with the
+ *          inputs spread over I/O threads; every input must be regular so
+ *          that its place in the memory buffer is known upfront
+ * paramtr: map (IN): map the inputs instead of reading them, memory_buffer,
+ *                    capacity and length are then left alone
+ * returns: 0 on success, 1 on error */
+{
+    size_t *offsets = static_cast<size_t *>( calloc( n + 1, sizeof(size_t) ) );
+    PhaseStats *stats = static_cast<PhaseStats *>( calloc( n + 1, sizeof(PhaseStats) ) );
+    InputContext context = { inputs, &access, NULL, offsets, stats };
+    int error = 0;
+
+    if ( map )
+    {
+        error = run_io_pool( threads, n, bufsize, map_input_job, &context );
+    }
+    else
+    {
+        *length = 0;
+        for ( unsigned int j = 0; j < n; j++ )
+        {
+            offsets[j] = *length;
+            *length += 2 * input_marker( buffer, bufsize, "start", inputs[j].name ) + inputs[j].size;
+        }
+
+        error = reserve( memory_buffer, capacity, *length ) ? 1 : 0;
+        if ( ! error )
+        {
+            context.memory_buffer = *memory_buffer;
+            error = run_io_pool( threads, n, bufsize, read_input_job, &context );
+        }
+    }
+
+    merge_stats( phase_stats[PHASE_READ], stats, n );
+    free( static_cast<void *>(stats) );
+    free( static_cast<void *>(offsets) );
+    return error;
+}
+
+struct OutputContext
+// purpose: what PHASE 2 needs to write any of the outputs
+{
+    DirtyVector *iox;
+    const char *arg0;
+    double start;
+    bool condor;
+    const char *prefix;
+    char data_unit;
+    int ingest;
+    InputFile *inputs;
+    const char *memory_buffer;
+    size_t memory_length;
+    const WriteOptions *write_options;
+    const AccessPattern *access;
+    const char *block;
+    PhaseStats *stats;           // write counters of each output with -j, else NULL
+};
+
+int
+write_output_job( void *arg, unsigned i, char *buffer, size_t bufsize )
+/* purpose: create output i with its generated data or inputs, and its record
+ * returns: 0 on success, 2 on error */
+{
+    OutputContext *context = static_cast<OutputContext *>( arg );
+    DirtyVector *iox = context->iox;
+    const WriteOptions &write_options = *context->write_options;
+    const AccessPattern &access = *context->access;
+    // single stream: the record shows the phase as far as it went
+    PhaseStats &stats = ( context->stats != NULL ) ? context->stats[i] : phase_stats[PHASE_WRITE];
+    unsigned long xsize = 0;
+    const char *outname = iox[2][i];
+    char filename[256];
+    FILE *out;
+    double opening = monotonic();
+
+    if ( iox[2][i][0] == '-' && iox[2][i][1] == '\0' )
+    {
+        out = fdopen( STDOUT_FILENO, "a" );
+    }
+    else 
+    {
+        char *filesize = strrchr( (char*)iox[2][i], '=' );
+        
+        if ( filesize != NULL )
+        {
+            memcpy( filename, iox[2][i], sizeof(char) * ( filesize - iox[2][i] ) );
+            filename[( filesize - iox[2][i] )] = '\0';
+            outname = filename;
+
+            out = fopen( filename, "w" );
+
+            unsigned long long unit_multiplier = 1;
+
+            if ( strchr( "BKMG\0", filesize[ strlen( filesize ) - 1 ] ) != NULL ) 
+            {
+                unit_multiplier = data_unit_multiplier( filesize[ strlen( filesize ) - 1 ] );
+            }
+
+            filesize[ strlen( filesize ) - 1 ] = '\0';
+            xsize = strtoul(filesize + 1, 0, 10) * unit_multiplier;
+        }
+        else 
+        {
+            out = fopen( iox[2][i], "w" );
+        }
+    }
+
+    stats.open += monotonic() - opening;
+
+    if ( ! out )
+    {
+        fprintf( stderr, "open(%s): %s\n", iox[2][i], strerror(errno) );
+        return 2;
+    }
+
+    stats.files++;
+    int error = 0;
+    Digest digest;
+    digest_init( digest, digest_kind );
+    if ( iox[4].size() > 0 || xsize > 0 )
+    {
+        if ( xsize <= 0 )
+        {
+            const char *xsize_str = iox[4][ i % iox[4].size() ];  
+            xsize = strtoul(xsize_str, 0, 10) * data_unit_multiplier( context->data_unit );
+        }
+
+        if ( context->block != NULL )
+        {
+            if ( access.kind == ACCESS_SMALL && strcmp( outname, "-" ) != 0 )
+            {
+                error = generate_small_files( out, outname, xsize, access, write_options, context->block, stats );
+                // the output only lists the parts
+                for ( unsigned long k = 0; k < access.files; k++ )
+                {
+                    int size = snprintf( buffer, bufsize, "%s.%lu\n", outname, k );
+                    digest_update( digest, buffer, size );
+                }
+            }
+            else if ( pattern_active( access ) )
+            {
+                error = generate_output_pattern( out, xsize, access, write_options, context->block );
+                digest_pattern( digest, xsize );
+            }
+            else
+            {
+                error = generate_output_blocks( out, xsize, write_options, context->block );
+                digest_pattern( digest, xsize );
+            }
+        }
+        else
+        {
+            generate_output_file( out, xsize );
+            digest_pattern( digest, xsize );
+        }
+    }
+    else
+    {
+        fputs( context->prefix, out );
+        digest_update( digest, context->prefix, strlen( context->prefix ) );
+        
+        if ( context->ingest == INGEST_MMAP || context->ingest == INGEST_COPY )
+        {
+            error = write_input_files( out, context->inputs, iox[1].size(), buffer, bufsize );
+            // copied inputs never reach memory, -K maps them instead
+            for ( unsigned int j = 0; digest.kind != DIGEST_NONE && j < iox[1].size(); j++ )
+            {
+                const InputFile &input = context->inputs[j];
+                digest_update( digest, buffer, input_marker( buffer, bufsize, "start", input.name ) );
+                digest_update( digest, input.data, input.data != NULL ? input.size : 0 );
+                digest_update( digest, buffer, input_marker( buffer, bufsize, "final", input.name ) );
+            }
+        }
+        else if ( context->ingest == INGEST_READ )
+        {
+            fwrite( context->memory_buffer, sizeof(char), context->memory_length, out );
+            digest_update( digest, context->memory_buffer, context->memory_length );
+        }
+        else if ( context->memory_buffer != NULL ) {
+            fputs( context->memory_buffer, out );
+            digest_update( digest, context->memory_buffer, strlen( context->memory_buffer ) );
+        }                    
+    }
+
+    if ( error )
+    {
+        fprintf( stderr, "write(%s): %s\n", iox[2][i], strerror(errno) );
+        fclose(out);
+        return 2;
+    }
+
+    // create buffer, and fill with content
+    memset( buffer, 0, bufsize );
+    if ( context->stats != NULL )
+    {
+        // with -j the record of an output only covers its own writes, so it
+        // does not depend on what the other threads did so far
+        PhaseStats snapshot[PHASES];
+        memcpy( snapshot, phase_stats, sizeof(snapshot) );
+        snapshot[PHASE_WRITE] = stats;
+        snapshot[PHASE_WRITE].wall = monotonic() - opening;
+
+        pthread_mutex_lock( &identify_lock );
+        identify( buffer, bufsize, context->arg0, context->start, context->condor, iox, iox[2][i], snapshot );
+        pthread_mutex_unlock( &identify_lock );
+    }
+    else
+    {
+        identify( buffer, bufsize, context->arg0, context->start, context->condor, iox, iox[2][i] );
+    }
+    fputs( buffer, out );
+    digest_update( digest, buffer, strlen( buffer ) );
+    fflush( out );
+    off_t written = ftello( out );
+    if ( written > 0 ) stats.bytes += written;
+
+    double closing = monotonic();
+    if ( write_options.sync_end ) fsync( fileno(out) );
+    fclose(out);
+    stats.close += monotonic() - closing;
+
+    if ( digest.kind != DIGEST_NONE )
+    {
+        digest_final( digest, output_digests + i * DIGEST_HEX );
+        if ( strcmp( outname, "-" ) != 0 && write_sidecar( outname, output_digests + i * DIGEST_HEX ) )
+        {
+            fprintf( stderr, "write(%s.%s): %s\n", outname, digest_names[digest.kind], strerror(errno) );
+            return 2;
+        }
+    }
+    return 0;
+}
+
+int
+main( int argc, char *argv[] )
+{
+    // process rank - altered only in the MPI version
+    int rank = 0;
+
+#ifdef WITH_MPI
+    MPI_Init( &argc, &argv );
+
+    MPI_Comm_rank( MPI_COMM_WORLD, &rank );
+#endif
+
+    // required CPU time
+    unsigned long spinout = 0;
+    // required wall time
+    double timeout = 0;
+    // required sleep time
+    double sleeptime = 0;
+
+    // buffer for mock memory or input files content
+    char *memory_buffer = NULL;
+    // auxiliary variables for memory management
+    unsigned long memory_size = 0;
+    size_t mem_buf_size = 0;
+    bool root_only_memory_allocation = false;
+    size_t bufsize = getpagesize() << 4;
+    if ( bufsize < 16384 ) bufsize = 16384;
+    char *buffer = static_cast<char *>( malloc(bufsize) );    
+
+    int state = 0;
+    bool condor = false;
+    // DK: DEPRACTED
+    // unsigned long gensize = 0;
+    char data_unit = 'B';
+    DirtyVector iox[5];
+    WriteOptions write_options = { 0, false, false, false, 0 };
+    int ingest = INGEST_LINES;
+    AccessPattern access = SEQUENTIAL;
+    unsigned threads = 1;
+    char *block = NULL;
+
+    // when did we start
+    double start = now();
+    char *prefix = strdup("  ");
+
+    // determine base name of input file
+    char *logfile = 0;
+    char *ptr = 0;
+    if ( (ptr = strrchr(argv[0], '/')) == 0 ) ptr = argv[0];
+    else ptr++;
+
+    // complain, if no parameters were given
+    if ( rank == 0 && argc == 1 )
+    {
+        helpMe( ptr, timeout, spinout, sleeptime, prefix );
+        return 0;
+    }
+
+    // prepare generator pattern
+    for ( size_t i = 0; i < sizeof(output); i++ ) output[i] = pattern[i & 63];
+
+    for ( int i = 1; i < argc; ++i )
+    {
+        char *s = argv[i];
+        if ( s[0] == '-' && s[1] != 0 )
+        {
+            if ( strchr( "iotTGaepPlCmruhsbDFSIAjKk\0", s[1] ) != NULL )
             {
                 switch (s[1])
                 {
@@ -784,6 +2483,33 @@ main( int argc, char *argv[] )
                 case 's':
                     state = 19;
                     break;
+                case 'b':
+                    state = 20;
+                    break;
+                case 'S':
+                    state = 21;
+                    break;
+                case 'I':
+                    state = 22;
+                    break;
+                case 'A':
+                    state = 23;
+                    break;
+                case 'j':
+                    state = 24;
+                    break;
+                case 'K':
+                    state = 25;
+                    break;
+                case 'k':
+                    state = 5;
+                    break;
+                case 'D':
+                    write_options.direct = true;
+                    continue;
+                case 'F':
+                    write_options.preallocate = true;
+                    continue;
 #ifdef WITH_MPI
                 case 'r':
                     root_only_memory_allocation = true;
@@ -809,7 +2535,7 @@ main( int argc, char *argv[] )
                 ptr = s;
                 break;
             case 11:
-                timeout = strtoul(s, 0, 10);
+                timeout = strtod(s, 0);
                 break;
             case 12:
                 logfile = s;
@@ -833,11 +2559,58 @@ main( int argc, char *argv[] )
                 data_unit = s[0];
                 break;
             case 19:
-                sleeptime = strtoul(s, 0, 10);
+                sleeptime = strtod(s, 0);
+                break;
+            case 20:
+                write_options.block_size = parse_size( s, 'B' );
+                break;
+            case 21:
+                if ( parse_sync_policy( s, write_options ) )
+                {
+                    fprintf( stderr, "[error] unknown fsync policy \"%s\", use none, end or a number of MB\n", s );
+                    free( static_cast<void *>(buffer) );
+                    return 1;
+                }
+                break;
+            case 22:
+                ingest = parse_ingest_mode( s );
+                if ( ingest < 0 )
+                {
+                    fprintf( stderr, "[error] unknown ingestion mode \"%s\", use lines, read, mmap or copy\n", s );
+                    free( static_cast<void *>(buffer) );
+                    return 1;
+                }
+                break;
+            case 23:
+                if ( parse_access_pattern( s, access ) )
+                {
+                    fprintf( stderr, "[error] unknown access pattern \"%s\", use seq[:req], random[:req], strided[:req[:stride]] or small:n[:req]\n", s );
+                    free( static_cast<void *>(buffer) );
+                    return 1;
+                }
+                break;
+            case 24:
+                threads = strtoul(s, 0, 10);
+                if ( threads < 1 ) threads = 1;
+                break;
+            case 25:
+                digest_kind = DIGESTS;
+                for ( int k = 0; k < DIGESTS; k++ )
+                    if ( strcmp( s, digest_names[k] ) == 0 ) digest_kind = k;
+                if ( digest_kind == DIGESTS )
+                {
+                    fprintf( stderr, "[error] unknown checksum \"%s\", use none, sha256 or xxh64\n", s );
+                    free( static_cast<void *>(buffer) );
+                    return 1;
+                }
                 break;
             }
             state = 0;
         }
+        else if ( state == 5 )
+        {
+            external_inputs.push_back(s);
+        }
         else
         {
             iox[state].push_back(s);
@@ -859,6 +2632,34 @@ main( int argc, char *argv[] )
         sleeptime = 0;
     }
 
+    if ( digest_kind != DIGEST_NONE )
+    {
+        input_digests = static_cast<char *>( calloc( iox[1].size() + 1, DIGEST_HEX ) );
+        output_digests = static_cast<char *>( calloc( iox[2].size() + 1, DIGEST_HEX ) );
+    }
+
+    if ( pattern_active( access ) )
+    {
+        // -A takes over the generated data: one block per request
+        write_options.block_size = access.request;
+        write_options.direct = false;
+    }
+
+    if ( write_options.block_size > 0 )
+    {
+        // keep the pattern continuous across blocks, and O_DIRECT aligned
+        size_t align = write_options.direct ? getpagesize() : 64;
+        write_options.block_size = ( write_options.block_size + align - 1 ) / align * align;
+
+        block = allocate_block_buffer( write_options.block_size );
+        if ( block == NULL )
+        {
+            fprintf( stderr, "[error] cannot allocate a %lu bytes block\n", (unsigned long) write_options.block_size );
+            free( static_cast<void *>(buffer) );
+            return 1;
+        }
+    }
+
     if (memory_size)
     {
         if ((rank == 0) || (!root_only_memory_allocation))
@@ -870,14 +2671,38 @@ main( int argc, char *argv[] )
     if (rank == 0)
     {
         // PHASE 1 - reading input files to memory if any; use the memory_buffer for storing all the file content
+        double phase_start = monotonic();
         // 1. check how much memory do we need
         unsigned long input_files_size = 0;
-        FILE *out;
-
-        input_files_size = calculate_input_file_size( iox, buffer );
+        InputFile *inputs = NULL;
+        size_t memory_length = 0;
+
+        // without pass-through output there is nothing to copy: read the inputs
+        if ( ingest == INGEST_COPY && ! has_passthrough_output( iox ) ) ingest = INGEST_READ;
+        // checksums need the content in memory, which copies never bring
+        if ( ingest == INGEST_COPY && digest_kind != DIGEST_NONE ) ingest = INGEST_MMAP;
+        // access patterns read the inputs with their own requests, and I/O
+        // threads need to know where each input goes in the memory buffer
+        if ( ingest == INGEST_LINES && ( pattern_active( access ) || threads > 1 ) ) ingest = INGEST_READ;
+
+        if ( ingest == INGEST_LINES )
+        {
+            input_files_size = calculate_input_file_size( iox, buffer );
+        }
+        else
+        {
+            unsigned long long total = 0;
+            inputs = open_input_files( iox, buffer, bufsize, &total );
+            if ( inputs == NULL )
+            {
+                free( static_cast<void *>(buffer) );
+                return 2;
+            }
+            input_files_size = total;
+        }
 
-        // 2. allocate memory buffer
-        if ( input_files_size > mem_buf_size )
+        // 2. allocate memory buffer (mapped and copied inputs do not need it)
+        if ( input_files_size > mem_buf_size && ( ingest == INGEST_LINES || ingest == INGEST_READ ) )
         {
             if ( memory_buffer == NULL )
             {
@@ -892,85 +2717,66 @@ main( int argc, char *argv[] )
         }
 
         // 3. read the input files content
-        if( read_input_files( iox, buffer, bufsize, memory_buffer ) ) {
+        int error = 0;
+        if ( ingest == INGEST_LINES )
+        {
+            error = read_input_files( iox, buffer, bufsize, memory_buffer );
+        }
+        else if ( ingest == INGEST_READ )
+        {
+            size_t capacity = 0;
+            if ( memory_buffer != NULL )
+                capacity = input_files_size > mem_buf_size ? input_files_size : mem_buf_size;
+            if ( threads > 1 && all_regular( inputs, iox[1].size() ) )
+                error = read_inputs_parallel( inputs, iox[1].size(), access, threads, false,
+                                              buffer, bufsize, &memory_buffer, &capacity, &memory_length );
+            else
+                error = read_input_blocks( inputs, iox[1].size(), access, buffer, bufsize,
+                                           &memory_buffer, &capacity, &memory_length );
+        }
+        else if ( ingest == INGEST_MMAP && threads > 1 && all_regular( inputs, iox[1].size() ) )
+        {
+            error = read_inputs_parallel( inputs, iox[1].size(), access, threads, true,
+                                          buffer, bufsize, NULL, NULL, NULL );
+        }
+        else
+        {
+            error = load_input_files( inputs, iox[1].size(), ingest == INGEST_MMAP );
+        }
+
+        if ( error ) {
             free( static_cast<void *>(buffer) );
             return 2;
         }
         // printf( "%s\n", memory_buffer );
+        phase_stats[PHASE_READ].wall = monotonic() - phase_start;
 
         // PHASE 2 - writing output files if any; the -G switch has higher priority than input files
-        for ( unsigned i = 0; i < iox[2].size(); ++i )
-        {
-            unsigned long xsize = 0;
-
-            if ( iox[2][i][0] == '-' && iox[2][i][1] == '\0' )
-            {
-                out = fdopen( STDOUT_FILENO, "a" );
-            }
-            else 
-            {
-                char *filesize = strrchr( (char*)iox[2][i], '=' );
-                char filename[256];
-                
-                if ( filesize != NULL )
-                {
-                    memcpy( filename, iox[2][i], sizeof(char) * ( filesize - iox[2][i] ) );
-                    filename[( filesize - iox[2][i] )] = '\0';
-
-                    out = fopen( filename, "w" );
-
-                    unsigned long long unit_multiplier = 1;
-
-                    if ( strchr( "BKMG\0", filesize[ strlen( filesize ) - 1 ] ) != NULL ) 
-                    {
-                        unit_multiplier = data_unit_multiplier( filesize[ strlen( filesize ) - 1 ] );
-                    }
-
-                    filesize[ strlen( filesize ) - 1 ] = '\0';
-                    xsize = strtoul(filesize + 1, 0, 10) * unit_multiplier;
-                }
-                else 
-                {
-
-
-                    out = fopen( iox[2][i], "w" );
-                }
-            }
+        phase_start = monotonic();
+        PhaseStats *output_stats = NULL;
+        if ( threads > 1 )
+            output_stats = static_cast<PhaseStats *>( calloc( iox[2].size() + 1, sizeof(PhaseStats) ) );
 
-            if ( out )
-            {
-                if ( iox[4].size() > 0 || xsize > 0 )
-                {
-                    if ( xsize <= 0 )
-                    {
-                        const char *xsize_str = iox[4][ i % iox[4].size() ];  
-                        xsize = strtoul(xsize_str, 0, 10) * data_unit_multiplier( data_unit );
-                    }
+        OutputContext outputs = { iox, ptr, start, condor, prefix, data_unit, ingest, inputs,
+                                  memory_buffer, memory_length, &write_options, &access, block,
+                                  output_stats };
+        error = run_io_pool( threads, iox[2].size(), bufsize, write_output_job, &outputs );
 
-                    generate_output_file( out, xsize );
-                }
-                else
-                {
-                    fputs( prefix, out );
-                    
-                    if(memory_buffer != NULL) {
-                        fputs( memory_buffer, out );
-                    }                    
-                }
+        if ( output_stats != NULL )
+        {
+            merge_stats( phase_stats[PHASE_WRITE], output_stats, iox[2].size() );
+            free( static_cast<void *>(output_stats) );
+        }
+        phase_stats[PHASE_WRITE].wall = monotonic() - phase_start;
 
-                // create buffer, and fill with content
-                memset( buffer, 0, bufsize );
-                identify( buffer, bufsize, ptr, start, condor, iox, iox[2][i] );
-                fputs( buffer, out );
-                fclose(out);
-            }
-            else
-            {
-                fprintf( stderr, "open(%s): %s\n", iox[2][i], strerror(errno) );
-                free( static_cast<void *>(buffer) );
-                return 2;
-            }
+        if ( error ) {
+            if ( block != NULL ) free( static_cast<void *>(block) );
+            free( static_cast<void *>(buffer) );
+            return 2;
         }
+
+        if ( inputs != NULL )
+            close_input_files( inputs, iox[1].size() );
     }
 
     double timestamp = now();
@@ -997,19 +2803,21 @@ main( int argc, char *argv[] )
         else
         {
             // printf( "[debug] you specified %lu [s] to spin so we will spin for %d [s]\n", spinout, time_diff );
+            double phase_start = monotonic();
             spin(time_diff);
+            phase_stats[PHASE_SPIN].wall = monotonic() - phase_start;
         }
     }
 
     // PHASE 4 - sleeping
-    if ( timeout )
+    if ( timeout > 0 )
     {
         timestamp = now();
-        time_diff = timeout - ( (int) (timestamp - start) );
+        double remaining = timeout - ( timestamp - start );
 
-        if ( time_diff < 0 )
+        if ( remaining < 0 )
         {
-            printf("[error] you specified %lu [s] to sleep but you've already exceeded this value by %d [s]\n", timeout, -time_diff );
+            printf("[error] you specified %g [s] to sleep but you've already exceeded this value by %.3f [s]\n", timeout, -remaining );
 
             if ( memory_buffer != NULL )
                 free( static_cast<void *>(memory_buffer) );
@@ -1022,14 +2830,18 @@ main( int argc, char *argv[] )
         }
         else
         {
-            // printf( "[debug] you specified %lu [s] to sleep so we will sleep for %d [s]\n", timeout, time_diff );
-            sleep(time_diff);
+            // printf( "[debug] you specified %g [s] to sleep so we will sleep for %.3f [s]\n", timeout, remaining );
+            double phase_start = monotonic();
+            sleep_seconds(remaining);
+            phase_stats[PHASE_SLEEP].wall += monotonic() - phase_start;
         }
     }
 
-    if ( sleeptime )
+    if ( sleeptime > 0 )
     {
-        sleep(sleeptime);
+        double phase_start = monotonic();
+        sleep_seconds(sleeptime);
+        phase_stats[PHASE_SLEEP].wall += monotonic() - phase_start;
     }
 
     // append atomically to logfile
@@ -1043,7 +2855,7 @@ main( int argc, char *argv[] )
         else
         {
             memset(buffer, 0, bufsize);
-            identify(buffer, bufsize, ptr, start, condor, iox, logfile);
+            identify(buffer, bufsize, ptr, start, condor, iox, logfile, phase_stats, true);
             append(buffer, bufsize, '\n');
             write(fd, buffer, strlen(buffer)); // atomic write
             close(fd);
@@ -1053,6 +2865,12 @@ main( int argc, char *argv[] )
     if ( memory_buffer != NULL )
         free( static_cast<void *>(memory_buffer) );
 
+    if ( block != NULL )
+        free( static_cast<void *>(block) );
+
+    free( static_cast<void *>(input_digests) );
+    free( static_cast<void *>(output_digests) );
+
     if ( buffer != NULL )
         free( static_cast<void *>(buffer) );
 
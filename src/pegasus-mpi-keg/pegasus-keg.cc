@@ -61,6 +61,8 @@ extern char **environ;
 #include <bredala/data_model/boost_macros.h>
 
 #include <assert.h>
+#include <limits.h>
+#include <pthread.h>
 #include <map>
 #include <cstdlib>
 
@@ -526,6 +528,10 @@ helpMe( const char *ptr, unsigned long timeout, unsigned long spinout,
     printf( " -i ..\tenumerate space-separated list input to read and copy\n" );
     printf( " -G ..\tenumerate space-separated list of output file sizes\n" );
     printf( " -u un\tdata unit for output files generator - accepted values includes [ B K M G ], default is B\n" );
+#ifdef WITH_DECAF
+    printf( " -D r\tDecaf role: 1 producer, 2 intermediate, 0 consumer\n" );
+    printf( " -c cs\tsize of the chunks the producer puts (suffix B K M G, below 2G), default 1G\n" );
+#endif
     printf( " -p ..\tenumerate space-separated parameters to mention\n" );
     printf( " -e ..\tenumerate space-separated environment values to print\n" );
     printf( " -C\tprint all environment variables starting with _CONDOR\n" );
@@ -564,6 +570,10 @@ data_unit_multiplier( char data_unit )
 #define MIN(a,b) ((a) < (b) ? (a) : (b))
 #endif // MIN
 
+#ifndef MAX
+#define MAX(a,b) ((a) > (b) ? (a) : (b))
+#endif // MAX
+
 char*
 allocate_mem_buffer( size_t mem_buf_size )
 /* purpose: allocate a memory buffor on heap and prevent it from being paged out
@@ -696,6 +706,147 @@ generate_output_file( FILE *out, unsigned long xsize )
     fputc( '\n', out );
 }
 
+#ifdef WITH_DECAF
+// default size of the chunks the producer puts, Bredala arrays have int sizes
+static const size_t DECAF_CHUNK = 1ul << 30;
+// bytes read between two progress notifications of the input stream
+static const size_t STREAM_READ = 16ul << 20;
+
+struct InputStream
+// purpose: inputs read into the memory buffer by a thread while the producer
+//          puts the part already read, see stream_input_files
+{
+    DirtyVector *iox;
+    char *memory_buffer;
+    size_t capacity;             // allocated size of memory_buffer
+    size_t loaded;               // bytes of memory_buffer ready to be put
+    bool done;                   // every input has been read
+    int error;
+    pthread_mutex_t lock;
+    pthread_cond_t progress;
+};
+
+void
+publish_input( InputStream *stream, size_t loaded, bool done, int error )
+{
+    pthread_mutex_lock( &stream->lock );
+    stream->loaded = loaded;
+    stream->done = done;
+    stream->error = error;
+    pthread_cond_broadcast( &stream->progress );
+    pthread_mutex_unlock( &stream->lock );
+}
+
+void *
+stream_input_files( void *arg )
+/* purpose: same content as read_input_files, with read() calls into the
+ *          memory buffer and the progress published as it goes
+ * paramtr: arg (InputStream*): stream to fill, capacity bounds every read */
+{
+    InputStream *stream = static_cast<InputStream *>( arg );
+    DirtyVector *iox = stream->iox;
+    char marker[4096];
+    size_t offset = 0;
+    struct stat file_stat;
+
+    for ( unsigned int j = 0; j < iox[1].size(); j++ )
+    {
+        int fd = ( iox[1][j][0] == '-' && iox[1][j][1] == '\0' ) ?
+                 STDIN_FILENO :
+                 open( iox[1][j], O_RDONLY );
+        if ( fd == -1 )
+        {
+            printf( "[error] open \"%s\": %d: %s\n", iox[1][j], errno, strerror(errno) );
+            publish_input( stream, offset, true, 1 );
+            return NULL;
+        }
+
+        size_t marker_len = snprintf( marker, sizeof(marker), "--- start %s ----\n", iox[1][j] );
+        if ( offset + 2 * marker_len > stream->capacity ) break;
+        memcpy( stream->memory_buffer + offset, marker, marker_len );
+        offset += marker_len;
+
+        // regular files: no more than calculate_input_file_size accounted for
+        size_t room = stream->capacity - offset - marker_len;
+        if ( fstat( fd, &file_stat ) == 0 && S_ISREG(file_stat.st_mode) )
+            room = MIN( room, (size_t) file_stat.st_size );
+
+        while ( room > 0 )
+        {
+            ssize_t got = read( fd, stream->memory_buffer + offset, MIN( room, STREAM_READ ) );
+            if ( got < 0 && errno == EINTR ) continue;
+            if ( got < 0 )
+            {
+                printf( "[error] read \"%s\": %d: %s\n", iox[1][j], errno, strerror(errno) );
+                if ( fd != STDIN_FILENO ) close( fd );
+                publish_input( stream, offset, true, 1 );
+                return NULL;
+            }
+            if ( got == 0 ) break;
+
+            offset += got;
+            room -= got;
+            publish_input( stream, offset, false, 0 );
+        }
+        if ( fd != STDIN_FILENO ) close( fd );
+
+        snprintf( marker, sizeof(marker), "--- final %s ----\n", iox[1][j] );
+        memcpy( stream->memory_buffer + offset, marker, marker_len );
+        offset += marker_len;
+    }
+
+    publish_input( stream, offset, true, 0 );
+    return NULL;
+}
+
+int
+wait_for_input( InputStream *stream, size_t needed )
+/* purpose: block until the first 'needed' bytes of the memory buffer are read
+ * returns: 0 once they are, 1 if reading failed */
+{
+    pthread_mutex_lock( &stream->lock );
+    while ( stream->loaded < needed && ! stream->done )
+        pthread_cond_wait( &stream->progress, &stream->lock );
+    int error = stream->error;
+    pthread_mutex_unlock( &stream->lock );
+    return error;
+}
+
+int
+put_chunks( Decaf *decaf, const char *memory_buffer, size_t data_size, size_t chunk_size,
+            InputStream *stream, unsigned long sleeptime )
+/* purpose: put the memory buffer in chunks of 'chunk_size' bytes, each one
+ *          as soon as the input stream has read it
+ * paramtr: data_size (IN): bytes to put, at least what the stream reads
+ *          sleeptime (IN): seconds to sleep after each put
+ * returns: 0 on success, 1 if reading the inputs failed */
+{
+    // an empty buffer is still put once, the consumers expect a message
+    size_t chunks = MAX( ( data_size + chunk_size - 1 ) / chunk_size, (size_t) 1 );
+    size_t idx = 0;
+
+    for ( size_t k = 0; k < chunks; k++ )
+    {
+        size_t length = MIN( chunk_size, data_size - idx );
+        if ( wait_for_input( stream, idx + length ) ) return 1;
+
+        // a slice of the memory buffer, not owned by the field: nothing is
+        // copied before Decaf serializes it
+        pConstructData container;
+        ArrayFieldc data( const_cast<char *>( memory_buffer + idx ), static_cast<int>( length ), 1, false );
+        container->appendData("pos", data,
+                              DECAF_NOFLAG, DECAF_PRIVATE,
+                              DECAF_SPLIT_DEFAULT, DECAF_MERGE_DEFAULT);
+        decaf->put(container, "out");
+
+        idx += length;
+        if (sleeptime) sleep(sleeptime);
+    }
+
+    return 0;
+}
+#endif // WITH_DECAF
+
 int
 main( int argc, char *argv[] )
 {
@@ -703,13 +854,22 @@ main( int argc, char *argv[] )
     int rank = 0;
 
 #ifdef WITH_MPI
+#ifdef WITH_DECAF
+    // the producer reads its inputs from a second thread, which never calls MPI
+    int provided;
+    MPI_Init_thread( &argc, &argv, MPI_THREAD_FUNNELED, &provided );
+    if ( provided < MPI_THREAD_FUNNELED )
+        fprintf( stderr, "WARNING: MPI without thread support, inputs are read before being put\n" );
+#else
     MPI_Init( &argc, &argv );
+#endif
 
     MPI_Comm_rank( MPI_COMM_WORLD, &rank );
 #endif
 
 #ifdef WITH_DECAF
     Workflow workflow;
+    // graph written next to keg-<ranks>.conf by IOSyntheticWorkflow
     Workflow::make_wflow_from_json(workflow, "linear2.json");
 
     // create decaf
@@ -717,6 +877,7 @@ main( int argc, char *argv[] )
 
     fprintf(stderr,"Halo from Decaf at rank %d\n", rank);
     unsigned long prod = 0;
+    size_t chunk_size = DECAF_CHUNK;
 #endif
 
     // required CPU time
@@ -767,7 +928,7 @@ main( int argc, char *argv[] )
         char *s = argv[i];
         if ( s[0] == '-' && s[1] != 0 )
         {
-            if ( strchr( "iotTGaepPlCmruhDs\0", s[1] ) != NULL )
+            if ( strchr( "iotTGaepPlCmruhDcs\0", s[1] ) != NULL )
             {
                 switch (s[1])
                 {
@@ -811,6 +972,9 @@ main( int argc, char *argv[] )
                 case 'D':
                     state = 18;
                     break;
+                case 'c':
+                    state = 20;
+                    break;
 #endif
                 case 's':
                     state = 19;
@@ -873,6 +1037,20 @@ main( int argc, char *argv[] )
                 else
                         fprintf(stderr, "I'm Decaf consumer at rank %d\n", decaf->world->rank());
                 break;
+            case 20:
+            {
+                char *unit = 0;
+                chunk_size = strtoull( s, &unit, 10 );
+                if ( unit != 0 && *unit != '\0' ) chunk_size *= data_unit_multiplier( toupper(*unit) );
+                // Bredala arrays are indexed with an int
+                if ( chunk_size > (size_t) INT_MAX )
+                {
+                    fprintf( stderr, "[warning] chunk size %s is above 2G-1, using %d bytes\n", s, INT_MAX );
+                    chunk_size = INT_MAX;
+                }
+                if ( chunk_size == 0 ) chunk_size = DECAF_CHUNK;
+                break;
+            }
 #endif
 
             case 19:
@@ -896,7 +1074,14 @@ main( int argc, char *argv[] )
         }
     }
 
-    if (rank == 0 || rank == 4) //orc@01-07: workaround for last consumer rank to output file
+    // rank 0 does the I/O; under Decaf every producer rank puts its inputs
+    // and the consumer rank given outputs writes them
+    bool writer = ( rank == 0 );
+#ifdef WITH_DECAF
+    writer = writer || prod == 1 || ( prod == 0 && iox[2].size() > 0 );
+#endif
+
+    if ( writer )
     {
         // PHASE 1 - reading input files to memory if any; use the memory_buffer for storing all the file content
         // 1. check how much memory do we need
@@ -928,42 +1113,48 @@ main( int argc, char *argv[] )
             strcpy(memory_buffer, "");
         }
 
-        // 3. read the input files content
-        if( read_input_files( iox, buffer, bufsize, memory_buffer ) ) {
-            free( static_cast<void *>(buffer) );
-            return 2;
-        }
-        // printf( "%s\n", memory_buffer );
 #ifdef WITH_DECAF
         if(prod==1)
         {
-	    int size_limit = 1073742007;
-	    int idx = 0;
-	    int offset = 0;
-            int count = data_size/size_limit; //orc@01-07: will send chunks of 1GB
-            if (data_size == size_limit) count = 0;
+            // 3. read the input files content while the part already read is put
+            InputStream stream;
+            stream.iox = iox;
+            stream.memory_buffer = memory_buffer;
+            stream.capacity = MAX( input_files_size, mem_buf_size );
+            stream.loaded = 0;
+            stream.done = false;
+            stream.error = 0;
+            pthread_mutex_init( &stream.lock, NULL );
+            pthread_cond_init( &stream.progress, NULL );
+
+            pthread_t reader;
+            bool threaded = ( provided >= MPI_THREAD_FUNNELED &&
+                              pthread_create( &reader, NULL, stream_input_files, &stream ) == 0 );
+            // no thread available: read everything first, as before
+            if ( ! threaded ) stream_input_files( &stream );
+
+            int error = put_chunks( decaf, memory_buffer, data_size, chunk_size, &stream, sleeptime );
+
+            if ( threaded ) pthread_join( reader, NULL );
+            pthread_cond_destroy( &stream.progress );
+            pthread_mutex_destroy( &stream.lock );
 
-	    for (int k = 0; k<count+1; k++)
-            {
-		if (k!=count) offset = size_limit;
-		else offset = data_size - (size_limit*k);
-		char* prod_buffer = static_cast<char *>( malloc( sizeof(char) * offset ) );
-                memcpy(prod_buffer, &memory_buffer[idx], offset );
-                //orc@23-06: sending this memory buffer at the producer
-	        pConstructData container;
-                ArrayFieldc data(prod_buffer, offset, 1);
-                container->appendData("pos", data,
-                                      DECAF_NOFLAG, DECAF_PRIVATE,
-                                      DECAF_SPLIT_DEFAULT, DECAF_MERGE_DEFAULT);
-	        decaf->put(container, "out");
-		free( static_cast<void *>(prod_buffer) );
-		idx += size_limit;
-		if (sleeptime) sleep(sleeptime);
-            }
             fprintf(stderr, "producer %d terminating\n", decaf->world->rank());
             decaf->terminate();
+
+            if ( error ) {
+                free( static_cast<void *>(buffer) );
+                return 2;
+            }
         }
+        else
 #endif
+        // 3. read the input files content
+        if( read_input_files( iox, buffer, bufsize, memory_buffer ) ) {
+            free( static_cast<void *>(buffer) );
+            return 2;
+        }
+        // printf( "%s\n", memory_buffer );
 
         // PHASE 2 - writing output files if any; the -G switch has higher priority than input files
         for ( unsigned i = 0; i < iox[2].size(); ++i )
@@ -1073,13 +1264,12 @@ main( int argc, char *argv[] )
                 pConstructData container;
 
                 ArrayFieldc field = in_data.at("in")->getFieldData<ArrayFieldc>("pos");
-                if (field){
+                if (field)
                     fprintf(stderr, "Received data in dataflow\n");
-                    char* con_buffer = field.getArray();
-		}
                 else
                     fprintf(stderr, "Error: null pointer in dataflow\n");
 
+                // the field shares the received array, forwarding it copies nothing
                 container->appendData("pos", field,
                                       DECAF_NOFLAG, DECAF_PRIVATE,
                                       DECAF_SPLIT_DEFAULT, DECAF_MERGE_DEFAULT);
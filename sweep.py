@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+import os
+import sys
+import json
+import time
+import logging
+import itertools
+from datetime import datetime
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Optional, Dict, List
+
+from workflow import IOSyntheticWorkflow, IOSyntheticError, PlatformModel, load_platform
+
+SHAPES = ["chain", "new_chain", "fork", "tree", "decaf", "pmc"]
+
+
+# --- Variants ----------------------------------------------------------------
+def variant_name(variant: Dict) -> str:
+    name = "{}-n{}-{:g}{}-s{:g}-{}".format(
+        variant["shape"], variant["number_jobs"], variant["files_size"],
+        variant["size_unit"], variant["waiting_time"], variant["execution_site"])
+    if variant.get("block_size"):
+        name += "-b{}".format(variant["block_size"])
+    if variant.get("io_profile"):
+        name += "-{}".format(variant["io_profile"].replace(":", "_"))
+    if variant.get("keg_threads"):
+        name += "-j{}".format(variant["keg_threads"])
+    return name
+
+
+def build_variants(shapes: List[str],
+                   number_jobs: List[int],
+                   files_size: List[float],
+                   size_unit: List[str],
+                   waiting_time: List[float],
+                   execution_sites: List[str],
+                   output_dir: str,
+                   block_sizes: List[Optional[str]] = [None],
+                   io_profiles: List[Optional[str]] = [None],
+                   keg_threads: List[Optional[int]] = [None],
+                   **common) -> List[Dict]:
+    """Expand the sweep matrix into one description per workflow variant."""
+    variants = []
+    for shape, n, size, unit, wait, site, block_size, io_profile, threads in itertools.product(
+            shapes, number_jobs, files_size, size_unit, waiting_time, execution_sites, block_sizes,
+            io_profiles, keg_threads):
+        variant = {
+            "shape": shape,
+            "number_jobs": n,
+            "files_size": size,
+            "size_unit": unit.upper(),
+            "waiting_time": wait,
+            "execution_site": site,
+            "block_size": block_size,
+            "io_profile": io_profile,
+            "keg_threads": threads,
+        }
+        variant.update(common)
+        variant["name"] = variant_name(variant)
+        variant["dir"] = os.path.join(os.path.abspath(output_dir), variant["name"])
+        variants.append(variant)
+    return variants
+
+
+def generate_variant(variant: Dict) -> Dict:
+    """Generate one variant in its own directory, never raising."""
+    result = dict(variant)
+    start = time.time()
+    try:
+        workflow = IOSyntheticWorkflow(
+            shape=(variant["shape"], variant["number_jobs"]),
+            exec_site_name=variant["execution_site"],
+            src_path=variant.get("src_path"),
+            files_size=[variant["files_size"]],
+            size_unit=variant["size_unit"],
+            waiting_time=[variant["waiting_time"]],
+            stream=variant.get("stream", False),
+            fan_in_arity=variant.get("fan_in_arity", 2),
+            wf_dir=variant["dir"],
+            block_size=variant.get("block_size"),
+            direct_io=variant.get("direct_io", False),
+            preallocate=variant.get("preallocate", False),
+            fsync=variant.get("fsync"),
+            input_mode=variant.get("input_mode"),
+            io_profile=variant.get("io_profile"),
+            keg_threads=variant.get("keg_threads"),
+            input_pool=variant.get("input_pool"),
+            input_pattern=variant.get("input_pattern", "zero"),
+            keg_checksum=variant.get("keg_checksum")
+        )
+        workflow.generate(variant.get("file_path"), directory=variant["dir"])
+        if variant.get("platform") is not None:
+            makespan, timeline = workflow.simulate(PlatformModel(**variant["platform"]))
+            workflow.write_timeline(os.path.join(variant["dir"], "timeline.csv"), timeline)
+            result["makespan_ms"] = round(makespan, 3)
+        if workflow.provisioned is not None:
+            result["inputs_created"], result["inputs_reused"] = workflow.provisioned
+        result["status"] = "ok"
+        result["wid"] = workflow.wid
+        result["workflow"] = os.path.abspath(workflow.wf_path)
+        result["conf"] = workflow.conf_path
+        result["plan"] = workflow.plan_args("run0001", submit=True)
+    except Exception as e:
+        # One bad variant must not take the whole batch down
+        result["status"] = "error"
+        result["error"] = "{}: {}".format(type(e).__name__, e)
+    result["elapsed"] = round(time.time() - start, 6)
+    return result
+
+
+def select_submissions(results: List[Dict], tolerance: float) -> None:
+    """Flag the variants the simulator cannot separate: those predicted
+    within ``tolerance`` (relative) of another variant. Only they need a real
+    run, the others are told apart by the model."""
+    simulated = sorted((r for r in results if "makespan_ms" in r), key=lambda r: r["makespan_ms"])
+    for result in simulated:
+        result["submit"] = False
+    for previous, result in zip(simulated, simulated[1:]):
+        if result["makespan_ms"] - previous["makespan_ms"] <= tolerance * result["makespan_ms"]:
+            previous["submit"] = result["submit"] = True
+
+
+def quiet_logging() -> None:
+    # Pegasus logs every job added at INFO level
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+def run_sweep(variants: List[Dict], output_dir: str,
+              workers: Optional[int] = None,
+              tolerance: Optional[float] = None) -> Dict:
+    """Generate all variants in a process pool and write the manifest.
+    With ``tolerance``, variants are simulated and flagged for submission."""
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=quiet_logging) as pool:
+        futures = [pool.submit(generate_variant, variant) for variant in variants]
+        for future in as_completed(futures):
+            result = future.result()
+            print("[{}] {}".format(result["status"], result["name"]))
+            results.append(result)
+
+    results.sort(key=lambda r: r["name"])
+    if tolerance is not None:
+        select_submissions(results, tolerance)
+    manifest = {
+        "created": datetime.now().isoformat(),
+        "total": len(results),
+        "failed": sum(1 for r in results if r["status"] != "ok"),
+        "submit": sum(1 for r in results if r.get("submit", True) and r["status"] == "ok"),
+        "variants": results,
+    }
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Pegasus IO Synthetic Workflow parameter sweep")
+
+    parser.add_argument(
+        "-c",
+        "--workflow-class",
+        metavar="STR",
+        nargs="+",
+        default=["new_chain"],
+        help="Workflow structures to sweep over (default: new_chain)",
+    )
+    parser.add_argument(
+        "-n",
+        "--number-jobs",
+        metavar="INT",
+        type=int,
+        nargs="+",
+        default=[1],
+        help="Numbers of jobs (default: 1)",
+    )
+    parser.add_argument(
+        "-g",
+        "--files-size",
+        metavar="FLOAT",
+        type=float,
+        nargs="+",
+        default=[1.0],
+        help="Output file sizes (default: 1.0)",
+    )
+    parser.add_argument(
+        "-u",
+        "--size-unit",
+        metavar="STR",
+        nargs="+",
+        default=["G"],
+        help="Units of the file sizes, among B, K, M, G (default: G)",
+    )
+    parser.add_argument(
+        "-t",
+        "--waiting-time",
+        metavar="FLOAT",
+        type=float,
+        nargs="+",
+        default=[0.0],
+        help="Waiting times of the jobs in seconds (default: 0)",
+    )
+    parser.add_argument(
+        "-e",
+        "--execution-site",
+        metavar="STR",
+        nargs="+",
+        default=["condorpool"],
+        help="Execution site names (default: condorpool)",
+    )
+    parser.add_argument(
+        "-b",
+        "--block-size",
+        metavar="STR",
+        nargs="+",
+        default=[None],
+        help="keg write block sizes, e.g. 64K 4M (default: stdio writes)",
+    )
+    parser.add_argument(
+        "--direct-io",
+        action="store_true",
+        help="Write generated data with O_DIRECT, requires -b/--block-size",
+    )
+    parser.add_argument(
+        "--preallocate",
+        action="store_true",
+        help="Preallocate generated data with fallocate, requires -b/--block-size",
+    )
+    parser.add_argument(
+        "--fsync",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Fsync policy of keg outputs: none, end or every N MB (default: none)",
+    )
+    parser.add_argument(
+        "--input-mode",
+        metavar="STR",
+        type=str,
+        choices=["lines", "read", "mmap", "copy"],
+        default=None,
+        help="How keg reads its inputs: lines, read, mmap or copy (default: lines)",
+    )
+    parser.add_argument(
+        "--keg-checksum",
+        metavar="STR",
+        type=str,
+        choices=["sha256", "xxh64"],
+        default=None,
+        help="Checksum keg computes while reading and writing, with a sidecar per output (default: none)",
+    )
+    parser.add_argument(
+        "--io-profile",
+        metavar="STR",
+        nargs="+",
+        default=[None],
+        help="I/O profiles: seq-large, random-4k, strided, small-files-N or keg access patterns (default: sequential)",
+    )
+    parser.add_argument(
+        "--keg-threads",
+        metavar="INT",
+        type=int,
+        nargs="+",
+        default=[None],
+        help="Numbers of keg I/O threads per job, e.g. 1 8 (default: 1)",
+    )
+    parser.add_argument(
+        "-f",
+        "--file-path",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Absolute path of input file for the first job",
+    )
+    parser.add_argument(
+        "-p",
+        "--src-path",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Absolute path of source directory you want to use",
+    )
+    parser.add_argument(
+        "-k",
+        "--fan-in-arity",
+        metavar="INT",
+        type=int,
+        default=2,
+        help="Maximum number of inputs of a reduction job for tree (default: 2)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream jobs and dependencies directly to the workflow YAML",
+    )
+    parser.add_argument(
+        "--input-pool",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Directory of input files shared by the variants and later sweeps, created on first use",
+    )
+    parser.add_argument(
+        "--input-pattern",
+        metavar="STR",
+        type=str,
+        choices=["zero", "random", "text"],
+        default="zero",
+        help="Content of created inputs: zero (fallocate only), random or text (default: zero)",
+    )
+    parser.add_argument(
+        "--simulate",
+        action="store_true",
+        help="Predict the makespan of every variant and flag those the model cannot separate",
+    )
+    parser.add_argument(
+        "--platform",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="JSON file overriding the platform model of --simulate (default: Cori Haswell-like)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        metavar="FLOAT",
+        type=float,
+        default=0.05,
+        help="Relative makespan difference the model cannot separate (default: 0.05)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output-dir",
+        metavar="STR",
+        type=str,
+        default="sweep",
+        help="Directory receiving one sub-directory per variant (default: sweep)",
+    )
+    parser.add_argument(
+        "-j",
+        "--workers",
+        metavar="INT",
+        type=int,
+        default=None,
+        help="Number of worker processes (default: number of CPUs)",
+    )
+
+    args = parser.parse_args()
+
+    for shape in args.workflow_class:
+        if shape not in SHAPES:
+            parser.error('-c/--workflow-class can only contain {}.'.format(", ".join(SHAPES)))
+
+    if any(n < 1 for n in args.number_jobs):
+        parser.error('-n/--number-jobs must be >=1.')
+
+    if any(n is not None and n < 1 for n in args.keg_threads):
+        parser.error('--keg-threads must be >=1.')
+
+    if (args.direct_io or args.preallocate) and args.block_size == [None]:
+        parser.error('--direct-io and --preallocate require -b/--block-size.')
+
+    platform = None
+    if args.simulate:
+        try:
+            platform = load_platform(args.platform)._asdict()
+        except IOSyntheticError as e:
+            parser.error(str(e))
+
+    variants = build_variants(
+        args.workflow_class, args.number_jobs, args.files_size, args.size_unit,
+        args.waiting_time, args.execution_site, args.output_dir, args.block_size, args.io_profile,
+        args.keg_threads,
+        file_path=args.file_path,
+        direct_io=args.direct_io,
+        preallocate=args.preallocate,
+        fsync=args.fsync,
+        input_mode=args.input_mode,
+        keg_checksum=args.keg_checksum,
+        src_path=args.src_path,
+        fan_in_arity=args.fan_in_arity,
+        stream=args.stream,
+        input_pool=os.path.abspath(args.input_pool) if args.input_pool else None,
+        input_pattern=args.input_pattern,
+        platform=platform
+    )
+
+    manifest = run_sweep(variants, args.output_dir, args.workers,
+                         args.tolerance if args.simulate else None)
+    print("{} variants generated, {} failed, manifest in {}".format(
+        manifest["total"] - manifest["failed"], manifest["failed"],
+        os.path.join(args.output_dir, "manifest.json")))
+    if args.simulate:
+        print("{} variants the model cannot separate to submit".format(manifest["submit"]))
+
+    if manifest["failed"]:
+        sys.exit(1)
@@ -0,0 +1,33 @@
+import os
+import sys
+import logging
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUBS = os.path.join(ROOT, "benchmarks", "stubs", "bin")
+
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(autouse=True)
+def pegasus_stubs(monkeypatch):
+    """Run pegasus-config, pegasus-plan... from benchmarks/stubs/bin."""
+    monkeypatch.setenv("PATH", STUBS + os.pathsep + os.environ.get("PATH", ""))
+    for name in ["PEGASUS_STUB_RUNTIME", "PEGASUS_STUB_STATE", "PEGASUS_STUB_PLAN_FAILURES"]:
+        monkeypatch.delenv(name, raising=False)
+    # Pegasus logs every job added at INFO level
+    logging.getLogger().setLevel(logging.WARNING)
+
+
+@pytest.fixture
+def make_workflow(tmp_path):
+    """IOSyntheticWorkflow factory writing under tmp_path, without catalog cache."""
+    from workflow import IOSyntheticWorkflow
+
+    def make(shape, number_jobs, **kwargs):
+        kwargs.setdefault("files_size", [1.0])
+        kwargs.setdefault("waiting_time", [0.0])
+        return IOSyntheticWorkflow(shape=(shape, number_jobs), wf_dir=str(tmp_path), use_cache=False, **kwargs)
+
+    return make
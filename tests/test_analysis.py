@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from analysis.index import ResultsIndex, UpdateReport
+from analysis.parse import SCENARIOS, parse_run_dir, parse_run_name
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+    return path
+
+
+def pegasus_run(log_dir, name="pegasus-16g-sleep-1", total="65.0"):
+    run_dir = os.path.join(str(log_dir), name)
+    write(os.path.join(run_dir, "statistics", "breakdown.txt"),
+          "# Transformation  Type  Count  Min  Max  Mean  Total\n"
+          "pegasus::transfer  successful  2  0.5  1.5  1.0  2.0\n"
+          "keg  successful  5  12.0  15.0  13.0  {}\n".format(total))
+    return run_dir
+
+
+def decaf_run(log_dir, name="decaf-512m-nosleep-1"):
+    run_dir = os.path.join(str(log_dir), name)
+    write(os.path.join(run_dir, "00", "00", "merge_cluster1.out"),
+          "decaf starting\nredistributing\nWorkflow time is 12.5\n")
+    return run_dir
+
+
+def pmc_run(log_dir, name="pmc-1t-sleep-1"):
+    run_dir = os.path.join(str(log_dir), name)
+    write(os.path.join(run_dir, "00", "00", "merge_cluster1.err.000"), "PMC: Wall time: 40.0\n")
+    write(os.path.join(run_dir, "00", "00", "merge_cluster1.err.001"), "PMC: Wall time: 3.25s\n")
+    return run_dir
+
+
+# --- Parsers -----------------------------------------------------------------
+def test_parse_pegasus(tmp_path):
+    result = parse_run_dir(pegasus_run(tmp_path))
+    assert result == ("pegasus-16g-sleep-1", SCENARIOS["pegasus"], 16.0, "sleep", 65.0)
+
+
+def test_parse_decaf(tmp_path):
+    result = parse_run_dir(decaf_run(tmp_path))
+    assert (result.scenario, result.size, result.makespan) == (SCENARIOS["decaf"], 0.5, 12.5)
+
+
+def test_parse_pmc_keeps_last_attempt(tmp_path):
+    result = parse_run_dir(pmc_run(tmp_path))
+    assert (result.scenario, result.size, result.makespan) == (SCENARIOS["pmc"], 1024.0, 3.25)
+
+
+@pytest.mark.parametrize("name", ["pegasus-16g", "condor-16g-sleep", "pegasus-lots-sleep"])
+def test_parse_run_name_errors(name):
+    with pytest.raises(ValueError):
+        parse_run_name(name)
+
+
+def test_parse_missing_makespan(tmp_path):
+    run_dir = os.path.join(str(tmp_path), "decaf-1g-sleep-1")
+    write(os.path.join(run_dir, "00", "00", "merge_cluster1.out"), "too short\n")
+    with pytest.raises(ValueError):
+        parse_run_dir(run_dir)
+
+
+# --- Incremental index -------------------------------------------------------
+def test_index_only_parses_changes(tmp_path):
+    log_dir = tmp_path / "log"
+    runs = [pegasus_run(log_dir), decaf_run(log_dir), pmc_run(log_dir)]
+    broken = os.path.join(str(log_dir), "pegasus-1g-sleep-2")
+    os.makedirs(broken)
+
+    with ResultsIndex(str(tmp_path / "index.sqlite")) as index:
+        assert index.update(runs + [broken]) == UpdateReport(4, 0, 0)
+        assert len(index.errors()) == 1
+        assert index.update(runs + [broken]) == UpdateReport(0, 4, 0)
+
+        # same size, new content and mtime
+        breakdown = pegasus_run(log_dir, total="66.0")
+        path = os.path.join(breakdown, "statistics", "breakdown.txt")
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        assert index.update(runs) == UpdateReport(1, 2, 1)
+
+        table = index.table()
+        makespans = dict(zip(table["run"], table["makespan"]))
+        assert makespans == {"decaf-512m-nosleep-1": 12.5, "pegasus-16g-sleep-1": 66.0, "pmc-1t-sleep-1": 3.25}
+        assert index.errors() == []
+
+    with ResultsIndex(str(tmp_path / "index.sqlite")) as index:
+        assert index.update(runs) == UpdateReport(0, 3, 0)
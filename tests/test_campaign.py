@@ -0,0 +1,92 @@
+import os
+import asyncio
+
+from conftest import STUBS
+from campaign import PegasusCLI, execute, run_campaign
+
+
+def make_run(tmp_path, name="pegasus-1g-nosleep-chain-1", variant="chain"):
+    workflow = tmp_path / "workflow.yml"
+    workflow.write_text("jobs: []\n")
+    return {
+        "name": name,
+        "variant": variant,
+        "workflow": str(workflow),
+        "plan": {"conf": str(tmp_path / "pegasus.properties"), "dir": str(tmp_path / "submit"),
+                 "sites": ["condorpool"], "output_sites": ["local"], "output_dir": str(tmp_path / "output"),
+                 "cleanup": "leaf", "force": True, "cluster": None},
+        "relative_dir": "run0001",
+        "state": "pending",
+        "attempts": 0,
+        "submit_dir": None,
+        "makespan": None,
+        "error": None,
+    }
+
+
+def run_execute(run, cli, log_dir, retries=2, unknown_limit=3):
+    asyncio.run(execute(run, cli, str(log_dir), submit=True, retries=retries, retry_delay=0.0,
+                        poll_interval=0.0, timeout=None, unknown_limit=unknown_limit))
+
+
+class LostCLI(PegasusCLI):
+    """Workflows whose submit directory disappears once planned."""
+
+    async def plan(self, *args, **kwargs):
+        submit_dir = await super().plan(*args, **kwargs)
+        os.remove(os.path.join(submit_dir, "braindump.yml"))
+        return submit_dir
+
+
+def test_plan_retries(tmp_path, monkeypatch):
+    monkeypatch.setenv("PEGASUS_STUB_PLAN_FAILURES", "2")
+    run = make_run(tmp_path)
+    run_execute(run, PegasusCLI(STUBS), tmp_path / "log")
+
+    assert run["attempts"] == 3
+    assert run["submit_dir"] == str(tmp_path / "submit" / "run0001")
+    assert run["state"] == "success"
+    assert run["error"] is None
+    # parsed from the breakdown of the stub pegasus-statistics
+    assert run["makespan"] >= 0.0
+    assert os.path.islink(str(tmp_path / "log" / run["name"]))
+
+
+def test_plan_gives_up(tmp_path, monkeypatch):
+    monkeypatch.setenv("PEGASUS_STUB_PLAN_FAILURES", "5")
+    run = make_run(tmp_path)
+    run_execute(run, PegasusCLI(STUBS), tmp_path / "log", retries=1)
+
+    assert run["attempts"] == 2
+    assert run["state"] == "plan_failed"
+    assert "planning failure 2 of 5" in run["error"]
+
+
+def test_workflow_failure(tmp_path, monkeypatch):
+    monkeypatch.setenv("PEGASUS_STUB_STATE", "Failure")
+    run = make_run(tmp_path)
+    run_execute(run, PegasusCLI(STUBS), tmp_path / "log")
+
+    assert run["state"] == "failure"
+    assert not os.path.exists(str(tmp_path / "log" / run["name"]))
+
+
+def test_unknown_state_fails_the_run(tmp_path):
+    run = make_run(tmp_path)
+    run_execute(run, LostCLI(STUBS), tmp_path / "log", unknown_limit=3)
+
+    assert run["state"] == "failure"
+    assert run["error"] == "pegasus-status gave no state 3 times in a row"
+
+
+def test_campaign_skips_finished_runs(tmp_path):
+    runs = [make_run(tmp_path, "pegasus-1g-nosleep-chain-{}".format(k)) for k in [1, 2]]
+    runs[0]["state"] = "success"
+    runs[1]["relative_dir"] = "run0002"
+    done = []
+    asyncio.run(run_campaign(runs, PegasusCLI(STUBS), str(tmp_path / "log"), retry_delay=0.0,
+                             poll_interval=0.0, on_done=done.append))
+
+    assert done == [runs[1]]
+    assert runs[0]["attempts"] == 0
+    assert runs[1]["state"] == "success"
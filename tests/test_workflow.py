@@ -0,0 +1,156 @@
+import os
+import sys
+import json
+import subprocess
+
+import yaml
+import pytest
+
+from conftest import ROOT
+from workflow import IOSyntheticError, job_id
+
+
+def generate(workflow, directory):
+    workflow.create_sites_catalog()
+    workflow.create_pegasus_properties()
+    workflow.create_transformation_catalog()
+    workflow.create_replica_catalog(None)
+    workflow.create_workflow()
+    workflow.write(str(directory))
+    with open(workflow.wf_path) as f:
+        return yaml.safe_load(f)
+
+
+def normalize(document):
+    """Jobs and edges of a workflow YAML, in an order-independent form."""
+    jobs = {}
+    for job in document["jobs"]:
+        uses = sorted(json.dumps(use, sort_keys=True) for use in job["uses"])
+        jobs[job["id"]] = (job["name"], job["arguments"], uses)
+    edges = {(dep["id"], child) for dep in document.get("jobDependencies", []) for child in dep["children"]}
+    return jobs, edges
+
+
+def uses(record, link):
+    return [lfn for lfn, use_link, _, _ in record.uses if use_link == link]
+
+
+# --- Stream emitter ----------------------------------------------------------
+@pytest.mark.parametrize("shape", ["chain", "new_chain", "fork", "tree", "pmc"])
+def test_stream_matches_workflow_object(make_workflow, tmp_path, shape):
+    documents = []
+    for stream in [False, True]:
+        directory = tmp_path / ("stream" if stream else "object")
+        documents.append(generate(make_workflow(shape, 9, stream=stream), directory))
+
+    assert normalize(documents[0]) == normalize(documents[1])
+
+
+# --- Reduction tree ----------------------------------------------------------
+@pytest.mark.parametrize("arity", [2, 3, 16])
+def test_tree_fan_in_arity(make_workflow, arity):
+    workflow = make_workflow("tree", 12, fan_in_arity=arity)
+    records = list(workflow.iter_jobs_tree())
+    parents = {}
+    for parent, children in workflow.iter_edges_tree():
+        for child in children:
+            parents.setdefault(child, []).append(parent)
+
+    reductions = records[11:]
+    assert reductions
+    for record in reductions:
+        assert 0 < len(uses(record, "input")) <= arity
+        assert len(parents[record.id]) == len(uses(record, "input"))
+    # every branch is merged once, and the root writes the join output
+    merged = [lfn for record in reductions for lfn in uses(record, "input")]
+    assert sorted(lfn for lfn in merged if lfn.startswith("f")) == sorted("f{}.txt".format(i) for i in range(1, 11))
+    assert uses(reductions[-1], "output") == ["f12.txt"]
+
+
+def test_tree_rejects_unary_fan_in(make_workflow):
+    with pytest.raises(IOSyntheticError):
+        make_workflow("tree", 5, fan_in_arity=1)
+
+
+# --- keg sidecars and parts --------------------------------------------------
+def test_checksum_sidecars(make_workflow):
+    records = list(make_workflow("new_chain", 3, keg_checksum="sha256").job_streams()[0])
+
+    first, second = records[0], records[1]
+    # f0.txt is written by no job: unverified, without sidecar
+    assert first.args[-2:] == ("-k", "f0.txt")
+    assert "f0.txt.sha256" not in uses(first, "input")
+    assert "f1.txt.sha256" in uses(first, "output")
+    assert "-k" not in second.args
+    assert "f1.txt.sha256" in uses(second, "input")
+    assert "f2.txt.sha256" in uses(second, "output")
+    for record in records:
+        assert record.args[record.args.index("-K") + 1] == "sha256"
+
+
+def test_small_parts(make_workflow):
+    records = list(make_workflow("chain", 3, io_profile="small-files-2", keg_checksum="xxh64").job_streams()[0])
+
+    assert uses(records[0], "output") == ["j1.txt", "j1.txt.xxh64", "j1.txt.0", "j1.txt.1"]
+    assert {"j1.txt", "j1.txt.xxh64", "j1.txt.0", "j1.txt.1"} <= set(uses(records[1], "input"))
+    assert {"f1.txt.0", "f1.txt.1"} <= set(uses(records[1], "output"))
+    # parts are staged and registered like their listing
+    assert {use[2:] for use in records[0].uses} == {(False, True)}
+
+
+def test_decaf_rejects_keg_options(make_workflow):
+    with pytest.raises(IOSyntheticError):
+        make_workflow("decaf", 3, keg_checksum="sha256")
+    with pytest.raises(IOSyntheticError):
+        make_workflow("decaf", 3, io_profile="seq-large")
+
+
+# --- Sub-workflows -----------------------------------------------------------
+def test_partition_crossing_files(make_workflow, tmp_path):
+    workflow = make_workflow("chain", 5, partition_size=2)
+    top = generate(workflow, tmp_path)
+
+    jobs = {job["file"]: job for job in top["jobs"]}
+    assert sorted(jobs) == ["part-00000.yml", "part-00001.yml", "part-00002.yml"]
+
+    def files(job, link):
+        return sorted(use["lfn"] for use in job["uses"] if use["type"] == link and not use["lfn"].endswith(".yml"))
+
+    assert files(jobs["part-00000.yml"], "output") == ["f1.txt"]
+    assert files(jobs["part-00001.yml"], "input") == ["f1.txt"]
+    assert files(jobs["part-00001.yml"], "output") == ["f3.txt"]
+    assert files(jobs["part-00002.yml"], "input") == ["f3.txt"]
+
+    # the producing part stages the crossing file out, the others keep theirs
+    with open(tmp_path / "part-00001.yml") as f:
+        part = yaml.safe_load(f)
+    outputs = {use["lfn"]: use["stageOut"] for job in part["jobs"] for use in job["uses"] if use["type"] == "output"}
+    assert outputs == {"f2.txt": False, "f3.txt": True}
+
+
+# --- Command line ------------------------------------------------------------
+def run_cli(tmp_path, *args):
+    return subprocess.run(
+        [sys.executable, os.path.join(ROOT, "workflow.py"), "--cache-dir", str(tmp_path / "cache"),
+         "-d", str(tmp_path / "run")] + list(args),
+        cwd=str(tmp_path), stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def test_cli_plans_with_stubs(tmp_path):
+    out = run_cli(tmp_path, "-c", "fork", "-n", "4", "-t", "1.5")
+
+    assert out.returncode == 0, out.stdout + out.stderr
+    assert (tmp_path / "run" / "braindump.yml").exists()
+    with open(tmp_path / "run.trace.json") as f:
+        assert json.load(f)
+    with open(tmp_path / "workflow.yml") as f:
+        jobs = yaml.safe_load(f)["jobs"]
+    assert [job["id"] for job in jobs] == [job_id(i) for i in range(1, 5)]
+
+
+def test_cli_reports_errors(tmp_path):
+    out = run_cli(tmp_path, "-c", "chain", "-n", "3", "-t", "1", "2")
+
+    assert out.returncode != 0
+    assert "Error: " in out.stdout
+    assert "Traceback" not in out.stderr
@@ -1,19 +1,879 @@
 #!/usr/bin/env python3
-from Pegasus.api import *
-
+import io
+import csv
 import os
+import re
 import sys
+import glob
+import time
+import json
+import fcntl
+import shutil
+import filecmp
+import getpass
+import hashlib
+import heapq
 import logging
+import resource
 import subprocess
-import yaml
 from pathlib import Path
 from datetime import datetime
+from itertools import islice
+from functools import lru_cache
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from argparse import ArgumentParser
-from typing import Optional, Tuple, Union, Dict, List
-
-logging.basicConfig(level=logging.DEBUG)
+from typing import Optional, Tuple, Union, Dict, List, Iterator, NamedTuple
 
 # --- Import Pegasus API ------------------------------------------------------
+# Pegasus.api names exposed by load_pegasus()
+PEGASUS_API = [
+    "Arch", "Container", "Directory", "EventType", "File", "FileServer", "Grid", "Job",
+    "Namespace", "OS", "Operation", "PegasusClientError", "Properties", "ReplicaCatalog",
+    "Scheduler", "Site", "SiteCatalog", "SubWorkflow", "SupportedJobs", "Transformation",
+    "TransformationCatalog", "TransformationSite", "Workflow",
+]
+
+
+def load_pegasus() -> None:
+    """Import the Pegasus API on first use.
+
+    Pegasus takes most of the startup time, so argument parsing and
+    validation run before it is loaded. Names are exposed as module globals,
+    as ``from Pegasus.api import *`` would do.
+    """
+    if "Workflow" in globals():
+        return
+
+    import Pegasus.api
+    from Pegasus.api.workflow import PEGASUS_VERSION
+    from Pegasus.client._client import from_env
+    from Pegasus import yaml as pegasus_yaml
+
+    # Pegasus.api has no __all__, its submodules (workflow, properties...)
+    # would shadow names like the workflow of __main__
+    globals().update((name, getattr(Pegasus.api, name)) for name in PEGASUS_API)
+    globals().update(
+        PEGASUS_VERSION=PEGASUS_VERSION,
+        from_env=from_env,
+        pegasus_yaml=pegasus_yaml
+    )
+
+
+class IOSyntheticError(Exception):
+    """Raised when a workflow cannot be generated or planned."""
+
+
+# --- Caches ------------------------------------------------------------------
+def default_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache_home, "io-synthetic")
+
+
+def write_atomic(path: str, content: str) -> None:
+    tmp = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp, "w") as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+PEGASUS_BIN_DIRS = {}
+
+
+def pegasus_bin_dir(cache_dir: Optional[str] = None) -> str:
+    """Return the output of ``pegasus-config --bin``, memoized.
+
+    The answer is kept in memory and in ``cache_dir`` and is only reused while
+    the pegasus-config found in PATH is the same file (path, size and mtime)
+    and the directory it returned still exists.
+    """
+    executable = shutil.which("pegasus-config")
+    if executable is None:
+        raise IOSyntheticError("Unable to find pegasus-config")
+
+    st = os.stat(executable)
+    stamp = [executable, st.st_size, st.st_mtime_ns]
+    if tuple(stamp) in PEGASUS_BIN_DIRS:
+        return PEGASUS_BIN_DIRS[tuple(stamp)]
+
+    cache_file = None
+    if cache_dir:
+        cache_file = os.path.join(cache_dir, "pegasus-config.json")
+        try:
+            with open(cache_file) as f:
+                cached = json.load(f)
+            if cached["stamp"] == stamp and os.path.isdir(cached["bin_dir"]):
+                PEGASUS_BIN_DIRS[tuple(stamp)] = cached["bin_dir"]
+                return cached["bin_dir"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    pegasus_config = subprocess.run(
+        [executable, "--bin"], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    if pegasus_config.returncode != 0:
+        raise IOSyntheticError("pegasus-config --bin failed: {}".format(
+            pegasus_config.stderr.decode().strip()))
+
+    bin_dir = pegasus_config.stdout.decode().strip()
+    PEGASUS_BIN_DIRS[tuple(stamp)] = bin_dir
+    if cache_file:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_atomic(cache_file, json.dumps({"stamp": stamp, "bin_dir": bin_dir}))
+    return bin_dir
+
+
+class PhaseTrace(object):
+    """Wall time, CPU time and peak memory of each generation phase.
+
+    Phases can be nested (``pegasus-config`` runs inside the transformation
+    catalog phase). CPU time and peak RSS of child processes are reported
+    separately, they cover pegasus-config and pegasus-plan.
+    """
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.depth = 0
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name: str):
+        self.depth += 1
+        children = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu = time.process_time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.depth -= 1
+            own = resource.getrusage(resource.RUSAGE_SELF)
+            after = resource.getrusage(resource.RUSAGE_CHILDREN)
+            self.phases.append(OrderedDict([
+                ("name", name),
+                ("depth", self.depth),
+                ("start", start - self.origin),
+                ("wall", end - start),
+                ("cpu", time.process_time() - cpu),
+                ("children_cpu", (after.ru_utime + after.ru_stime)
+                                 - (children.ru_utime + children.ru_stime)),
+                ("peak_rss_kb", own.ru_maxrss),
+                ("children_peak_rss_kb", after.ru_maxrss),
+            ]))
+
+    def to_json(self) -> List[Dict]:
+        return sorted(self.phases, key=lambda p: (p["start"], p["depth"]))
+
+    def to_chrome(self) -> Dict:
+        """Same phases in Chrome trace format (chrome://tracing, Perfetto)."""
+        events = []
+        for phase in self.to_json():
+            events.append({
+                "name": phase["name"],
+                "ph": "X",
+                "ts": phase["start"] * 1e6,
+                "dur": phase["wall"] * 1e6,
+                "pid": os.getpid(),
+                "tid": 0,
+                "args": {k: v for k, v in phase.items() if k not in ["name", "start", "wall"]},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+class CatalogCache(object):
+    """Rendered catalogs and properties, stored by key and content hash.
+
+    Entries live in ``<cache_dir>/catalogs/<key>/<stem>-<hash><suffix>``, the
+    hash being computed on the catalog content without the ``x-pegasus``
+    header (which embeds a timestamp). Only the ``keep`` most recent entries
+    are kept per key and file name. The cache directory can be removed at any
+    time.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, keep: Optional[int] = 8) -> None:
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.keep = keep
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(catalog) -> str:
+        if isinstance(catalog, Properties):
+            with io.StringIO() as buf:
+                catalog.write(buf)
+                content = buf.getvalue()
+        else:
+            content = json.dumps(catalog.__json__(), default=lambda o: o.__json__())
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def write(self, key: str, catalog, dest: str) -> bool:
+        """Write ``catalog`` to ``dest`` from the cache when possible.
+
+        Returns True on a cache hit. ``dest`` is left untouched if it already
+        holds the cached content.
+        """
+        stem, suffix = os.path.splitext(os.path.basename(dest))
+        entry_dir = os.path.join(self.cache_dir, "catalogs", key)
+        entry = os.path.join(entry_dir, "{}-{}{}".format(stem, self.digest(catalog)[:16], suffix))
+
+        try:
+            if not (os.path.exists(dest) and filecmp.cmp(entry, dest, shallow=False)):
+                shutil.copyfile(entry, dest)
+            os.utime(entry)
+            self.hits += 1
+            return True
+        except OSError:
+            pass
+
+        with io.StringIO() as buf:
+            catalog.write(buf)
+            content = buf.getvalue()
+        with open(dest, "w") as f:
+            f.write(content)
+
+        os.makedirs(entry_dir, exist_ok=True)
+        write_atomic(entry, content)
+        self.prune(entry_dir, stem, suffix)
+        self.misses += 1
+        return False
+
+    def prune(self, entry_dir: str, stem: str, suffix: str) -> None:
+        entries = glob.glob(os.path.join(entry_dir, "{}-*{}".format(stem, suffix)))
+        entries.sort(key=lambda e: os.stat(e).st_mtime if os.path.exists(e) else 0, reverse=True)
+        for entry in entries[self.keep:]:
+            try:
+                os.remove(entry)
+            except OSError:
+                pass
+
+
+# --- Input pool ----------------------------------------------------------------
+# Content of provisioned inputs: allocated only (reads as zeros), random or
+# text blocks, all written PROVISION_BLOCK bytes at a time
+INPUT_PATTERNS = ["zero", "random", "text"]
+PROVISION_BLOCK = 16 << 20
+
+
+def pool_path(pool_dir: str, size: int, pattern: str, index: int) -> str:
+    """Path of the ``index``-th input of ``size`` bytes of ``pattern`` in the pool."""
+    return os.path.join(pool_dir, "{}-{}B-{}.dat".format(pattern, size, index))
+
+
+def pattern_block(pattern: str) -> bytes:
+    if pattern == "random":
+        return os.urandom(PROVISION_BLOCK)
+    if pattern == "text":
+        line = b"io-synthetic provisioned input, keg reads it line by line\n"
+        return (line * (PROVISION_BLOCK // len(line) + 1))[:PROVISION_BLOCK]
+    return bytes(PROVISION_BLOCK)
+
+
+def provision_file(path: str, size: int, pattern: str, checksum: bool = False) -> bool:
+    """Create ``path`` with ``size`` bytes of ``pattern``, unless it already
+    exists with that size. Returns True when the file had to be created.
+
+    Space is reserved with fallocate and, but for ``zero`` inputs, written in
+    large blocks. The file is then dropped from the page cache, so the first
+    job reads it from storage. A lock file keeps concurrent workflows from
+    creating the same input twice. With ``checksum``, the SHA-256 of the
+    content is kept in a ``<path>.sha256`` sidecar, see pool_digest().
+    """
+    sidecar = path + ".sha256"
+    with open(path + ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.isfile(path) and os.path.getsize(path) == size:
+            if checksum and not os.path.isfile(sidecar):
+                # created without checksum: read it once
+                digest = hashlib.sha256()
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(PROVISION_BLOCK), b""):
+                        digest.update(block)
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+                write_pool_sidecar(sidecar, digest.hexdigest(), path)
+            return False
+
+        if os.path.isfile(sidecar):
+            os.remove(sidecar)
+        digest = hashlib.sha256()
+        tmp = path + ".tmp"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            allocated = False
+            if size:
+                try:
+                    os.posix_fallocate(fd, 0, size)
+                    allocated = True
+                except OSError:
+                    # e.g. NFS: write the blocks instead
+                    pass
+            block = memoryview(pattern_block(pattern))
+            written = 0
+            while written < size:
+                chunk = block[:min(PROVISION_BLOCK, size - written)]
+                if pattern != "zero" or not allocated:
+                    chunk = chunk[:os.write(fd, chunk)]
+                if checksum:
+                    digest.update(chunk)
+                written += len(chunk)
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+        if checksum:
+            write_pool_sidecar(sidecar, digest.hexdigest(), path)
+        return True
+
+
+def write_pool_sidecar(sidecar: str, digest: str, path: str) -> None:
+    """Write a digest in the sha256sum format of the keg sidecars."""
+    with open(sidecar + ".tmp", "w") as f:
+        f.write("{}  {}\n".format(digest, os.path.basename(path)))
+    os.replace(sidecar + ".tmp", sidecar)
+
+
+def pool_digest(path: str) -> str:
+    """SHA-256 of a pool input written with ``checksum``."""
+    with open(path + ".sha256") as f:
+        return f.read().split()[0]
+
+
+# --- Compact job records (streaming generation) ------------------------------
+class JobRecord(NamedTuple):
+    """Compact description of a keg job, as produced by the shape generators.
+
+    ``uses`` holds ``(lfn, type, stage_out, register_replica)`` tuples in the
+    order they are attached to the job (``None`` for inputs).
+    """
+    id: str
+    name: str
+    args: tuple
+    uses: tuple
+    label: Optional[str] = None
+
+
+class DagStats(NamedTuple):
+    """Shape of a workflow DAG: jobs per level (longest path from a root),
+    critical path and total work in seconds of ``-s``, bytes generated."""
+    widths: List[int]
+    critical_path: float
+    total_work: float
+    total_bytes: int
+
+
+class ClusterLayout(NamedTuple):
+    """Clustering chosen for a DAG: ``label`` puts every job in one clustered
+    job, ``horizontal`` makes ``groups`` clustered jobs per level. ``tasks``
+    is the MPI size of each clustered job, the PMC master included."""
+    clustering: Optional[str]
+    groups: int
+    tasks: int
+    nodes: int
+
+
+def analyze_dag(jobs: Iterator[JobRecord], edges: Iterator[Tuple[str, List[str]]],
+                total_bytes: int = 0) -> DagStats:
+    """Levels and critical path of a DAG whose jobs come parents first."""
+    parents = {}
+    for parent, children in edges:
+        for child in children:
+            parents.setdefault(child, []).append(parent)
+
+    level = {}
+    finish = {}
+    widths = []
+    total_work = 0.0
+    for record in jobs:
+        wait = float(record.args[record.args.index("-s")+1]) if "-s" in record.args else 0.0
+        before = parents.get(record.id, ())
+        level[record.id] = max((level[p]+1 for p in before), default=0)
+        finish[record.id] = max((finish[p] for p in before), default=0.0) + wait
+        if level[record.id] == len(widths):
+            widths.append(0)
+        widths[level[record.id]] += 1
+        total_work += wait
+    return DagStats(widths, max(finish.values(), default=0.0), total_work, total_bytes)
+
+
+# --- Makespan simulation -------------------------------------------------------
+class PlatformModel(NamedTuple):
+    """Platform of the makespan simulator, bandwidths in MB/s, times in s.
+
+    ``fs_bandwidth`` is shared equally by the jobs doing I/O on the shared
+    file system, each capped at ``node_bandwidth``. With condorio the inputs
+    and outputs of every job also go through the submit host
+    (``stage_bandwidth``, shared the same way) while jobs do their I/O on the
+    local disk of their node.
+    """
+    slots: int = 32
+    node_bandwidth: float = 1500.0
+    fs_bandwidth: float = 50000.0
+    stage_bandwidth: float = 1000.0
+    launch_overhead: float = 5.0
+    condorio_overhead: float = 2.0
+    sharedfs_overhead: float = 0.0
+
+
+class JobTimeline(NamedTuple):
+    """When a simulated job became ready, started and ended, in ms."""
+    id: str
+    name: str
+    ready: float
+    start: float
+    end: float
+
+
+def load_platform(path: Optional[str] = None) -> PlatformModel:
+    """Platform model with the defaults overridden by the JSON file ``path``."""
+    if path is None:
+        return PlatformModel()
+    try:
+        with open(path, "r") as f:
+            values = json.load(f)
+    except (OSError, ValueError) as e:
+        raise IOSyntheticError("Cannot read platform {}: {}".format(path, e)) from e
+    unknown = set(values) - set(PlatformModel._fields)
+    if unknown:
+        raise IOSyntheticError("Unknown platform parameters: {}.".format(", ".join(sorted(unknown))))
+    return PlatformModel(**values)
+
+
+class SharedLink(object):
+    """Bandwidth shared equally by the transfers in flight, each capped at
+    ``cap`` bytes/s.
+
+    All transfers progress at the same rate, so the link only tracks the
+    bytes ``served`` to any of them since the start and every transfer ends
+    when ``served`` reaches its target: each event is O(log n).
+    """
+
+    def __init__(self, bandwidth: float, cap: float) -> None:
+        self.bandwidth = bandwidth
+        self.cap = cap
+        self.served = 0.0
+        self.clock = 0.0
+        self.transfers = []
+
+    def rate(self) -> float:
+        return min(self.cap, self.bandwidth / max(len(self.transfers), 1))
+
+    def advance(self, clock: float) -> None:
+        if self.transfers:
+            self.served += self.rate() * (clock - self.clock)
+        self.clock = clock
+
+    def add(self, clock: float, size: float, job: int) -> None:
+        self.advance(clock)
+        heapq.heappush(self.transfers, (self.served + size, job))
+
+    def next_end(self) -> float:
+        if not self.transfers:
+            return float("inf")
+        return self.clock + max(self.transfers[0][0] - self.served, 0.0) / self.rate()
+
+    def pop(self, clock: float) -> int:
+        self.advance(clock)
+        return heapq.heappop(self.transfers)[1]
+
+
+def simulate_dag(jobs: Iterator[JobRecord], edges: Iterator[Tuple[str, List[str]]],
+                 sizes: Dict[str, float], platform: PlatformModel,
+                 data_configuration: str = "condorio") -> Tuple[float, List[JobTimeline]]:
+    """Event-driven makespan of a DAG whose jobs come parents first.
+
+    A job waits for a free slot, pays the launch and staging overheads,
+    stages its inputs in (condorio), reads its inputs and writes its outputs,
+    sleeps its ``-s`` and stages its outputs out (condorio). ``sizes`` gives
+    the bytes of the files read before being written (workflow inputs) and
+    outputs default to the size of ``-G``, or of the inputs they copy.
+    Returns the makespan and the timeline of every job, in ms.
+    """
+    mb = float(1 << 20)
+    condorio = data_configuration == "condorio"
+    overhead = platform.launch_overhead + (
+        platform.condorio_overhead if condorio else platform.sharedfs_overhead)
+
+    children = {}
+    for parent, kids in edges:
+        children.setdefault(parent, []).extend(kids)
+
+    # per job: id, name, wait, bytes in, bytes out
+    index = {}
+    specs = []
+    sizes = dict(sizes)
+    for record in jobs:
+        args = record.args
+        wait = float(args[args.index("-s")+1]) if "-s" in args else 0.0
+        inputs = [lfn for lfn, link, _, _ in record.uses if link == "input"]
+        outputs = [lfn for lfn, link, _, _ in record.uses if link != "input"]
+        size_in = sum(sizes.get(lfn, 0.0) for lfn in inputs)
+        if "-G" in args:
+            unit = args[args.index("-u")+1] if "-u" in args else "G"
+            size_out = float(args[args.index("-G")+1]) * UNIT_BYTES[unit]
+        else:
+            size_out = size_in
+        for lfn in outputs:
+            sizes[lfn] = size_out
+        index[record.id] = len(specs)
+        specs.append((record.id, record.name, wait, size_in, size_out * len(outputs)))
+
+    nb_jobs = len(specs)
+    missing = [0] * nb_jobs
+    for parent, kids in children.items():
+        for kid in kids:
+            missing[index[kid]] += 1
+    ready = [0.0] * nb_jobs
+    start = [0.0] * nb_jobs
+    end = [0.0] * nb_jobs
+
+    fs = SharedLink(platform.fs_bandwidth * mb, platform.node_bandwidth * mb)
+    stage = SharedLink(platform.stage_bandwidth * mb, platform.stage_bandwidth * mb)
+    # (time, seq, step, job): timers of the steps not bound by a link
+    timers = []
+    queue = deque()
+    free = platform.slots
+    seq = 0
+
+    def step(clock, job, phase):
+        """Move ``job`` to its next phase at ``clock``."""
+        nonlocal seq, free
+        _, _, wait, size_in, size_out = specs[job]
+        if phase == "launched":
+            if condorio and size_in:
+                stage.add(clock, size_in, job)
+                return
+            phase = "staged_in"
+        if phase == "staged_in":
+            if condorio:
+                # local disk, not shared
+                seq += 1
+                heapq.heappush(timers, (clock + (size_in + size_out) / (platform.node_bandwidth * mb), seq, "io", job))
+            elif size_in + size_out:
+                fs.add(clock, size_in + size_out, job)
+            else:
+                step(clock, job, "io")
+            return
+        if phase == "io":
+            seq += 1
+            heapq.heappush(timers, (clock + wait, seq, "waited", job))
+            return
+        if phase == "waited":
+            if condorio and size_out:
+                stage.add(clock, size_out, -job-1)
+                return
+            phase = "done"
+        if phase == "done":
+            end[job] = clock
+            free += 1
+            for kid in children.get(specs[job][0], ()):
+                kid = index[kid]
+                missing[kid] -= 1
+                if missing[kid] == 0:
+                    ready[kid] = clock
+                    queue.append(kid)
+            dispatch(clock)
+
+    def dispatch(clock):
+        nonlocal seq, free
+        while queue and free:
+            job = queue.popleft()
+            free -= 1
+            start[job] = clock
+            seq += 1
+            heapq.heappush(timers, (clock + overhead, seq, "launched", job))
+
+    queue.extend(job for job in range(nb_jobs) if missing[job] == 0)
+    dispatch(0.0)
+    clock = 0.0
+    while True:
+        next_timer = timers[0][0] if timers else float("inf")
+        next_fs = fs.next_end()
+        next_stage = stage.next_end()
+        clock = min(next_timer, next_fs, next_stage)
+        if clock == float("inf"):
+            break
+        if clock == next_timer:
+            _, _, phase, job = heapq.heappop(timers)
+            step(clock, job, phase)
+        elif clock == next_fs:
+            step(clock, fs.pop(clock), "io")
+        else:
+            job = stage.pop(clock)
+            # stage-out transfers are stored as -job-1
+            if job < 0:
+                step(clock, -job-1, "done")
+            else:
+                step(clock, job, "staged_in")
+
+    timeline = [JobTimeline(specs[job][0], specs[job][1], ready[job]*1000, start[job]*1000, end[job]*1000)
+                for job in range(nb_jobs)]
+    return max(end, default=0.0) * 1000, timeline
+
+
+def job_id(index: int) -> str:
+    # Same identifiers Workflow.add_jobs() hands out (1-based)
+    return "ID{:07d}".format(index)
+
+
+# Plain YAML scalars that need no quoting, everything else goes through the dumper
+# keg -b and -S values
+BLOCK_SIZE = re.compile(r"\d+[BKMG]?\Z")
+FSYNC_POLICY = re.compile(r"(none|end|\d+)\Z")
+INPUT_MODES = ["lines", "read", "mmap", "copy"]
+# keg -A access patterns behind the named I/O profiles, small-files-N is built from N
+IO_PROFILES = {
+    "seq-large": "seq:16M",
+    "random-4k": "random:4K",
+    "strided": "strided:64K:1M",
+}
+# Shapes PMC can cluster, and cores per node of the cluster nodes (Cori Haswell)
+PMC_SHAPES = ["new_chain", "fork", "tree"]
+PMC_PPN = 32
+UNIT_BYTES = {"B": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+# Graph pegasus-mpi-keg loads at startup, and Decaf redistribution strategies
+DECAF_GRAPH = "linear2.json"
+DECAF_REDIST = ["count", "round", "zcurve", "block", "proc"]
+# How replayed jobs spend their recorded time: CPU time slept after the I/O
+# (keg -s), or the whole wall time (keg -t)
+REPLAY_TIMINGS = ["compute", "total"]
+# keg -K checksums, each output gets a <output>.<checksum> sidecar
+KEG_CHECKSUMS = ["sha256", "xxh64"]
+SMALL_FILES = re.compile(r"small-files-([1-9]\d*)\Z")
+ACCESS_PATTERN = re.compile(r"((seq|random)(:\d+[BKMG]?)?|strided(:\d+[BKMG]?){0,2}|small:[1-9]\d*(:\d+[BKMG]?)?)\Z")
+
+PLAIN_SCALAR = re.compile(r"-?[A-Za-z_][A-Za-z0-9_.\-]*\Z")
+RESERVED_SCALARS = {"true", "false", "yes", "no", "on", "off", "null"}
+
+
+@lru_cache(maxsize=4096)
+def dump_scalar(value) -> str:
+    return pegasus_yaml.dump([value], allow_unicode=True)[2:].rstrip("\n")
+
+
+def yaml_scalar(value) -> str:
+    if isinstance(value, str) and PLAIN_SCALAR.match(value) and value.lower() not in RESERVED_SCALARS:
+        return value
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    return dump_scalar(value)
+
+
+def format_job_record(record: JobRecord) -> str:
+    # Same layout Job.__json__() produces once dumped by Pegasus.yaml
+    lines = [
+        "- type: job",
+        "  name: " + yaml_scalar(record.name),
+        "  id: " + yaml_scalar(record.id),
+    ]
+    if record.args:
+        lines.append("  arguments:")
+        lines.extend("  - " + yaml_scalar(arg) for arg in record.args)
+    else:
+        lines.append("  arguments: []")
+    if record.uses:
+        lines.append("  uses:")
+        for lfn, link, stage_out, register_replica in record.uses:
+            lines.append("  - lfn: " + yaml_scalar(lfn))
+            lines.append("    type: " + link)
+            if stage_out is not None:
+                lines.append("    stageOut: " + yaml_scalar(stage_out))
+            if register_replica is not None:
+                lines.append("    registerReplica: " + yaml_scalar(register_replica))
+    else:
+        lines.append("  uses: []")
+    if record.label:
+        lines.append("  profiles:")
+        lines.append("    pegasus:")
+        lines.append("      label: " + yaml_scalar(record.label))
+    lines.append("")
+    return "\n".join(lines)
+
+
+def format_dependency(parent: str, children: List[str]) -> str:
+    lines = ["- id: " + yaml_scalar(parent), "  children:"]
+    lines.extend("  - " + yaml_scalar(child) for child in children)
+    lines.append("")
+    return "\n".join(lines)
+
+
+def write_workflow_yaml(file: str, name: str, jobs: Iterator[JobRecord],
+                        edges: Iterator[Tuple[str, List[str]]], chunk_size: int = 1024) -> None:
+    """Stream job records and their explicit edges to a workflow YAML.
+
+    Jobs are formatted by chunks of ``chunk_size`` records so memory stays
+    flat with the number of jobs, and no dependency inference is done.
+    """
+    load_pegasus()
+    header = OrderedDict([
+        ("x-pegasus", {
+            "createdBy": getpass.getuser(),
+            "createdOn": datetime.now().strftime(r"%m-%d-%yT%H:%M:%SZ"),
+            "apiLang": "python",
+        }),
+        ("pegasus", PEGASUS_VERSION),
+        ("name", name),
+    ])
+
+    with open(file, "w") as f:
+        pegasus_yaml.dump(header, f, allow_unicode=True)
+
+        f.write("jobs:\n")
+        for chunk in chunked(jobs, chunk_size):
+            f.write("".join(map(format_job_record, chunk)))
+
+        first = next(edges, None)
+        if first is None:
+            f.write("jobDependencies: []\n")
+            return
+
+        f.write("jobDependencies:\n")
+        f.write(format_dependency(*first))
+        for chunk in chunked(edges, chunk_size):
+            f.write("".join(format_dependency(parent, children) for parent, children in chunk))
+
+
+def file_edges(records: List[JobRecord]) -> List[Tuple[str, List[str]]]:
+    """Edges from the producers of files to the jobs reading them."""
+    producers = {}
+    for record in records:
+        for lfn, link, _, _ in record.uses:
+            if link == "output":
+                producers[lfn] = record.id
+    children = OrderedDict()
+    for record in records:
+        for lfn, link, _, _ in record.uses:
+            parent = producers.get(lfn)
+            if link != "input" or parent is None or parent == record.id:
+                continue
+            kids = children.setdefault(parent, [])
+            if not kids or kids[-1] != record.id:
+                kids.append(record.id)
+    return list(children.items())
+
+
+def write_partition(file: str, name: str, records: List[JobRecord]) -> None:
+    write_workflow_yaml(file, name, iter(records), iter(file_edges(records)))
+
+
+def connected_components(records: Iterator[JobRecord]) -> List[List[JobRecord]]:
+    """Jobs linked by the files they share, in order of first job."""
+    parent = {}
+
+    def find(lfn):
+        while parent[lfn] != lfn:
+            parent[lfn] = parent[parent[lfn]]
+            lfn = parent[lfn]
+        return lfn
+
+    records = list(records)
+    for record in records:
+        # jobs without files are their own component
+        lfns = [lfn for lfn, _, _, _ in record.uses] or [record.id]
+        for lfn in lfns:
+            parent.setdefault(lfn, lfn)
+        root = find(lfns[0])
+        for lfn in lfns[1:]:
+            parent[find(lfn)] = root
+
+    components = OrderedDict()
+    for record in records:
+        lfn = record.uses[0][0] if record.uses else record.id
+        components.setdefault(find(lfn), []).append(record)
+    return list(components.values())
+
+
+# --- Streaming YAML input ----------------------------------------------------
+def iter_yaml_items(path: str, section: str, batch_size: int = 1024) -> Iterator:
+    """Items of the top-level sequence ``section`` of a workflow YAML.
+
+    Block sequences, as Pegasus writes them, are cut into batches of
+    ``batch_size`` items on their indentation and every batch is loaded with
+    libyaml when available, so memory stays flat with the number of items.
+    Other layouts (flow sequences, quoted keys) load the whole document.
+    """
+    import yaml
+    loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+    def load(stream):
+        try:
+            return yaml.load(stream, Loader=loader)
+        except yaml.YAMLError as e:
+            raise IOSyntheticError(str(e)) from e
+
+    header = section + ":"
+    with open(path, "r") as f:
+        line = ""
+        for line in f:
+            if line.startswith(header):
+                break
+        if line.rstrip() != header:
+            f.seek(0)
+            data = load(f)
+            if not isinstance(data, dict):
+                raise IOSyntheticError("{} is not a workflow.".format(path))
+            yield from data.get(section) or []
+            return
+
+        lines = []
+        items = 0
+        indent = None
+        for line in f:
+            stripped = line.lstrip(" ")
+            if not stripped.strip() or stripped.startswith("#"):
+                continue
+            depth = len(line) - len(stripped)
+            if indent is None:
+                indent = depth
+            if depth < indent or depth == indent and not stripped.startswith("-"):
+                break
+            if depth == indent:
+                if items == batch_size:
+                    yield from load("".join(lines))
+                    lines = []
+                    items = 0
+                items += 1
+            lines.append(line)
+        yield from load("".join(lines)) or []
+
+
+def access_pattern(profile: str) -> str:
+    """keg -A pattern of a named I/O profile, or of a raw pattern like random:64K."""
+    match = SMALL_FILES.match(profile)
+    if match:
+        return "small:{}:4K".format(match.group(1))
+    if profile in IO_PROFILES:
+        return IO_PROFILES[profile]
+    if ACCESS_PATTERN.match(profile):
+        return profile
+    raise IOSyntheticError("I/O profile must be one of {}, small-files-N or a keg access pattern, not {}.".format(
+        ", ".join(IO_PROFILES), profile))
+
+
+def small_parts(record: JobRecord) -> Iterator[Tuple[str, int]]:
+    """(output, number of parts) of the generated outputs keg ``-A small:n``
+    spreads over the files ``<output>.0`` to ``<output>.<n-1>``."""
+    args = [str(arg) for arg in record.args]
+    if "-A" not in args or not args[args.index("-A")+1].startswith("small:"):
+        return
+    parts = int(args[args.index("-A")+1].split(":")[1])
+    generated = "-G" in args
+    listing = False
+    for arg in args:
+        if arg.startswith("-"):
+            listing = arg == "-o"
+        elif listing and (generated or "=" in arg):
+            yield arg.split("=", 1)[0], parts
+
+
+def chunked(iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    chunk = list(islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, size))
 
 
 class IOSyntheticWorkflow(object):
@@ -35,8 +895,37 @@ class IOSyntheticWorkflow(object):
                  src_path: Optional[str] = None,
                  files_size: Optional[Union[List[float], Dict[str,float]]]=[1.0],
                  size_unit: Optional[str] = 'G',
-                 waiting_time: Optional[Union[List[float], Dict[str,float]]] = [2.0]
+                 waiting_time: Optional[Union[List[float], Dict[str,float]]] = [2.0],
+                 stream: Optional[bool] = False,
+                 fan_in_arity: Optional[int] = 2,
+                 wf_dir: Optional[str] = None,
+                 cache_dir: Optional[str] = None,
+                 use_cache: Optional[bool] = True,
+                 block_size: Optional[Union[str, List[str]]] = None,
+                 direct_io: Optional[bool] = False,
+                 preallocate: Optional[bool] = False,
+                 fsync: Optional[str] = None,
+                 input_mode: Optional[str] = None,
+                 keg_log: Optional[str] = None,
+                 io_profile: Optional[Union[str, List[str]]] = None,
+                 keg_threads: Optional[int] = None,
+                 decaf_chunk: Optional[str] = None,
+                 decaf_procs: Optional[Union[int, List[int]]] = 1,
+                 decaf_redist: Optional[str] = "count",
+                 pmc_shape: Optional[str] = "new_chain",
+                 pmc_tasks: Optional[int] = None,
+                 pmc_ppn: Optional[int] = PMC_PPN,
+                 partition_size: Optional[int] = None,
+                 partition_workers: Optional[int] = None,
+                 kickstart_record: Optional[Union[List[str], Dict[str, float]]] = None,
+                 replay_timing: Optional[str] = "compute",
+                 input_pool: Optional[str] = None,
+                 input_pattern: Optional[str] = "zero",
+                 input_workers: Optional[int] = None,
+                 keg_checksum: Optional[str] = None
                 ) -> None:
+        load_pegasus()
+
         self.wf_name = "io-synthetic"
         self.wid = self.wf_name + "-" + datetime.now().strftime("%s")
         self.dagfile = self.wid+".yml"
@@ -47,6 +936,8 @@ class IOSyntheticWorkflow(object):
         self.shape = shape
 
         self.src_path = self.wf_dir
+        if wf_dir:
+            self.wf_dir = str(Path(wf_dir).resolve())
         if src_path:
             self.src_path = src_path
         
@@ -59,35 +950,161 @@ class IOSyntheticWorkflow(object):
         self.pmc = False
         if self.shape[0] == "pmc":
             self.pmc = True
+        self.stream = stream
+        self.fan_in_arity = fan_in_arity
+        self.block_size = block_size
+        self.direct_io = direct_io
+        self.preallocate = preallocate
+        self.fsync = fsync
+        self.input_mode = input_mode
+        self.keg_log = keg_log
+        self.io_profile = None
+        self.keg_threads = keg_threads
+        self.decaf_chunk = str(decaf_chunk).upper() if decaf_chunk is not None else None
+        self.decaf_procs = decaf_procs
+        self.decaf_redist = decaf_redist
+        self.file_path = None
+        self.pmc_shape = pmc_shape
+        self.pmc_tasks = pmc_tasks
+        self.pmc_ppn = pmc_ppn
+        self.dag_stats = None
+        self.layout = None
+        self.partition_size = partition_size
+        self.partition_workers = partition_workers
+        self.partitions = None
+        self.kickstart_record = kickstart_record
+        self.replay_timing = replay_timing
+        self.replay = None
+        self.input_pool = input_pool
+        self.input_pattern = input_pattern
+        self.input_workers = input_workers
+        self.provisioned = None
+        self.keg_checksum = keg_checksum
+        # root inputs with a sidecar keg verifies, from the input pool
+        self.verified_inputs = set()
+        self.wf_path = "workflow.yml"
+        self.conf_path = None
+        self.pegasus_bin_dir = None
+        self.trace = PhaseTrace()
+
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.cache = None
+        if use_cache:
+            self.cache = CatalogCache(self.cache_dir)
 
         ## Security checks
         if self.size_unit not in ['B', 'K', 'M', 'G']:
-            print("Error: Unit size accepted values are [B, K, M, G] (default: G).")
-            sys.exit(-1)
+            raise IOSyntheticError("Unit size accepted values are [B, K, M, G] (default: G).")
         
         if isinstance(files_size, list) and len(files_size) == 1:
             if isinstance(self.shape[1], int):
                 self.files_size = files_size*self.shape[1]
             elif isinstance(self.shape[1], str) and self.shape[0] != "custom":
-                print("Error: Number of nodes must be an integer.")
-                sys.exit(-1)
+                raise IOSyntheticError("Number of nodes must be an integer.")
 
-        if len(self.files_size) != self.shape[1]:
-            print("Error: File size list lenght ({}) must be equal to the number of nodes ({}).".format(
+        if self.shape[0] != "custom" and len(self.files_size) != self.shape[1]:
+            raise IOSyntheticError("File size list lenght ({}) must be equal to the number of nodes ({}).".format(
                 len(self.files_size), self.shape[1]))
-            sys.exit(-1)
 
         if isinstance(waiting_time, list) and len(waiting_time) == 1:
             if isinstance(self.shape[1], int):
                 self.waiting_time = waiting_time*self.shape[1]
-            else:
-                print("Error: Number of nodes must be an integer.")
-                sys.exit(-1)
+            elif self.shape[0] != "custom":
+                raise IOSyntheticError("Number of nodes must be an integer.")
         
-        if len(self.waiting_time) != self.shape[1]:
-            print("Error: Waiting time list lenght ({}) must be equal to the number of nodes ({}).".format(
+        if self.shape[0] != "custom" and len(self.waiting_time) != self.shape[1]:
+            raise IOSyntheticError("Waiting time list lenght ({}) must be equal to the number of nodes ({}).".format(
                 len(self.waiting_time), self.shape[1]))
-            sys.exit(-1)
+
+        if self.pmc:
+            if self.pmc_shape not in PMC_SHAPES:
+                raise IOSyntheticError("PMC shape must be one of {}, not {}.".format(", ".join(PMC_SHAPES), self.pmc_shape))
+            if self.pmc_tasks is not None and self.pmc_tasks < 2:
+                raise IOSyntheticError("PMC needs at least 2 tasks, a master and a worker.")
+            if self.pmc_ppn < 1:
+                raise IOSyntheticError("PMC tasks per node must be >= 1.")
+
+        if (self.shape[0] == "tree" or self.pmc and self.pmc_shape == "tree") and self.fan_in_arity < 2:
+            raise IOSyntheticError("Fan-in arity must be at least 2.")
+
+        if isinstance(block_size, (str, int)):
+            block_size = [block_size]
+        if isinstance(block_size, list):
+            self.block_size = [str(bs).upper() for bs in block_size]
+            if len(self.block_size) == 1 and isinstance(self.shape[1], int):
+                self.block_size = self.block_size*self.shape[1]
+            if self.shape[0] != "custom" and len(self.block_size) != self.shape[1]:
+                raise IOSyntheticError("Block size list lenght ({}) must be equal to the number of nodes ({}).".format(
+                    len(self.block_size), self.shape[1]))
+            for bs in self.block_size:
+                if not BLOCK_SIZE.match(bs):
+                    raise IOSyntheticError("Block size must be a number of bytes with an optional B, K, M or G unit, not {}.".format(bs))
+
+        if (self.direct_io or self.preallocate) and self.block_size is None:
+            raise IOSyntheticError("Direct I/O and preallocation require a block size.")
+
+        if self.fsync is not None and not FSYNC_POLICY.match(str(self.fsync)):
+            raise IOSyntheticError("Fsync policy must be none, end or a number of MB, not {}.".format(self.fsync))
+
+        if self.input_mode is not None and self.input_mode not in INPUT_MODES:
+            raise IOSyntheticError("Input mode must be one of {}, not {}.".format(", ".join(INPUT_MODES), self.input_mode))
+
+        if isinstance(io_profile, str):
+            io_profile = [io_profile]
+        if isinstance(io_profile, list):
+            self.io_profile = [access_pattern(profile) for profile in io_profile]
+            if len(self.io_profile) == 1 and isinstance(self.shape[1], int):
+                self.io_profile = self.io_profile*self.shape[1]
+            if self.shape[0] != "custom" and len(self.io_profile) != self.shape[1]:
+                raise IOSyntheticError("I/O profile list lenght ({}) must be equal to the number of nodes ({}).".format(
+                    len(self.io_profile), self.shape[1]))
+
+        if self.keg_threads is not None and self.keg_threads < 1:
+            raise IOSyntheticError("Number of keg I/O threads must be at least 1.")
+
+        if self.decaf_chunk is not None and not BLOCK_SIZE.match(self.decaf_chunk):
+            raise IOSyntheticError("Decaf chunk size must be a number of bytes with an optional B, K, M or G unit, not {}.".format(self.decaf_chunk))
+        # Bredala arrays are indexed with an int
+        if self.decaf_chunk is not None and int(self.decaf_chunk.rstrip("BKMG")) * UNIT_BYTES.get(self.decaf_chunk[-1], 1) > 2**31 - 1:
+            raise IOSyntheticError("Decaf chunk size must be at most 2G-1 bytes, not {}.".format(self.decaf_chunk))
+
+        if isinstance(decaf_procs, int):
+            decaf_procs = [decaf_procs]
+        self.decaf_procs = list(decaf_procs)
+        if len(self.decaf_procs) == 1 and isinstance(self.shape[1], int):
+            self.decaf_procs = self.decaf_procs*max(self.shape[1], 1)
+        if self.decaf:
+            if len(self.decaf_procs) != max(self.shape[1], 1):
+                raise IOSyntheticError("Decaf procs list lenght ({}) must be equal to the number of nodes ({}).".format(
+                    len(self.decaf_procs), self.shape[1]))
+            if any(procs < 1 for procs in self.decaf_procs):
+                raise IOSyntheticError("Every Decaf stage needs at least 1 proc.")
+            if self.decaf_redist not in DECAF_REDIST:
+                raise IOSyntheticError("Decaf redistribution must be one of {}, not {}.".format(", ".join(DECAF_REDIST), self.decaf_redist))
+            if self.io_profile is not None:
+                raise IOSyntheticError("I/O profiles are not applied by pegasus-mpi-keg in Decaf workflows.")
+
+        if self.partition_size is not None:
+            if self.partition_size < 1:
+                raise IOSyntheticError("Partition size must be >= 1.")
+            if self.decaf:
+                raise IOSyntheticError("Decaf workflows run as one dataflow and cannot be partitioned.")
+
+        if self.kickstart_record is not None and self.shape[0] != "custom":
+            raise IOSyntheticError("Kickstart records can only be replayed on a custom workflow.")
+
+        if self.replay_timing not in REPLAY_TIMINGS:
+            raise IOSyntheticError("Replay timing must be one of {}, not {}.".format(", ".join(REPLAY_TIMINGS), self.replay_timing))
+
+        if self.input_pattern not in INPUT_PATTERNS:
+            raise IOSyntheticError("Input pattern must be one of {}, not {}.".format(", ".join(INPUT_PATTERNS), self.input_pattern))
+
+        if self.keg_checksum is not None:
+            if self.keg_checksum not in KEG_CHECKSUMS:
+                raise IOSyntheticError("Keg checksum must be one of {}, not {}.".format(", ".join(KEG_CHECKSUMS), self.keg_checksum))
+            if self.decaf:
+                raise IOSyntheticError("Keg checksums are not computed by pegasus-mpi-keg in Decaf workflows.")
+
 
         ## Output Sites
         self.shared_scratch_dir = os.path.join(
@@ -96,13 +1113,87 @@ class IOSyntheticWorkflow(object):
             self.wf_dir, "{}/output".format(self.wid))
 
     # --- Write files in directory --------------------------------------------
-    def write(self):
-        if not self.sc is None:
-            self.sc.write()
-        self.props.write()
-        self.tc.write()
-        self.rc.write()
-        self.wf.write()
+    def write(self, directory: Optional[str] = None) -> None:
+        """Write catalogs, properties and workflow in the current directory.
+
+        When ``directory`` is given everything goes there instead, and the
+        properties point to the catalogs next to them so that the directory
+        can be planned on its own.
+        """
+        def path(name):
+            return os.path.join(directory, name) if directory else name
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            if not self.sc is None:
+                self.props["pegasus.catalog.site.file"] = os.path.abspath(path("sites.yml"))
+            self.props["pegasus.catalog.transformation.file"] = os.path.abspath(path("transformations.yml"))
+            self.props["pegasus.catalog.replica.file"] = os.path.abspath(path("replicas.yml"))
+            self.conf_path = os.path.abspath(path("pegasus.properties"))
+
+        if self.partitions is not None:
+            # sub-workflows are found through the replica catalog
+            for lfn, _ in self.partitions:
+                self.rc.add_replica("local", lfn, os.path.abspath(path(lfn)))
+
+        catalogs = [
+            (self.sc, "sites.yml"),
+            (self.props, "pegasus.properties"),
+            (self.tc, "transformations.yml"),
+            (self.rc, "replicas.yml"),
+        ]
+        for catalog, name in catalogs:
+            if catalog is None:
+                continue
+            # sites.yml holds the scratch and storage directories of this
+            # wid, no later workflow could reuse it
+            if self.cache is None or catalog is self.sc:
+                catalog.write(path(name))
+            else:
+                self.cache.write(self.catalog_key(), catalog, path(name))
+
+        if self.decaf:
+            self.write_decaf(directory)
+        if self.pmc:
+            with open(path("layout.json"), "w") as f:
+                json.dump(self.layout_report(), f, indent=2)
+
+        self.wf_path = path("workflow.yml")
+        if self.partitions is not None:
+            self.write_partitions(directory)
+            self.wf.write(self.wf_path)
+        elif self.stream:
+            self.write_stream(self.wf_path)
+        else:
+            self.wf.write(self.wf_path)
+
+    def write_stream(self, file: str, chunk_size: int = 1024) -> None:
+        """Stream the job records and their explicit edges to a workflow YAML.
+
+        Jobs are formatted by chunks of ``chunk_size`` records so memory stays
+        flat with the number of jobs, and no dependency inference is done since
+        every shape knows its own edges.
+        """
+        write_workflow_yaml(file, self.wf_name, *self.job_streams(), chunk_size=chunk_size)
+
+    def shape_kind(self) -> str:
+        if self.decaf:
+            return "decaf"
+        elif self.pmc:
+            return "pmc"
+        return "plain"
+
+    def catalog_key(self) -> str:
+        """Key of the catalog cache entries: everything catalogs depend on."""
+        key = [self.exec_site_name, self.src_path, self.shape_kind(),
+               self.pegasus_bin_dir, PEGASUS_VERSION]
+        if self.decaf:
+            # the decaf transformation is sized on the ranks, the producer gets the chunk size
+            key += [self.decaf_procs, self.decaf_chunk]
+        if self.pmc:
+            # the mpiexec transformation is sized on the layout
+            key += list(self.dag_layout())
+        return hashlib.sha256(json.dumps(key).encode()).hexdigest()[:32]
 
     # --- Configuration (Pegasus Properties) ----------------------------------
     def create_pegasus_properties(self):
@@ -116,6 +1207,11 @@ class IOSyntheticWorkflow(object):
             self.props["pegasus.data.configuration"] = "sharedfs"
             self.props["pegasus.integrity.checking"] = "none"
 
+        if self.keg_checksum is not None:
+            # keg verifies every file it reads, but the inputs given with -k,
+            # Pegasus would hash them all once more
+            self.props["pegasus.integrity.checking"] = "none"
+
         # props["pegasus.monitord.encoding"] = "json"
         # self.properties["pegasus.integrity.checking"] = "none"
         
@@ -177,16 +1273,10 @@ class IOSyntheticWorkflow(object):
 
         
         # --- Transformations ---------------------------------------------------------------
-        try:
-            pegasus_config = subprocess.run(
-                ["pegasus-config", "--bin"], stdout=subprocess.PIPE, stderr=subprocess.PIPE
-            )
-        except FileNotFoundError as e:
-            print("Unable to find pegasus-config")
+        with self.trace.phase("pegasus-config"):
+            self.pegasus_bin_dir = pegasus_bin_dir(self.cache_dir if self.cache else None)
 
-        assert pegasus_config.returncode == 0
-
-        PEGASUS_BIN_DIR = pegasus_config.stdout.decode().strip()
+        PEGASUS_BIN_DIR = self.pegasus_bin_dir
         keg = Transformation(
             "keg",
             site="local",
@@ -266,6 +1356,9 @@ class IOSyntheticWorkflow(object):
             # What is this tranformation for?
             if self.decaf:
                 keg_pfn = os.path.join(self.src_path, "bin/decaf/pegasus-mpi-keg")
+                producer_args = '-D 1'
+                if self.decaf_chunk is not None:
+                    producer_args += ' -c ' + self.decaf_chunk
                 keg_root = (
                     Transformation("keg_root", site="cori", pfn=keg_pfn, is_stageable=True)
                     .add_pegasus_profile(
@@ -273,7 +1366,7 @@ class IOSyntheticWorkflow(object):
                         runtime="1800",
                         glite_arguments="--qos=regular --constraint=haswell --licenses=SCRATCH",
                     )
-                    .add_profiles(Namespace.SELECTOR, key="decaf.args", value='-D 1')
+                    .add_profiles(Namespace.SELECTOR, key="decaf.args", value=producer_args)
                 )
                 keg_inter = (
                     Transformation("keg_inter", site="cori", pfn=keg_pfn, is_stageable=True)
@@ -294,9 +1387,8 @@ class IOSyntheticWorkflow(object):
                     .add_profiles(Namespace.SELECTOR, key="decaf.args", value='-D 0')
                 )
                 env_script = self.src_path + "/bin/decaf/env.sh"
-                json_fn="linear2.json"
-                nb_jobs = max(self.shape[1], 1)
-                n_nodes=nb_jobs+1
+                json_fn=DECAF_GRAPH
+                n_nodes=sum(self.decaf_procs)+1
                 decaf = (
                     Transformation("decaf", namespace="dataflow", site="cori", pfn=json_fn, is_stageable=False)
                     .add_pegasus_profile(
@@ -311,14 +1403,16 @@ class IOSyntheticWorkflow(object):
 
             if self.pmc:
                 pmc_wrapper_pfn = os.path.join(self.src_path, "bin/pmc/pmc-wrapper")
-                nb_jobs = max(self.shape[1], 1)
+                layout = self.dag_layout()
+                if layout.clustering == "horizontal":
+                    keg.add_profiles(Namespace.PEGASUS, key="clusters.num", value=layout.groups)
                 pmc = (
                     Transformation("mpiexec", namespace="pegasus", site="cori", pfn=pmc_wrapper_pfn, is_stageable=False)
                     .add_pegasus_profile(
                         runtime="1800",
-                        glite_arguments="--qos=debug --constraint=haswell --licenses=SCRATCH --nodes=1 --ntasks-per-node=1 --ntasks=1",
+                        glite_arguments="--qos=debug --constraint=haswell --licenses=SCRATCH --nodes=" + str(layout.nodes) + " --ntasks-per-node=" + str(min(layout.tasks, self.pmc_ppn)) + " --ntasks=" + str(layout.tasks),
                     )
-                    .add_env(key="PEGASUS_PMC_TASKS", value=2)
+                    .add_env(key="PEGASUS_PMC_TASKS", value=layout.tasks)
                     # .add_profiles(Namespace.PEGASUS, key="nodes", value=1)
                     # .add_profiles(Namespace.PEGASUS, key="ppn", value=32)
                 )
@@ -338,136 +1432,579 @@ class IOSyntheticWorkflow(object):
         
         if file_path:
             self.rc.add_replica(file_site, "f0.txt", file_path)
+        if self.input_pool:
+            for lfn, pfn in self.provision_inputs(exclude=["f0.txt"] if file_path else []).items():
+                if self.keg_checksum is None:
+                    self.rc.add_replica(file_site, lfn, pfn)
+                else:
+                    digest = pool_digest(pfn)
+                    self.rc.add_replica(file_site, lfn, pfn, checksum={"sha256": digest})
+                    if self.keg_checksum == "sha256":
+                        # keg verifies it like the outputs of the workflow
+                        self.rc.add_replica(file_site, lfn + ".sha256", pfn + ".sha256")
+                        self.verified_inputs.add(lfn)
+                if lfn == "f0.txt":
+                    file_path = pfn
+        self.file_path = file_path
+
+    def root_inputs(self) -> "OrderedDict[str, int]":
+        """Inputs no job of the workflow produces, with their size in bytes:
+        the first file size for the generated shapes, the ``size`` of the
+        input workflow (else 1 ``size_unit``) for custom."""
+        unit = UNIT_BYTES[self.size_unit]
+        inputs = OrderedDict()
+        produced = set()
+        if self.shape[0] == "custom":
+            for job in iter_yaml_items(self.shape[1], "jobs"):
+                for use in job['uses']:
+                    if use['type'] == "input":
+                        inputs.setdefault(use['lfn'], int(use.get('size') or unit))
+                    else:
+                        produced.add(use['lfn'])
+        else:
+            size = int(round(self.files_size[0] * unit))
+            for record in self.job_streams()[0]:
+                for lfn, link, _, _ in record.uses:
+                    if link == "input":
+                        inputs.setdefault(lfn, size)
+                    else:
+                        produced.add(lfn)
+        return OrderedDict((lfn, size) for lfn, size in inputs.items() if lfn not in produced)
+
+    def provision_inputs(self, exclude: Optional[List[str]] = None) -> "OrderedDict[str, str]":
+        """Physical path of every root input, taken from the input pool or
+        created there in parallel. Inputs of the same size get distinct
+        files, so every input has its own replica."""
+        os.makedirs(self.input_pool, exist_ok=True)
+        paths = OrderedDict()
+        sizes = []
+        count = {}
+        for lfn, size in self.root_inputs().items():
+            if lfn in (exclude or []):
+                continue
+            paths[lfn] = os.path.abspath(pool_path(self.input_pool, size, self.input_pattern, count.get(size, 0)))
+            count[size] = count.get(size, 0) + 1
+            sizes.append(size)
+
+        with ThreadPoolExecutor(max_workers=self.input_workers) as pool:
+            created = sum(pool.map(provision_file, paths.values(), sizes, [self.input_pattern]*len(sizes),
+                                   [self.keg_checksum is not None]*len(sizes)))
+        self.provisioned = (created, len(paths) - created)
+        return paths
 
     # --- Create Workflow -----------------------------------------------------
     def create_workflow(self) -> None:
-        if self.shape[0] == "chain":
+        if self.partition_size is not None:
+            self.create_workflow_hierarchical()
+        elif self.stream:
+            # Jobs are generated while writing, see write_stream()
+            self.wf = None
+        elif self.shape[0] == "chain":
             self.create_workflow_chain()
         elif self.shape[0] == "new_chain":
             self.create_workflow_new_chain()
         elif self.shape[0] == "fork":
             self.create_workflow_fork()
+        elif self.shape[0] == "tree":
+            self.create_workflow_tree()
         elif self.shape[0] == "decaf":
             self.create_workflow_decaf()
         elif self.shape[0] == "pmc":
-            self.create_workflow_new_chain()
+            self.create_workflow_pmc()
         else:
             self.create_workflow_custom()
 
+    def job_streams(self) -> Tuple[Iterator[JobRecord], Iterator[Tuple[str, List[str]]]]:
+        """Return the (jobs, edges) generators describing the current shape."""
+        if not self.pmc:
+            jobs, edges = self.shape_streams(self.shape[0])
+            return self.keg_records(jobs), edges
+
+        jobs, edges = self.shape_streams(self.pmc_shape)
+        if self.dag_layout().clustering == "label":
+            jobs = (record._replace(label="cluster1") for record in jobs)
+        return self.keg_records(jobs), edges
+
+    def keg_records(self, records: Iterator[JobRecord]) -> Iterator[JobRecord]:
+        """Job records with the files keg writes beside the outputs."""
+        return self.part_records(self.checksum_records(records))
+
+    def part_records(self, records: Iterator[JobRecord]) -> Iterator[JobRecord]:
+        """Declare the parts of the outputs written with ``-A small:n`` as
+        outputs of their job, staged and registered like the output, and as
+        inputs of every job reading the output. Jobs come parents first,
+        except in custom workflows whose parts are found beforehand."""
+        if self.io_profile is None or not any(p.startswith("small:") for p in self.io_profile):
+            yield from records
+            return
+        parts = {}
+        if self.shape[0] == "custom":
+            for record in self.iter_jobs_custom():
+                parts.update(small_parts(record))
+        for record in records:
+            written = dict(small_parts(record))
+            parts.update(written)
+            uses = tuple(("{}.{}".format(lfn, k), link, stage_out, register_replica)
+                         for lfn, link, stage_out, register_replica in record.uses
+                         for k in range((written if link == "output" else parts).get(lfn, 0)))
+            yield record._replace(uses=record.uses + uses) if uses else record
+
+    def checksum_records(self, records: Iterator[JobRecord]) -> Iterator[JobRecord]:
+        """Have keg checksum the files of every job (``-K``). Each output
+        sidecar is staged out and registered like its output, and is an input
+        of every job reading the output, which verifies it. So are the
+        sidecars of the input pool with sha256. Other inputs no job writes
+        have no sidecar (keg ``-k``). Jobs come parents first, except in
+        custom workflows whose outputs are found beforehand."""
+        if self.keg_checksum is None:
+            yield from records
+            return
+        suffix = "." + self.keg_checksum
+        produced = set(self.verified_inputs)
+        if self.shape[0] == "custom":
+            for record in self.iter_jobs_custom():
+                produced.update(lfn for lfn, link, _, _ in record.uses if link == "output")
+        for record in records:
+            produced.update(lfn for lfn, link, _, _ in record.uses if link == "output")
+            sidecars = tuple((lfn + suffix, link, stage_out, register_replica)
+                             for lfn, link, stage_out, register_replica in record.uses if lfn in produced)
+            external = tuple(lfn for lfn, link, _, _ in record.uses if link == "input" and lfn not in produced)
+            args = record.args + ("-K", self.keg_checksum) + (("-k",) + external if external else ())
+            yield record._replace(args=args, uses=record.uses + sidecars)
+
+    def shape_streams(self, shape: str) -> Tuple[Iterator[JobRecord], Iterator[Tuple[str, List[str]]]]:
+        if shape == "custom":
+            return self.iter_jobs_custom(), self.iter_edges_custom()
+
+        # Security check to ensure nb of jobs is positive >= 1
+        nb_jobs = max(self.shape[1], 1)
+
+        if shape == "chain":
+            return self.iter_jobs_chain(), self.iter_edges_linear(nb_jobs)
+        elif shape == "new_chain":
+            return self.iter_jobs_new_chain(), self.iter_edges_linear(nb_jobs)
+        elif shape == "fork":
+            return self.iter_jobs_fork(), self.iter_edges_fork()
+        elif shape == "tree":
+            return self.iter_jobs_tree(), self.iter_edges_tree()
+        elif shape == "decaf":
+            return self.iter_jobs_decaf(), self.iter_edges_linear(nb_jobs)
+
+        raise ValueError("No job records for shape {}".format(shape))
+
+    def add_job_records(self, records: Iterator[JobRecord]) -> None:
+        for record in records:
+            keg = Job(record.name).add_args(*record.args)
+            for lfn, link, stage_out, register_replica in record.uses:
+                if link == "input":
+                    keg.add_inputs(File(lfn))
+                else:
+                    keg.add_outputs(File(lfn), stage_out=stage_out,
+                                    register_replica=register_replica)
+            if record.label:
+                keg.add_profiles(Namespace.PEGASUS, key="label", value=record.label)
+            self.wf.add_jobs(keg)
+
     def create_workflow_chain(self) -> None:
         self.wf = Workflow(self.wf_name, infer_dependencies=True)
+        self.add_job_records(self.keg_records(self.iter_jobs_chain()))
+
+    def create_workflow_new_chain(self) -> None:
+        self.wf = Workflow(self.wf_name, infer_dependencies=True)
+        self.add_job_records(self.keg_records(self.iter_jobs_new_chain()))
+
+    def create_workflow_decaf(self) -> None:
+        self.wf = Workflow(self.wf_name, infer_dependencies=True)
+        self.add_job_records(self.iter_jobs_decaf())
 
+    def create_workflow_pmc(self) -> None:
+        self.wf = Workflow(self.wf_name, infer_dependencies=True)
+        self.add_job_records(self.job_streams()[0])
+
+    def create_workflow_fork(self) -> None:
+        self.wf = Workflow(self.wf_name, infer_dependencies=True)
+        self.add_job_records(self.keg_records(self.iter_jobs_fork()))
+
+    def create_workflow_tree(self) -> None:
+        self.wf = Workflow(self.wf_name, infer_dependencies=True)
+        self.add_job_records(self.keg_records(self.iter_jobs_tree()))
+
+    # --- DAG analysis and clustering layout ----------------------------------
+    def analyze_dag(self) -> DagStats:
+        if self.dag_stats is None:
+            shape = self.pmc_shape if self.pmc else self.shape[0]
+            total_bytes = int(sum(self.files_size) * UNIT_BYTES[self.size_unit])
+            self.dag_stats = analyze_dag(*self.shape_streams(shape), total_bytes=total_bytes)
+        return self.dag_stats
+
+    def dag_layout(self) -> ClusterLayout:
+        """Size the clustered jobs on the DAG.
+
+        Decaf runs the whole pipeline at once, one rank per node. PMC gets a
+        worker per job of the widest level: when the DAG keeps them busy
+        (average parallelism at least half the width) everything goes in one
+        label cluster, otherwise every level is clustered on its own
+        (horizontal) so narrow levels do not hold a wide allocation.
+        """
+        if self.layout is not None:
+            return self.layout
+        if self.decaf:
+            tasks = sum(self.decaf_procs) + 1
+            self.layout = ClusterLayout("label", 1, tasks, tasks)
+            return self.layout
+
+        stats = self.analyze_dag()
+        width = max(stats.widths)
+        parallelism = self.dag_parallelism(stats)
+        workers = width
+        if self.pmc_tasks is not None:
+            workers = min(width, self.pmc_tasks - 1)
+
+        if width == 1 or parallelism * 2 >= width:
+            clustering, groups = "label", 1
+        else:
+            # one node per clustered job unless the tasks were given
+            if self.pmc_tasks is None:
+                workers = min(width, self.pmc_ppn - 1)
+            clustering, groups = "horizontal", -(-width // workers)
+            workers = -(-width // groups)
+        tasks = workers + 1
+        self.layout = ClusterLayout(clustering, groups, tasks, -(-tasks // self.pmc_ppn))
+        return self.layout
+
+    @staticmethod
+    def dag_parallelism(stats: DagStats) -> float:
+        # jobs per level when nothing waits
+        if stats.critical_path > 0:
+            return stats.total_work / stats.critical_path
+        return sum(stats.widths) / len(stats.widths)
+
+    def layout_report(self) -> OrderedDict:
+        stats = self.analyze_dag()
+        layout = self.dag_layout()
+        return OrderedDict([
+            ("shape", self.pmc_shape if self.pmc else self.shape[0]),
+            ("jobs", sum(stats.widths)),
+            ("levels", len(stats.widths)),
+            ("max_width", max(stats.widths)),
+            ("widths", stats.widths),
+            ("critical_path", stats.critical_path),
+            ("total_work", stats.total_work),
+            ("total_bytes", stats.total_bytes),
+            ("parallelism", round(self.dag_parallelism(stats), 3)),
+            ("clustering", layout.clustering),
+            ("groups", layout.groups),
+            ("tasks", layout.tasks),
+            ("nodes", layout.nodes),
+        ])
+
+    # --- Makespan simulation -------------------------------------------------
+    def data_configuration(self) -> str:
+        if self.decaf or self.pmc or self.exec_site_name == "cori":
+            return "sharedfs"
+        return "condorio"
+
+    def simulate(self, platform: Optional[PlatformModel] = None) -> Tuple[float, List[JobTimeline]]:
+        """Predict the makespan and job timelines (ms) on ``platform``,
+        without planning. Clustered jobs are simulated one by one."""
+        if self.shape[0] == "custom":
+            raise IOSyntheticError("Simulation is not available for custom workflows.")
+        sizes = {"f0.txt": self.files_size[0] * UNIT_BYTES[self.size_unit]}
+        if self.file_path and os.path.isfile(self.file_path):
+            sizes["f0.txt"] = os.path.getsize(self.file_path)
+        shape = self.pmc_shape if self.pmc else self.shape[0]
+        with self.trace.phase("simulate"):
+            return simulate_dag(*self.shape_streams(shape), sizes, platform or PlatformModel(),
+                                self.data_configuration())
+
+    @staticmethod
+    def write_timeline(path: str, timeline: List[JobTimeline]) -> None:
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(JobTimeline._fields)
+            writer.writerows(timeline)
+
+    # --- Decaf dataflow -------------------------------------------------------
+    def decaf_stages(self) -> List[Dict]:
+        """One entry per stage of the Decaf pipeline: producer, intermediates
+        and consumer, with their ranks and pegasus-mpi-keg arguments."""
+        nb_jobs = max(self.shape[1], 1)
+        keg_pfn = os.path.join(self.src_path, "bin/decaf/pegasus-mpi-keg")
+        stages = []
+        start_proc = 0
+        for i in range(nb_jobs):
+            wait = str(self.waiting_time[i])
+            if i == 0:
+                func = "prod"
+                args = ["-i", self.file_path or "f0.txt", "-D", "1", "-s", wait]
+                if self.decaf_chunk is not None:
+                    args += ["-c", self.decaf_chunk]
+            elif i == nb_jobs-1:
+                func = "con"
+                args = ["-G", str(self.files_size[i]), "-u", self.size_unit,
+                        "-o", "f{}.txt".format(nb_jobs), "-D", "0", "-s", wait]
+            else:
+                func = "interm{}".format(i)
+                args = ["-D", "2", "-s", wait]
+            stages.append({
+                "func": func,
+                "start_proc": start_proc,
+                "nprocs": self.decaf_procs[i],
+                "cmdline": " ".join([keg_pfn] + args),
+            })
+            start_proc += self.decaf_procs[i]
+        return stages
+
+    def create_decaf_graph(self) -> Dict:
+        """Decaf JSON graph of the pipeline, stages linked one after the other."""
+        stages = self.decaf_stages()
+        nodes = []
+        for i, stage in enumerate(stages):
+            nodes.append(OrderedDict([
+                ("start_proc", stage["start_proc"]),
+                ("nprocs", stage["nprocs"]),
+                ("cmdline", stage["cmdline"]),
+                ("func", stage["func"]),
+                ("inports", ["in"] if i > 0 else []),
+                ("outports", ["out"] if i < len(stages)-1 else []),
+            ]))
+        edges = []
+        for i in range(1, len(stages)):
+            edges.append(OrderedDict([
+                ("start_proc", 0),
+                ("nprocs", 0),
+                ("source", i-1),
+                ("target", i),
+                ("prod_dflow_redist", self.decaf_redist),
+                ("name", "{}_{}".format(stages[i-1]["func"], stages[i]["func"])),
+                ("sourcePort", "out"),
+                ("targetPort", "in"),
+                ("tokens", 0),
+                ("transport", "mpi"),
+                ("func", "dflow"),
+                ("dflow_con_redist", self.decaf_redist),
+            ]))
+        return {"workflow": OrderedDict([("filter_level", "NONE"), ("nodes", nodes), ("edges", edges)])}
+
+    def decaf_multiprog(self) -> List[str]:
+        """srun --multi-prog lines, only the first consumer rank writes the output."""
+        lines = []
+        for stage in self.decaf_stages():
+            first, last = stage["start_proc"], stage["start_proc"] + stage["nprocs"] - 1
+            cmdline = stage["cmdline"]
+            if stage["func"] == "con" and last > first:
+                lines.append("{} {}".format(first, cmdline))
+                cmdline = re.sub(r" -o \S+", "", cmdline)
+                first += 1
+            ranks = str(first) if first == last else "{}-{}".format(first, last)
+            lines.append("{} {}".format(ranks, cmdline))
+        return lines
+
+    def write_decaf(self, directory: Optional[str] = None) -> Tuple[str, str]:
+        """Write the Decaf graph and the multi-prog config of ``srun``,
+        run with ``srun -n <ranks> --multi-prog keg-<ranks>.conf``."""
+        directory = directory or "."
+        graph_path = os.path.join(directory, DECAF_GRAPH)
+        with open(graph_path, "w") as f:
+            # dumps encodes in C, dump would issue one write per token
+            f.write(json.dumps(self.create_decaf_graph(), indent=4))
+        conf_path = os.path.join(directory, "keg-{}.conf".format(sum(self.decaf_procs)))
+        with open(conf_path, "w") as f:
+            f.write("\n".join(self.decaf_multiprog()) + "\n")
+        return graph_path, conf_path
+
+    # --- Job records per shape -----------------------------------------------
+    def write_args(self, index: int) -> tuple:
+        """keg arguments controlling how job ``index`` writes its -G data."""
+        args = ()
+        if self.block_size is not None:
+            args += ("-b", self.block_size[index % len(self.block_size)])
+            if self.direct_io:
+                args += ("-D",)
+            if self.preallocate:
+                args += ("-F",)
+        if self.fsync is not None:
+            args += ("-S", str(self.fsync))
+        return args
+
+    def keg_args(self, index: int) -> tuple:
+        """keg arguments of job ``index``: input mode, access pattern, I/O threads and logfile."""
+        args = ()
+        if self.input_mode is not None:
+            args += ("-I", self.input_mode)
+        if self.io_profile is not None:
+            args += ("-A", self.io_profile[index % len(self.io_profile)])
+        if self.keg_threads is not None:
+            args += ("-j", self.keg_threads)
+        if self.keg_log is not None:
+            args += ("-l", self.keg_log)
+        return args
+
+    def iter_jobs_chain(self) -> Iterator[JobRecord]:
         ## First job
-        f1 = File("j1.txt")
-        job1 = (
-            Job("keg")
-            .add_args("-o", f1, "-s", self.waiting_time[0], "-G", self.files_size[0], "-u", self.size_unit)
-            .add_outputs(f1, stage_out=False, register_replica=True)
+        f1 = "j1.txt"
+        yield JobRecord(
+            job_id(1), "keg",
+            ("-o", f1, "-s", self.waiting_time[0], "-G", self.files_size[0], "-u", self.size_unit) + self.write_args(0) + self.keg_args(0),
+            ((f1, "output", False, True),)
         )
-        self.wf.add_jobs(job1)
 
         # Security check to ensure nb of jobs is positive >= 1
         nb_jobs = max(self.shape[1], 1)
 
         for i in range(1, nb_jobs):
-            fi = File("f{}.txt".format(i))
-            keg = (
-                Job("keg")
-                .add_args("-i", f1, "-o", fi, "-s", self.waiting_time[i], "-G", self.files_size[i], "-u", self.size_unit)
-                .add_inputs(f1)
-                .add_outputs(fi, stage_out=False, register_replica=False)
+            fi = "f{}.txt".format(i)
+            yield JobRecord(
+                job_id(i+1), "keg",
+                ("-i", f1, "-o", fi, "-s", self.waiting_time[i], "-G", self.files_size[i], "-u", self.size_unit) + self.write_args(i) + self.keg_args(i),
+                ((f1, "input", None, None), (fi, "output", False, False))
             )
             f1 = fi
-            self.wf.add_jobs(keg)
-
-    def create_workflow_new_chain(self) -> None:
-        self.wf = Workflow(self.wf_name, infer_dependencies=True)
 
+    def iter_jobs_new_chain(self) -> Iterator[JobRecord]:
         # Security check to ensure nb of jobs is positive >= 1
         nb_jobs = max(self.shape[1], 1)
 
-        f1 = File("f0.txt")
+        f1 = "f0.txt"
         for i in range(1, nb_jobs+1):
-            fi = File("f{}.txt".format(i))
-            keg = (
-                Job("keg")
-                # .add_args("-i", f1, "-o", fi, "-s", self.waiting_time[i-1], "-G", self.files_size[i-1], "-u", self.size_unit)
-                .add_args("-i", f1, "-o", fi, "-s", self.waiting_time[i-1])
-                # .add_args("-i", f1, "-o", fi)
-                .add_inputs(f1)
-                .add_outputs(fi, stage_out=False, register_replica=False)
+            fi = "f{}.txt".format(i)
+            yield JobRecord(
+                job_id(i), "keg",
+                # ("-i", f1, "-o", fi, "-s", self.waiting_time[i-1], "-G", self.files_size[i-1], "-u", self.size_unit)
+                ("-i", f1, "-o", fi, "-s", self.waiting_time[i-1]) + self.keg_args(i-1),
+                ((f1, "input", None, None), (fi, "output", False, False))
             )
-            if self.decaf or self.pmc:
-                keg.add_profiles(Namespace.PEGASUS, key="label", value="cluster1")
             f1 = fi
-            self.wf.add_jobs(keg)
-
-    def create_workflow_decaf(self) -> None:
-        self.wf = Workflow(self.wf_name, infer_dependencies=True)
 
+    def iter_jobs_decaf(self) -> Iterator[JobRecord]:
         # Security check to ensure nb of jobs is positive >= 1
         nb_jobs = max(self.shape[1], 1)
-        f1 = File("f0.txt")
+
+        label = None
+        if self.decaf:
+            label = "cluster1"
+
+        f1 = "f0.txt"
         for i in range(1, nb_jobs+1):
-            fi = File("f{}.txt".format(i))
-            if i == 1: 
-                keg = Job("keg_root")
+            fi = "f{}.txt".format(i)
+            if i == 1:
+                name = "keg_root"
             elif i == nb_jobs:
-                keg = Job("keg_leaf")
+                name = "keg_leaf"
             else:
-                keg = Job("keg_inter")
-            (   
-                keg
-                # .add_args("-i", f1, "-o", fi, "-s", self.waiting_time[i-1], "-G", self.files_size[i-1], "-u", self.size_unit)
-                .add_args("-i", f1, "-o", fi, "-s", self.waiting_time[i-1])
-                # .add_args("-i", f1, "-o", fi)
-                .add_inputs(f1)
-                .add_outputs(fi, stage_out=False, register_replica=False)
+                name = "keg_inter"
+            yield JobRecord(
+                job_id(i), name,
+                # ("-i", f1, "-o", fi, "-s", self.waiting_time[i-1], "-G", self.files_size[i-1], "-u", self.size_unit)
+                ("-i", f1, "-o", fi, "-s", self.waiting_time[i-1]),
+                ((f1, "input", None, None), (fi, "output", False, False)),
+                label
             )
-            if self.decaf:
-                keg.add_profiles(Namespace.PEGASUS, key="label", value="cluster1")
             f1 = fi
-            self.wf.add_jobs(keg)
-
-
-    def create_workflow_fork(self) -> None:
-        self.wf = Workflow(self.wf_name, infer_dependencies=True)
 
+    def iter_jobs_fork(self) -> Iterator[JobRecord]:
         ## First job
-        f1 = File("j1.txt")
-        job1 = (
-            Job("keg")
-            .add_args("-o", f1, "-s", self.waiting_time[0], "-G", self.files_size[0], "-u", self.size_unit)
-            .add_outputs(f1, stage_out=False, register_replica=False)
+        f1 = "j1.txt"
+        yield JobRecord(
+            job_id(1), "keg",
+            ("-o", f1, "-s", self.waiting_time[0], "-G", self.files_size[0], "-u", self.size_unit) + self.write_args(0) + self.keg_args(0),
+            ((f1, "output", False, False),)
         )
-        self.wf.add_jobs(job1)
 
         # Security check to ensure nb of jobs is positive >= 1
         nb_jobs = max(self.shape[1], 1)
 
-        flast = File("f{}.txt".format(nb_jobs))
-        joblast = (
-            Job("keg")
-            .add_args("-s", self.waiting_time[nb_jobs-1])
-            .add_outputs(flast, stage_out=False, register_replica=False)
+        for i in range(1, nb_jobs-1):
+            fi = "f{}.txt".format(i)
+            yield JobRecord(
+                job_id(i+1), "keg",
+                ("-i", f1, "-o", fi, "-s", self.waiting_time[i], "-G", self.files_size[i], "-u", self.size_unit) + self.write_args(i) + self.keg_args(i),
+                ((f1, "input", None, None), (fi, "output", False, False))
+            )
+
+        ## We add the last job, it reads every branch output
+        flast = "f{}.txt".format(nb_jobs)
+        branches = ["f{}.txt".format(i) for i in range(1, nb_jobs-1)]
+        args = ["-s", self.waiting_time[nb_jobs-1]]
+        for fi in branches:
+            args.extend(("-i", fi))
+        args.extend(self.keg_args(nb_jobs-1))
+        yield JobRecord(
+            job_id(max(nb_jobs, 2)), "keg",
+            tuple(args),
+            ((flast, "output", False, False),) + tuple((fi, "input", None, None) for fi in branches)
         )
 
-        for i in range(1, nb_jobs-1):
-            fi = File("f{}.txt".format(i))
-            keg = (
-                Job("keg")
-                .add_args("-i", f1, "-o", fi, "-s", self.waiting_time[i], "-G", self.files_size[i], "-u", self.size_unit)
-                .add_inputs(f1)
-                .add_outputs(fi, stage_out=False, register_replica=False)
+    def iter_reduction(self) -> Iterator[Tuple[int, List[Tuple[str, str]], str]]:
+        """Walk the fan-in tree merging the fork branches level by level.
+
+        Yields ``(index, inputs, output)`` for every reduction job, where
+        ``inputs`` are at most ``fan_in_arity`` ``(lfn, producer id)`` pairs.
+        The root of the tree writes ``f<n>.txt``, like the fork join does.
+        """
+        nb_jobs = max(self.shape[1], 1)
+        level = [("f{}.txt".format(i), job_id(i+1)) for i in range(1, nb_jobs-1)]
+        # first index after the root job and the branches
+        index = max(nb_jobs, 2)
+        depth = 1
+
+        while True:
+            groups = [level[g:g+self.fan_in_arity] for g in range(0, len(level), self.fan_in_arity)] or [[]]
+            last = len(groups) == 1
+            next_level = []
+            for g, inputs in enumerate(groups):
+                if last:
+                    output = "f{}.txt".format(nb_jobs)
+                else:
+                    output = "r{}_{}.txt".format(depth, g+1)
+                yield index, inputs, output
+                next_level.append((output, job_id(index)))
+                index += 1
+            if last:
+                return
+            level = next_level
+            depth += 1
+
+    def iter_jobs_tree(self) -> Iterator[JobRecord]:
+        nb_jobs = max(self.shape[1], 1)
+
+        # Root job and branches are the same as in the fork
+        yield from islice(self.iter_jobs_fork(), max(nb_jobs-1, 1))
+
+        for index, inputs, output in self.iter_reduction():
+            args = []
+            for lfn, _ in inputs:
+                args.extend(("-i", lfn))
+            args.extend(("-o", output, "-s", self.waiting_time[nb_jobs-1]) + self.keg_args(nb_jobs-1))
+            yield JobRecord(
+                job_id(index), "keg",
+                tuple(args),
+                tuple((lfn, "input", None, None) for lfn, _ in inputs) + ((output, "output", False, False),)
             )
 
-            joblast.add_args("-i", fi)
-            joblast.add_inputs(fi)
+    # --- Explicit edges per shape --------------------------------------------
+    def iter_edges_linear(self, nb_jobs: int) -> Iterator[Tuple[str, List[str]]]:
+        for i in range(1, nb_jobs):
+            yield job_id(i), [job_id(i+1)]
 
-            self.wf.add_jobs(keg)
+    def iter_edges_fork(self) -> Iterator[Tuple[str, List[str]]]:
+        nb_jobs = max(self.shape[1], 1)
+        if nb_jobs < 3:
+            return
+
+        branches = [job_id(i+1) for i in range(1, nb_jobs-1)]
+        yield job_id(1), branches
+        for branch in branches:
+            yield branch, [job_id(nb_jobs)]
+
+    def iter_edges_tree(self) -> Iterator[Tuple[str, List[str]]]:
+        nb_jobs = max(self.shape[1], 1)
+        if nb_jobs >= 3:
+            yield job_id(1), [job_id(i+1) for i in range(1, nb_jobs-1)]
 
-        ## We add the last job
-        self.wf.add_jobs(joblast)
+        for index, inputs, _ in self.iter_reduction():
+            for _, producer in inputs:
+                yield producer, [job_id(index)]
 
     # --- Create Workflow -----------------------------------------------------
     def create_workflow_custom(self, 
@@ -475,63 +2012,269 @@ class IOSyntheticWorkflow(object):
         ) -> None:
         self.wf = Workflow(self.wf_name, infer_dependencies=True)
 
-        file = self.shape[1]
-
         if kickstart_record is not None:
-            raise NotImplementedError("kickstart_record support not yet implemented")
-
-        with open(file, 'r') as f:
-            try:
-                data = yaml.safe_load(f)
-
-                for job in data['jobs']:
-                    keg = Job("keg")
-                    keg.add_args("-G", 1, "-u", self.size_unit)
-
-                    for lfn in job['uses']:
-                        fi = File(lfn['lfn'])
-
-                        if lfn['type'] == "input":
-                            keg.add_inputs(fi)
-                            keg.add_args("-i", fi)
-                        else:
-                            keg.add_outputs(fi, stage_out=lfn['stageOut'],
-                                            register_replica=lfn['registerReplica'])
-                            keg.add_args("-o", fi)
-                    
-                    self.wf.add_jobs(keg)
-
-            except yaml.YAMLError as e:
-                print(e)
-                sys.exit(-1)
+            self.kickstart_record = kickstart_record
+            self.replay = None
+
+        self.add_job_records(self.keg_records(self.iter_jobs_custom()))
+
+    def load_replay(self) -> Tuple[Dict, Dict]:
+        """Recorded invocations per job id and mean times per transformation,
+        from the kickstart/monitord records (paths) or wall times (dict) of
+        ``kickstart_record``. Parsed once, then kept."""
+        if self.replay is None:
+            from analysis.kickstart import Invocation, collect, to_table, transformation_means
+            if isinstance(self.kickstart_record, dict):
+                jobs = {str(job): Invocation(str(job), "", float(wall), None, {}, {})
+                        for job, wall in self.kickstart_record.items()}
+            else:
+                paths = [self.kickstart_record] if isinstance(self.kickstart_record, str) else self.kickstart_record
+                try:
+                    jobs = collect(paths)
+                except OSError as e:
+                    raise IOSyntheticError("Cannot read kickstart records: {}".format(e)) from e
+            if not jobs:
+                raise IOSyntheticError("No invocation found in the kickstart records.")
+            self.replay = (jobs, transformation_means(to_table(jobs)))
+        return self.replay
+
+    def replay_args(self, job: Dict) -> Tuple[list, Dict[str, int]]:
+        """keg timing arguments and bytes written per output of a recorded
+        job. Jobs without a record get the mean times of their transformation."""
+        jobs, means = self.load_replay()
+        invocation = jobs.get(str(job.get('id')))
+        if invocation is not None:
+            wall, cpu, writes = invocation.wall, invocation.cpu, invocation.writes
+        else:
+            mean = means.get(job.get('name'), {})
+            wall, cpu, writes = mean.get("wall"), mean.get("cpu"), {}
 
+        if self.replay_timing == "total":
+            seconds, flag = wall, "-t"
+        else:
+            seconds, flag = cpu if cpu is not None else wall, "-s"
+        # keg sleeps fractions of seconds, kept to the millisecond
+        if seconds is None or round(seconds, 3) <= 0:
+            return [], writes
+        return [flag, round(seconds, 3)], writes
+
+    def iter_jobs_custom(self) -> Iterator[JobRecord]:
+        """Keg jobs mirroring the jobs of the custom workflow, read one by one.
+
+        Outputs with a ``size`` are written with that many bytes (keg
+        ``-o lfn=<size>B``), the others get 1 ``size_unit``. A pegasus
+        ``runtime`` profile becomes the sleep after the I/O (``-s``).
+        With ``kickstart_record``, the recorded bytes written and time of
+        the job take precedence, see replay_args(). Block sizes and I/O
+        profiles given per job are used in turn. Checksum sidecars and
+        small file parts of the outputs are left to keg, see keg_records().
+        """
+        small = self.io_profile is not None and any(p.startswith("small:") for p in self.io_profile)
+        for i, job in enumerate(iter_yaml_items(self.shape[1], "jobs")):
+            args = []
+            uses = []
+            unsized = False
+            timing, writes = [], {}
+            if self.kickstart_record is not None:
+                timing, writes = self.replay_args(job)
+            outputs = set(lfn['lfn'] for lfn in job['uses'] if lfn['type'] != "input")
+            inputs = set(lfn['lfn'] for lfn in job['uses'] if lfn['type'] == "input")
+            for lfn in job['uses']:
+                # files keg writes beside the outputs are declared again by keg_records()
+                base, ext = os.path.splitext(lfn['lfn'])
+                if (ext[1:] in KEG_CHECKSUMS or small and ext[1:].isdigit()) and \
+                        base in (inputs if lfn['type'] == "input" else outputs):
+                    continue
+                if lfn['type'] == "input":
+                    uses.append((lfn['lfn'], "input", None, None))
+                    args.extend(("-i", lfn['lfn']))
+                else:
+                    uses.append((lfn['lfn'], "output", lfn['stageOut'], lfn['registerReplica']))
+                    if lfn['lfn'] in writes:
+                        args.extend(("-o", "{}={}B".format(lfn['lfn'], writes[lfn['lfn']])))
+                    elif lfn.get('size') is not None:
+                        args.extend(("-o", "{}={}B".format(lfn['lfn'], int(lfn['size']))))
+                    else:
+                        args.extend(("-o", lfn['lfn']))
+                        unsized = True
+            if unsized:
+                args = ["-G", 1, "-u", self.size_unit] + args
+            runtime = (job.get('profiles') or {}).get('pegasus', {}).get('runtime')
+            if self.kickstart_record is not None:
+                args.extend(timing)
+            elif runtime is not None:
+                args.extend(("-s", float(runtime)))
+            args.extend(self.write_args(i) + self.keg_args(i))
+            yield JobRecord(str(job.get('id', job_id(i+1))), "keg", tuple(args), tuple(uses))
+
+    def iter_edges_custom(self) -> Iterator[Tuple[str, List[str]]]:
+        for dependency in iter_yaml_items(self.shape[1], "jobDependencies"):
+            yield str(dependency['id']), [str(child) for child in dependency['children']]
+
+
+    # --- Hierarchical workflow -------------------------------------------------
+    def iter_partitions(self) -> Iterator[List[JobRecord]]:
+        """Groups of at most ``partition_size`` jobs: segments of the job
+        stream (parents first) or, for custom workflows, connected components
+        packed together (a larger component stays whole)."""
+        if self.shape[0] != "custom":
+            yield from chunked(self.job_streams()[0], self.partition_size)
+            return
+
+        group = []
+        for component in connected_components(self.keg_records(self.iter_jobs_custom())):
+            if group and len(group) + len(component) > self.partition_size:
+                yield group
+                group = []
+            group.extend(component)
+        if group:
+            yield group
+
+    def create_workflow_hierarchical(self) -> None:
+        """Top-level workflow of one SubWorkflow job per partition.
+
+        Files crossing partitions become outputs and inputs of the
+        SubWorkflow jobs, which orders them, and are staged out by the
+        producing partition so the next one can find them.
+        """
+        self.wf = Workflow(self.wf_name, infer_dependencies=True)
+        self.partitions = []
+        groups = list(self.iter_partitions())
+
+        producer = {}
+        for k, records in enumerate(groups):
+            for record in records:
+                for lfn, link, _, _ in record.uses:
+                    if link == "output":
+                        producer[lfn] = k
+        crossing = set()
+        inputs = [OrderedDict() for _ in groups]
+        for k, records in enumerate(groups):
+            for record in records:
+                for lfn, link, _, _ in record.uses:
+                    if link == "input" and producer.get(lfn, -1) != k:
+                        inputs[k][lfn] = None
+                        crossing.add(lfn)
+
+        cluster = None
+        if self.pmc:
+            cluster = [self.dag_layout().clustering]
+        for k, records in enumerate(groups):
+            outputs = []
+            for i, record in enumerate(records):
+                uses = tuple((lfn, link, True, True) if link == "output" and lfn in crossing
+                             else (lfn, link, stage_out, register_replica)
+                             for lfn, link, stage_out, register_replica in record.uses)
+                if uses != record.uses:
+                    records[i] = record._replace(uses=uses)
+                    outputs.extend(lfn for lfn, link, _, _ in record.uses if link == "output" and lfn in crossing)
+
+            lfn = "part-{:05d}.yml".format(k)
+            job = (
+                SubWorkflow(lfn, is_planned=False)
+                .add_planner_args(
+                    sites=[self.exec_site_name],
+                    output_sites=["local"],
+                    output_dir=self.local_storage_dir,
+                    cluster=cluster,
+                    cleanup="leaf",
+                    force=True
+                )
+            )
+            if inputs[k]:
+                job.add_inputs(*inputs[k])
+            if outputs:
+                job.add_outputs(*outputs, stage_out=True, register_replica=True)
+            self.wf.add_jobs(job)
+            self.partitions.append((lfn, records))
+
+    def write_partitions(self, directory: Optional[str] = None) -> None:
+        """Write every partition as its own workflow, in parallel."""
+        directory = directory or "."
+        paths = [os.path.join(directory, lfn) for lfn, _ in self.partitions]
+        names = ["{}-{}".format(self.wf_name, os.path.splitext(lfn)[0]) for lfn, _ in self.partitions]
+        groups = [records for _, records in self.partitions]
+        if len(groups) == 1 or self.partition_workers == 1:
+            for args in zip(paths, names, groups):
+                write_partition(*args)
+            return
+        with ProcessPoolExecutor(max_workers=self.partition_workers) as pool:
+            list(pool.map(write_partition, paths, names, groups))
 
     # --- Run Workflow -----------------------------------------------------
     def run(self, dir_name, submit=False, wait=False):
+        with self.trace.phase("plan+submit" if submit else "plan"):
+            self.plan(dir_name, submit, wait)
+
+    def plan_args(self, dir_name: str, submit: Optional[bool] = False) -> Dict:
+        """Keyword arguments of the Pegasus planner, also used by campaign.py."""
+        cluster_type = None
+        if self.decaf:
+            cluster_type = ["label"]
+        elif self.pmc:
+            cluster_type = [self.dag_layout().clustering]
+        return OrderedDict([
+            ("conf", self.conf_path),
+            ("dir", self.wf_dir),
+            ("relative_dir", dir_name),
+            ("sites", [self.exec_site_name]),
+            ("output_sites", ["local"]),
+            ("output_dir", self.local_storage_dir),
+            ("cleanup", "leaf"),
+            ("force", True),
+            ("submit", submit),
+            ("cluster", cluster_type),
+        ])
+
+    def plan(self, dir_name, submit=False, wait=False):
         try:
-            plan_site = [self.exec_site_name]
-            cluster_type = None
-            if self.decaf or self.pmc: 
-                cluster_type = ["label"]
-            (
-                self.wf.plan(
-                dir=self.wf_dir,
-                relative_dir=dir_name,
-                sites=plan_site,
-                output_sites=["local"],
-                output_dir=self.local_storage_dir,
-                cleanup="leaf",
-                force=True,
-                submit=submit,
-                cluster=cluster_type
-                )
-            )
+            if self.stream:
+                # No Workflow object to plan from, go through the client
+                client = from_env()
+                instance = client.plan(abstract_workflow=self.wf_path, **self.plan_args(dir_name, submit))
+                if wait:
+                    client.wait(self.wf_name, instance.braindump.submit_dir)
+                return
+            self.wf.plan(**self.plan_args(dir_name, submit))
             if wait:
                 self.wf.wait()
 
         except Exception as e:
-            print(e)
-            sys.exit(-1)
+            raise IOSyntheticError(str(e)) from e
+
+    # --- Generate everything -------------------------------------------------
+    def generate(self, file_path: Optional[str] = None,
+                 directory: Optional[str] = None,
+                 verbose: Optional[bool] = False) -> None:
+        """Create every catalog and the workflow, then write them out."""
+        steps = [
+            ("sites", "Creating execution sites...", self.create_sites_catalog),
+            ("properties", "Creating workflow properties...", self.create_pegasus_properties),
+            ("transformations", "Creating transformation catalog...", self.create_transformation_catalog),
+            ("replicas", "Creating replica catalog...", lambda: self.create_replica_catalog(file_path)),
+            ("dag", "Creating pipeline workflow dag...", self.create_workflow),
+            ("write", None, lambda: self.write(directory)),
+        ]
+        for name, message, step in steps:
+            if verbose and message:
+                print(message)
+            with self.trace.phase(name):
+                step()
+
+    def write_trace(self, path: str, chrome: Optional[bool] = False) -> None:
+        """Write the phase timings to ``path`` (JSON) and, if asked, a Chrome
+        trace next to it (``.chrome.json``)."""
+        trace = OrderedDict([
+            ("wid", self.wid),
+            ("shape", list(self.shape)),
+            ("stream", self.stream),
+            ("phases", self.trace.to_json()),
+        ])
+        with open(path, "w") as f:
+            json.dump(trace, f, indent=2)
+        if chrome:
+            with open(os.path.splitext(path)[0] + ".chrome.json", "w") as f:
+                json.dump(self.trace.to_chrome(), f)
 
 
 if __name__ == "__main__":
@@ -558,7 +2301,7 @@ if __name__ == "__main__":
         type=str,
         default="new_chain",
         # required=True,
-        help="Workflow structure, chain, fork or custom (default: new_chain)",
+        help="Workflow structure, chain, fork, tree or custom (default: new_chain)",
     )
     parser.add_argument(
         "-w",
@@ -576,6 +2319,15 @@ if __name__ == "__main__":
         default=1,
         help="Number of jobs generated, only valid if chain or fork have been chosen (default: 1)",
     )
+    parser.add_argument(
+        "-t",
+        "--waiting-time",
+        metavar="FLOAT",
+        type=float,
+        nargs="+",
+        default=[0.0],
+        help="Waiting time of the jobs in seconds, one value for all or one per job (default: 0)",
+    )
     parser.add_argument(
         "-f",
         "--file-path",
@@ -600,6 +2352,209 @@ if __name__ == "__main__":
         default=None,
         help="Absolute path of source directory you want to use. If this option is not specified, local current directory will be used",
     )
+    parser.add_argument(
+        "-k",
+        "--fan-in-arity",
+        metavar="INT",
+        type=int,
+        default=2,
+        help="Maximum number of inputs of a reduction job, only valid if tree has been chosen (default: 2)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream jobs and dependencies directly to the workflow YAML",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always run pegasus-config and rewrite every catalog",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Directory of the catalog cache (default: $XDG_CACHE_HOME/io-synthetic)",
+    )
+    parser.add_argument(
+        "-b",
+        "--block-size",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Write generated data with raw keg writes of this size, e.g. 4M (default: stdio writes)",
+    )
+    parser.add_argument(
+        "--direct-io",
+        action="store_true",
+        help="Write generated data with O_DIRECT, requires -b/--block-size",
+    )
+    parser.add_argument(
+        "--preallocate",
+        action="store_true",
+        help="Preallocate generated data with fallocate, requires -b/--block-size",
+    )
+    parser.add_argument(
+        "--fsync",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Fsync policy of keg outputs: none, end or every N MB (default: none)",
+    )
+    parser.add_argument(
+        "--input-mode",
+        metavar="STR",
+        type=str,
+        choices=["lines", "read", "mmap", "copy"],
+        default=None,
+        help="How keg reads its inputs: lines, read, mmap or copy (default: lines)",
+    )
+    parser.add_argument(
+        "--keg-log",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Logfile every keg job appends its I/O statistics to, see analysis/kegstats.py",
+    )
+    parser.add_argument(
+        "--keg-checksum",
+        metavar="STR",
+        type=str,
+        choices=KEG_CHECKSUMS,
+        default=None,
+        help="Checksum keg computes while reading and writing, sha256 or xxh64; every output gets "
+             "a <output>.<checksum> sidecar that the jobs reading it verify, as do --input-pool inputs "
+             "with sha256; Pegasus integrity checking is turned off (default: none)",
+    )
+    parser.add_argument(
+        "--io-profile",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="I/O profile of every job: seq-large, random-4k, strided, small-files-N "
+             "or a keg access pattern like random:64K (default: sequential)",
+    )
+    parser.add_argument(
+        "--keg-threads",
+        metavar="INT",
+        type=int,
+        default=None,
+        help="Number of I/O threads each keg job reads and writes its files with (default: 1)",
+    )
+    parser.add_argument(
+        "--decaf-chunk",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Size of the chunks the decaf producer puts, below 2G (default: 1G)",
+    )
+    parser.add_argument(
+        "--decaf-procs",
+        metavar="INT",
+        type=int,
+        nargs="+",
+        default=[1],
+        help="Ranks of each decaf stage, one value for all stages or one per stage (default: 1)",
+    )
+    parser.add_argument(
+        "--pmc-shape",
+        metavar="STR",
+        type=str,
+        choices=["new_chain", "fork", "tree"],
+        default="new_chain",
+        help="Structure clustered by pmc: new_chain, fork or tree (default: new_chain)",
+    )
+    parser.add_argument(
+        "--pmc-tasks",
+        metavar="INT",
+        type=int,
+        default=None,
+        help="PMC tasks per clustered job, master included (default: sized on the DAG)",
+    )
+    parser.add_argument(
+        "--pmc-ppn",
+        metavar="INT",
+        type=int,
+        default=32,
+        help="PMC tasks per node (default: 32)",
+    )
+    parser.add_argument(
+        "--decaf-redist",
+        metavar="STR",
+        type=str,
+        choices=["count", "round", "zcurve", "block", "proc"],
+        default="count",
+        help="Redistribution between decaf stages: count, round, zcurve, block or proc (default: count)",
+    )
+    parser.add_argument(
+        "--partition-size",
+        metavar="INT",
+        type=int,
+        default=None,
+        help="Split the workflow into sub-workflows of at most this many jobs (default: flat workflow)",
+    )
+    parser.add_argument(
+        "--partition-workers",
+        metavar="INT",
+        type=int,
+        default=None,
+        help="Number of processes writing the sub-workflows (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--kickstart-record",
+        metavar="STR",
+        nargs="+",
+        default=None,
+        help="Submit directories, kickstart outputs or monitord BP logs of a past run of the custom workflow to replay",
+    )
+    parser.add_argument(
+        "--replay-timing",
+        metavar="STR",
+        type=str,
+        choices=["compute", "total"],
+        default="compute",
+        help="Replay the recorded CPU time after the I/O (keg -s) or the whole wall time (keg -t) (default: compute)",
+    )
+    parser.add_argument(
+        "--input-pool",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="Directory of input files kept across runs, missing inputs are created there and registered",
+    )
+    parser.add_argument(
+        "--input-pattern",
+        metavar="STR",
+        type=str,
+        choices=["zero", "random", "text"],
+        default="zero",
+        help="Content of created inputs: zero (fallocate only), random or text (default: zero)",
+    )
+    parser.add_argument(
+        "--input-workers",
+        metavar="INT",
+        type=int,
+        default=None,
+        help="Number of inputs created at once (default: number of CPUs + 4, at most 32)",
+    )
+    parser.add_argument(
+        "--simulate",
+        action="store_true",
+        help="Predict the makespan and job timelines instead of planning",
+    )
+    parser.add_argument(
+        "--platform",
+        metavar="STR",
+        type=str,
+        default=None,
+        help="JSON file overriding the platform model of --simulate (default: Cori Haswell-like)",
+    )
+    parser.add_argument(
+        "--chrome-trace",
+        action="store_true",
+        help="Also write the phase timings in Chrome trace format",
+    )
     # parser.add_argument(
     #     "-o",
     #     "--output",
@@ -611,14 +2566,14 @@ if __name__ == "__main__":
 
     args = parser.parse_args()
 
-    if not args.workflow_class in ["chain", "new_chain", "fork", "custom", "decaf", "pmc"]:
-        parser.error('-c/--workflow-class can only be set to "chain", "new_chain", "fork", "decaf", or "custom".')
+    if not args.workflow_class in ["chain", "new_chain", "fork", "tree", "custom", "decaf", "pmc"]:
+        parser.error('-c/--workflow-class can only be set to "chain", "new_chain", "fork", "tree", "decaf", or "custom".')
     
     if args.workflow_class == "custom" and args.workflow_yml is None:
         parser.error(
             '-c/--workflow-class == "custom" requires -w/--workflow-yml to be set.')
 
-    if args.workflow_class in ["chain", "new_chain", "fork", "decaf", "pmc"] and (args.number_jobs is None or args.number_jobs < 1):
+    if args.workflow_class in ["chain", "new_chain", "fork", "tree", "decaf", "pmc"] and (args.number_jobs is None or args.number_jobs < 1):
         parser.error(
             '-c/--workflow-class == "chain" or "fork" requires -n/--number-jobs to be set (and it must be >=1).')
 
@@ -626,39 +2581,97 @@ if __name__ == "__main__":
     #     parser.error(
     #         '-b/--bin-path must not be empty.')
 
-    if args.workflow_class == "custom":
-        workflow_class = (args.workflow_class, args.workflow_yml)
-    elif args.workflow_class in ["chain", "new_chain", "fork", "decaf", "pmc"]:
-        workflow_class = (args.workflow_class, args.number_jobs)
-    else:
-        parser.error('Unknown parsing argument error')
+    if args.workflow_class == "tree" and args.fan_in_arity < 2:
+        parser.error('-k/--fan-in-arity must be >=2.')
 
-    workflow = IOSyntheticWorkflow(
-        exec_site_name=args.execution_site,
-        src_path = args.src_path,
-        shape=workflow_class,
-        waiting_time=[0,0,0,0,0],
-        # files_size=[1.0,1.0,1.0,1.0,1.0]
-    )
+    if (args.direct_io or args.preallocate) and args.block_size is None:
+        parser.error('--direct-io and --preallocate require -b/--block-size.')
 
-    print("Creating execution sites...")
-    workflow.create_sites_catalog()
+    if args.partition_size is not None and args.partition_size < 1:
+        parser.error('--partition-size must be >=1.')
 
-    print("Creating workflow properties...")
-    workflow.create_pegasus_properties()
+    if args.partition_size is not None and args.workflow_class == "decaf":
+        parser.error('--partition-size cannot be used with -c/--workflow-class == "decaf".')
 
-    print("Creating transformation catalog...")
-    workflow.create_transformation_catalog()
+    if args.kickstart_record is not None and args.workflow_class != "custom":
+        parser.error('--kickstart-record requires -c/--workflow-class == "custom".')
 
-    print("Creating replica catalog...")
-    workflow.create_replica_catalog(args.file_path)
+    if args.simulate and args.submit:
+        parser.error('--simulate cannot be used with -s/--submit.')
 
-    print("Creating pipeline workflow dag...")
-    workflow.create_workflow()
+    if args.platform and not os.path.isfile(args.platform):
+        parser.error('--platform {} is not a file.'.format(args.platform))
 
-    workflow.write()
+    if args.workflow_class == "custom":
+        workflow_class = (args.workflow_class, args.workflow_yml)
+    elif args.workflow_class in ["chain", "new_chain", "fork", "tree", "decaf", "pmc"]:
+        workflow_class = (args.workflow_class, args.number_jobs)
+    else:
+        parser.error('Unknown parsing argument error')
 
-    if not args.dir_name:
-        args.dir_name = workflow.wid
+    logging.basicConfig(level=logging.DEBUG)
+
+    workflow = None
+    try:
+        workflow = IOSyntheticWorkflow(
+            exec_site_name=args.execution_site,
+            src_path = args.src_path,
+            shape=workflow_class,
+            waiting_time=args.waiting_time,
+            # files_size=[1.0,1.0,1.0,1.0,1.0]
+            stream=args.stream,
+            fan_in_arity=args.fan_in_arity,
+            cache_dir=args.cache_dir,
+            use_cache=not args.no_cache,
+            block_size=args.block_size,
+            direct_io=args.direct_io,
+            preallocate=args.preallocate,
+            fsync=args.fsync,
+            input_mode=args.input_mode,
+            keg_log=args.keg_log,
+            io_profile=args.io_profile,
+            keg_threads=args.keg_threads,
+            decaf_chunk=args.decaf_chunk,
+            decaf_procs=args.decaf_procs,
+            decaf_redist=args.decaf_redist,
+            pmc_shape=args.pmc_shape,
+            pmc_tasks=args.pmc_tasks,
+            pmc_ppn=args.pmc_ppn,
+            partition_size=args.partition_size,
+            partition_workers=args.partition_workers,
+            kickstart_record=args.kickstart_record,
+            replay_timing=args.replay_timing,
+            input_pool=args.input_pool,
+            input_pattern=args.input_pattern,
+            input_workers=args.input_workers,
+            keg_checksum=args.keg_checksum
+        )
 
-    workflow.run(args.dir_name, submit=args.submit, wait=False)
\ No newline at end of file
+        workflow.generate(args.file_path, verbose=True)
+        if workflow.provisioned is not None:
+            print("Input pool: {} input(s) created, {} reused in {}".format(
+                workflow.provisioned[0], workflow.provisioned[1], args.input_pool))
+        if workflow.pmc:
+            print("PMC layout: {clustering} clustering, {groups} cluster(s) per level, {tasks} tasks on {nodes} node(s) "
+                  "for {jobs} jobs over {levels} levels (max width {max_width})".format(**workflow.layout_report()))
+
+        if not args.dir_name:
+            args.dir_name = workflow.wid
+
+        if args.simulate:
+            makespan, timeline = workflow.simulate(load_platform(args.platform))
+            timeline_path = os.path.join(workflow.wf_dir, args.dir_name) + ".timeline.csv"
+            workflow.write_timeline(timeline_path, timeline)
+            print("Predicted makespan: {:.0f} ms for {} jobs ({}), timeline written to {}".format(
+                makespan, len(timeline), workflow.data_configuration(), timeline_path))
+        else:
+            workflow.run(args.dir_name, submit=args.submit, wait=False)
+    except IOSyntheticError as e:
+        print("Error: {}".format(e))
+        sys.exit(-1)
+    finally:
+        if isinstance(workflow, IOSyntheticWorkflow) and args.dir_name:
+            # Next to the submit directory, even when planning failed
+            trace_path = os.path.join(workflow.wf_dir, args.dir_name) + ".trace.json"
+            workflow.write_trace(trace_path, chrome=args.chrome_trace)
+            print("Phase timings written to {}".format(trace_path))
\ No newline at end of file